@@ -1,17 +1,22 @@
+import os
 from flask import Flask, app, jsonify
 from flask_cors import CORS
+from peewee import PostgresqlDatabase
 from .config import Config
 from .models.config import db
+from .services.serializacao import ProvedorJSON
 
 # 1. IMPORTAR AS EXTENSÕES DO ARQUIVO SEPARADO
 # Isso evita o erro de "circular import"
-from .extensions import mail, login_manager
+from .extensions import mail, login_manager, agendador, compressao
 
 def create_app(config_class=Config):
     """Cria e configura a instância da aplicação Flask (Application Factory)."""
     
     app = Flask(__name__)
     app.config.from_object(config_class)
+    # JSON: orjson quando disponível; datas, horas e linhas do Peewee sem conversão manual
+    app.json = ProvedorJSON(app)
 
     # 2. CONFIGURAR O LOGIN MANAGER
     login_manager.init_app(app)
@@ -32,6 +37,9 @@ def create_app(config_class=Config):
     # 3. INICIAR O MAIL
     mail.init_app(app)
 
+    # Compressão gzip/brotli; registrada antes dos blueprints para rodar por último no after_request
+    compressao.init_app(app)
+
     # Gerenciamento de Conexão com Banco de Dados
     @app.before_request
     def _db_connect():
@@ -54,6 +62,28 @@ def create_app(config_class=Config):
     from .api.auth_routes import admin_management_bp 
     app.register_blueprint(admin_management_bp, url_prefix='/api/v1/admin_management')
 
+    # 5. AGENDADOR DE TAREFAS
+    # O import registra as tarefas; a thread só sobe se SCHEDULER_ENABLED estiver ligado
+    # (com o reloader do modo debug, apenas no processo filho). Também é possível
+    # rodar as tarefas em um processo separado com 'python worker.py'.
+    agendador.init_app(app, db)
+    from .services import tarefas
+    if app.config.get('SCHEDULER_ENABLED') and (not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        agendador.iniciar()
+
+    # 6. VAGAS AO VIVO
+    # Com o Postgres, uma thread por processo escuta o NOTIFY das inscrições e repassa
+    # para as conexões SSE locais (ver services/vagas.py)
+    from .services.vagas import ponte_vagas
+    if app.config.get('SSE_LISTEN_NOTIFY') and isinstance(db, PostgresqlDatabase) and \
+            (not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        ponte_vagas.iniciar(db)
+
+    # 7. INSTANTÂNEOS DAS LISTAGENS PÚBLICAS
+    # Regerados por uma thread do processo, fora das requisições (ver services/instantaneos.py)
+    from .services.instantaneos import republicador
+    republicador.init_app(app, db)
+
     # Rota de teste
     @app.route('/health')
     def health_check():
@@ -61,7 +91,7 @@ def create_app(config_class=Config):
 
     return app
 
-# 5. CARREGADOR DE USUÁRIO
+# 8. CARREGADOR DE USUÁRIO
 # Mantemos fora da factory, decorando o objeto importado de extensions
 @login_manager.user_loader
 def load_user(user_id):
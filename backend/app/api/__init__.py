@@ -3,10 +3,21 @@ from flask import Blueprint
 # O url_prefix será definido ao registrar o blueprint no __init__.py principal
 api_bp = Blueprint('api', __name__)
 
+# Notificações de alteração de conteúdo só saem depois que a rota terminou (transação confirmada)
+from ..services.sinais import despachar_alteracoes
+api_bp.after_app_request(despachar_alteracoes)
+
 # Importa as rotas no final para evitar importação circular
 from . import email
 from . import dashboard
 from . import eventos
+from . import vagas
 from . import agenda
 from . import avisos
 from . import horarios
+from . import calendario
+from . import metricas
+from . import atividades
+from . import analise
+from . import busca
+from . import sync
@@ -1,28 +1,87 @@
+from datetime import date
 from flask import request, jsonify
 from . import api_bp
 from ..models.agenda import Agenda;
 from flask_login import login_required, current_user
+from ..services.idempotencia import idempotente
+from ..services.estatisticas import ajustar_contagem, contagem_agenda
+from ..services.atividades import registrar_atividade
+from ..services.campos import Projecao, CampoDesconhecido
+from ..services.conflitos import verificar_reserva, resposta_conflito
+from ..services.lote_agenda import aplicar_lote, MAXIMO_OPERACOES
+from ..services.sincronizacao import registrar_remocoes
+from ..services.concorrencia import (versao_esperada, atualizar_versionado, ConflitoDeVersao,
+                                    resposta_conflito_versao, resposta_versionada)
+from ..services.permissoes import remover_como_dono, SemPermissao
+from ..services.instantaneos import instantaneo
 
+# Campos de GET /agenda (?fields=id,titulo,data ...)
+CAMPOS_AGENDA = Projecao({
+    "id": ((Agenda.id,), lambda a: a.id),
+    "titulo": ((Agenda.titulo,), lambda a: a.titulo),
+    "tipo": ((Agenda.tipo,), lambda a: a.tipo),
+    "local": ((Agenda.local,), lambda a: a.local),
+    # Date e Time saem em ISO 8601 pelo provider JSON (services/serializacao.py)
+    "data": ((Agenda.data,), lambda a: a.data),
+    "horario": ((Agenda.horario,), lambda a: a.horario),
+    "descricao": ((Agenda.descricao,), lambda a: a.descricao),
+    "criado_por": ((Agenda.criado_por,), lambda a: a.criado_por_id),
+    # Enviar de volta no If-Match ao editar
+    "version": ((Agenda.version,), lambda a: a.version),
+})
+
+
+# Corpo de GET /agenda sem parâmetros, publicado como arquivo estático (services/instantaneos.py)
+@instantaneo('agenda')
+def instantaneo_agenda():
+    nomes, colunas = CAMPOS_AGENDA.escolher(None)
+    return [CAMPOS_AGENDA.serializar(a, nomes) for a in Agenda.select(*colunas).order_by(Agenda.data.desc())]
+
+# GET /agenda                                   -> tudo, mais recentes primeiro
+# GET /agenda?from=2025-03-01&to=2025-03-31      -> só o intervalo (inclusivo), em ordem de calendário
+# GET /agenda?from=...&to=...&agrupar=dia        -> [{"data": "2025-03-01", "itens": [...]}, ...]
 @api_bp.route('/agenda', methods=['GET'])
 def get_agenda():
     try:
-        # Busca todos os registros, ordenados por data (opcional)
-        agendas = Agenda.select().order_by(Agenda.data.desc())
-        
-        lista_agenda = []
-        for a in agendas:
-            lista_agenda.append({
-                "id": a.id,
-                "titulo": a.titulo,
-                "tipo": a.tipo,
-                "local": a.local,
-                # Convertendo Date e Time para string (ISO format) para o JSON
-                "data": str(a.data), 
-                "horario": str(a.horario),
-
-                "descricao": a.descricao,
-                "criado_por": a.criado_por.idusuario if a.criado_por else None
-            })
+        nomes, colunas = CAMPOS_AGENDA.escolher(request.args.get('fields'))
+    except CampoDesconhecido as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        inicio = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        fim = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({"error": "Parâmetros 'from' e 'to' devem estar no formato YYYY-MM-DD."}), 400
+    if inicio and fim and inicio > fim:
+        return jsonify({"error": "'from' deve ser anterior ou igual a 'to'."}), 400
+
+    agrupar = request.args.get('agrupar')
+    if agrupar not in (None, 'dia'):
+        return jsonify({"error": "Parâmetro 'agrupar' aceita apenas 'dia'."}), 400
+
+    try:
+        if agrupar:
+            colunas = tuple(dict.fromkeys(colunas + (Agenda.data,)))
+        agendas = Agenda.select(*colunas)
+
+        if inicio or fim:
+            # Varredura de intervalo no índice (data, horario)
+            if inicio:
+                agendas = agendas.where(Agenda.data >= inicio)
+            if fim:
+                agendas = agendas.where(Agenda.data <= fim)
+            agendas = agendas.order_by(Agenda.data, Agenda.horario)
+        else:
+            # Busca todos os registros, ordenados por data, só com as colunas pedidas
+            agendas = agendas.order_by(Agenda.data.desc())
+
+        if agrupar:
+            dias = {}
+            for a in agendas:
+                dias.setdefault(str(a.data), []).append(CAMPOS_AGENDA.serializar(a, nomes))
+            return jsonify([{"data": dia, "itens": itens} for dia, itens in dias.items()]), 200
+
+        lista_agenda = [CAMPOS_AGENDA.serializar(a, nomes) for a in agendas]
             
         return jsonify(lista_agenda), 200
     except Exception as e:
@@ -32,6 +91,7 @@ def get_agenda():
 # 2. CRIAR NOVO (POST)
 @api_bp.route('/agenda', methods=['POST'])
 @login_required
+@idempotente
 def create_agenda():
     data = request.json
     
@@ -40,15 +100,22 @@ def create_agenda():
         return jsonify({"error": "Título e Data são obrigatórios"}), 400
 
     try:
-        nova_agenda = Agenda.create(
-            titulo=data.get('titulo'),
-            tipo=data.get('tipo'),
-            data=data.get('data'),       # Espera string 'YYYY-MM-DD'
-            local=data.get('local'),
-            horario=data.get('horario'), # Espera string 'HH:MM'
-            descricao=data.get('descricao'),
-            criado_por=current_user.idusuario
-        )
+        with Agenda._meta.database.atomic():
+            conflitos = verificar_reserva(Agenda._meta.database, data)
+            if conflitos:
+                return jsonify(resposta_conflito(conflitos)), 409
+
+            nova_agenda = Agenda.create(
+                titulo=data.get('titulo'),
+                tipo=data.get('tipo'),
+                data=data.get('data'),       # Espera string 'YYYY-MM-DD'
+                local=data.get('local'),
+                horario=data.get('horario'), # Espera string 'HH:MM'
+                descricao=data.get('descricao'),
+                criado_por=current_user.idusuario
+            )
+            ajustar_contagem(current_user.idusuario, **contagem_agenda(nova_agenda.is_public))
+            registrar_atividade('agenda', 'criado', nova_agenda.id, nova_agenda.titulo, current_user.idusuario)
         
         return jsonify({
             "message": "Agendamento criado com sucesso!",
@@ -60,27 +127,52 @@ def create_agenda():
         return jsonify({"error": str(e)}), 500
 
 
-# 4. DELETAR (DELETE)
-@api_bp.route('/agenda/<int:id>', methods=['DELETE'])
+# 2b. LOTE (POST): criar/atualizar/remover vários itens em uma transação
+# {"operacoes": [{"op": "criar", "dados": {...}},
+#                {"op": "atualizar", "id": 7, "version": 3, "dados": {"horario": "10:00"}},
+#                {"op": "remover", "id": 9}]}
+@api_bp.route('/agenda/lote', methods=['POST'])
 @login_required
-def delete_agenda(id):
+@idempotente
+def lote_agenda():
+    data = request.get_json(silent=True) or {}
+    operacoes = data.get('operacoes')
+
+    if not isinstance(operacoes, list) or not operacoes:
+        return jsonify({"error": "'operacoes' deve ser uma lista não vazia."}), 400
+    if len(operacoes) > MAXIMO_OPERACOES:
+        return jsonify({"error": f"No máximo {MAXIMO_OPERACOES} operações por lote."}), 400
+
     try:
-        agenda_item = Agenda.get_or_none(Agenda.id == id)
+        with Agenda._meta.database.atomic():
+            resultados = aplicar_lote(operacoes, current_user, bool(data.get('ignorar_conflitos')))
 
-        if not agenda_item:
-            return jsonify({"error": "Item não encontrado"}), 404
+        aplicadas = sum(1 for r in resultados if r["status"] < 400)
+        return jsonify({"resultados": resultados, "aplicadas": aplicadas}), 200
 
-        # --- LÓGICA DE PERMISSÃO ---
-        is_admin = current_user.tipo == 'admin'
-        is_owner = agenda_item.criado_por.idusuario == current_user.idusuario
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        if not (is_admin or is_owner):
-            return jsonify({"error": "Você não tem permissão para excluir este registro"}), 403
-        # ---------------------------
 
-        agenda_item.delete_instance()
+# 4. DELETAR (DELETE)
+@api_bp.route('/agenda/<int:id>', methods=['DELETE'])
+@login_required
+def delete_agenda(id):
+    try:
+        with Agenda._meta.database.atomic():
+            # --- LÓGICA DE PERMISSÃO ---
+            # Admin ou dono: no WHERE do DELETE (o item de outro dono nem é tocado)
+            dono, titulo, is_public = remover_como_dono(Agenda, id, current_user, Agenda.is_public)
+            registrar_remocoes('agenda', Agenda, [id])
+            ajustar_contagem(dono, **contagem_agenda(is_public, -1))
+            registrar_atividade('agenda', 'removido', id, titulo, dono)
         return jsonify({"message": "Removido com sucesso!"}), 200
 
+    except Agenda.DoesNotExist:
+        return jsonify({"error": "Item não encontrado"}), 404
+    except SemPermissao:
+        return jsonify({"error": "Você não tem permissão para excluir este registro"}), 403
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -91,24 +183,33 @@ def delete_agenda(id):
 def update_agenda(id):
     data = request.json
     try:
-        # Busca o item no banco pelo ID que veio na URL
-        agenda_item = Agenda.get_or_none(Agenda.id == id)
-        
-        if not agenda_item:
-            return jsonify({"error": "Item da agenda não encontrado"}), 404
+        esperada = versao_esperada()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    try:
         # Atualiza os campos com os dados novos vindos do React
-        agenda_item.titulo = data.get('titulo')
-        agenda_item.tipo = data.get('tipo')
-        agenda_item.local = data.get('local')
-        agenda_item.data = data.get('data')
-        agenda_item.horario = data.get('horario')
-        agenda_item.descricao = data.get('descricao')
-        
+        valores = {
+            Agenda.titulo: data.get('titulo'),
+            Agenda.tipo: data.get('tipo'),
+            Agenda.local: data.get('local'),
+            Agenda.data: data.get('data'),
+            Agenda.horario: data.get('horario'),
+            Agenda.descricao: data.get('descricao'),
+        }
         
-        agenda_item.save() # Salva no banco de dados
+        with Agenda._meta.database.atomic():
+            # Um UPDATE só: o dono e o título vêm do RETURNING (item inexistente vira 404)
+            versao, dono, titulo = atualizar_versionado(Agenda, id, valores, esperada,
+                                                        retornar=(Agenda.criado_por, Agenda.titulo))
+            registrar_atividade('agenda', 'atualizado', id, titulo, dono)
         
-        return jsonify({"message": "Agendamento atualizado com sucesso!"}), 200
+        return resposta_versionada({"message": "Agendamento atualizado com sucesso!"}, versao), 200
+
+    except ConflitoDeVersao as e:
+        return resposta_conflito_versao(e)
+    except Agenda.DoesNotExist:
+        return jsonify({"error": "Item da agenda não encontrado"}), 404
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,35 @@
+from datetime import timedelta
+from flask import request, jsonify
+from . import api_bp
+from ..services.analise import (GRANULARIDADES, serie_inscricoes, ocupacao_eventos,
+                                inscricoes_por_tipo, parse_data)
+from flask_login import login_required, current_user
+
+# --- RELATÓRIO DE INSCRIÇÕES ---
+# GET /analise/inscricoes?granularidade=semana&de=2025-01-01&ate=2025-03-31&evento_id=7
+# Admin vê todos os eventos; gestor, apenas os que criou.
+@api_bp.route('/analise/inscricoes', methods=['GET'])
+@login_required
+def get_analise_inscricoes():
+    granularidade = request.args.get('granularidade', 'dia')
+    if granularidade not in GRANULARIDADES:
+        return jsonify({"error": f"Granularidade inválida. Use: {', '.join(GRANULARIDADES)}."}), 400
+
+    try:
+        de = parse_data(request.args['de']) if request.args.get('de') else None
+        # 'ate' é inclusivo para o cliente: vira o início do dia seguinte
+        ate = parse_data(request.args['ate']) + timedelta(days=1) if request.args.get('ate') else None
+        evento_id = int(request.args['evento_id']) if request.args.get('evento_id') else None
+    except ValueError:
+        return jsonify({"error": "Parâmetros inválidos (datas em YYYY-MM-DD, evento_id numérico)."}), 400
+
+    dono_id = None if current_user.tipo == 'admin' else current_user.idusuario
+    try:
+        return jsonify({
+            "granularidade": granularidade,
+            "serie": serie_inscricoes(granularidade, dono_id, evento_id, de, ate),
+            "eventos": ocupacao_eventos(dono_id),
+            "por_tipo": inscricoes_por_tipo(dono_id),
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
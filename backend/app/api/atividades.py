@@ -0,0 +1,24 @@
+from flask import request, jsonify
+from . import api_bp
+from ..services.atividades import pagina_atividades, LIMITE_PADRAO
+from flask_login import login_required, current_user
+
+# --- FEED DE ATIVIDADES (paginado por cursor) ---
+# GET /atividades?limite=20            -> primeira página
+# GET /atividades?cursor=<proximo>     -> próxima página
+@api_bp.route('/atividades', methods=['GET'])
+@login_required
+def get_atividades():
+    try:
+        limite = int(request.args.get('limite', LIMITE_PADRAO))
+    except ValueError:
+        return jsonify({"error": "Parâmetro 'limite' deve ser um número."}), 400
+
+    try:
+        itens, proximo = pagina_atividades(current_user, request.args.get('cursor'), limite)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify({"itens": itens, "proximo_cursor": proximo}), 200
@@ -1,11 +1,16 @@
-import requests
 import os
 from flask import Blueprint, request, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
-from playhouse.shortcuts import model_to_dict
 from functools import wraps 
 
 from ..models.usuario import Usuario
+from ..services.atividades import registrar_atividade
+from ..services.concorrencia import (versao_esperada, atualizar_versionado, ConflitoDeVersao,
+                                    resposta_conflito_versao, resposta_versionada)
+from ..services.adiados import ModuloAdiado
+
+# reCAPTCHA do login; importado só no primeiro login
+requests = ModuloAdiado('requests')
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -24,12 +29,14 @@ def register():
         return jsonify({"error": "Email já cadastrado"}), 400
 
     try:
-        novo_usuario = Usuario.create(
-            nome=nome,
-            email=email,
-            senha=senha,
-            telefone=telefone
-        )
+        with Usuario._meta.database.atomic():
+            novo_usuario = Usuario.create(
+                nome=nome,
+                email=email,
+                senha=senha,
+                telefone=telefone
+            )
+            registrar_atividade('usuario', 'criado', novo_usuario.idusuario, nome, novo_usuario.idusuario)
 
         return jsonify({
             "message": "Usuário registrado com sucesso!",
@@ -141,7 +148,8 @@ def list_admins():
                 "email": admin.email,
                 "phone": admin.telefone or "N/A",
                 "joined": "N/A", 
-                "is_admin": False
+                "is_admin": False,
+                "version": admin.version
             } 
             for admin in admins
         ]
@@ -165,12 +173,14 @@ def create_admin():
         return jsonify({"error": "Email já cadastrado"}), 400
     
     try:
-        novo_admin = Usuario.create(
-            nome=nome,
-            email=email,
-            senha=senha, 
-            telefone=telefone
-        )
+        with Usuario._meta.database.atomic():
+            novo_admin = Usuario.create(
+                nome=nome,
+                email=email,
+                senha=senha, 
+                telefone=telefone
+            )
+            registrar_atividade('usuario', 'criado', novo_admin.idusuario, nome, novo_admin.idusuario)
         return jsonify({"message": "Administrador criado", "id": novo_admin.idusuario}), 201
     except Exception as e:
         return jsonify({"error": f"Erro ao criar administrador: {str(e)}"}), 500
@@ -184,7 +194,9 @@ def delete_admin(admin_id):
         if current_user.is_authenticated and current_user.idusuario == admin_id:
             return jsonify({"error": "Não é possível excluir o seu próprio usuário enquanto logado"}), 403
 
-        admin_to_delete.delete_instance()
+        with Usuario._meta.database.atomic():
+            admin_to_delete.delete_instance()
+            registrar_atividade('usuario', 'removido', admin_id, admin_to_delete.nome, admin_id)
         return jsonify({"message": f"Administrador {admin_id} excluído com sucesso"}), 200
     except Usuario.DoesNotExist:
         return jsonify({"error": "Administrador não encontrado"}), 404
@@ -195,6 +207,10 @@ def delete_admin(admin_id):
 @admin_required
 def update_admin(admin_id):
     data = request.json
+    try:
+        esperada = versao_esperada()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     try:
         admin = Usuario.get_by_id(admin_id)
@@ -221,11 +237,14 @@ def update_admin(admin_id):
             return jsonify({"message": "Nenhum dado fornecido para atualização"}), 200
 
         # 3. Executa a atualização
-        query = Usuario.update(updates).where(Usuario.idusuario == admin_id)
-        query.execute()
+        with Usuario._meta.database.atomic():
+            versao = atualizar_versionado(Usuario, admin_id, updates, esperada)
+            registrar_atividade('usuario', 'atualizado', admin_id, updates.get(Usuario.nome, admin.nome), admin_id)
 
-        return jsonify({"message": f"Administrador {admin_id} atualizado com sucesso"}), 200
+        return resposta_versionada({"message": f"Administrador {admin_id} atualizado com sucesso"}, versao), 200
         
+    except ConflitoDeVersao as e:
+        return resposta_conflito_versao(e)
     except Usuario.DoesNotExist:
         return jsonify({"error": "Administrador não encontrado"}), 404
     except Exception as e:
@@ -3,25 +3,58 @@ from . import api_bp
 from ..models.avisos import Aviso;
 
 from flask_login import login_required, current_user
+from ..services.idempotencia import idempotente
+from ..services.estatisticas import ajustar_contagem
+from ..services.atividades import registrar_atividade
+from ..services.campos import Projecao, CampoDesconhecido
+from ..services.arquivamento import unir_arquivo
+from ..services.sincronizacao import registrar_remocoes
+from ..services.concorrencia import (versao_esperada, ConflitoDeVersao, resposta_conflito_versao,
+                                    resposta_versionada)
+from ..services.permissoes import atualizar_como_dono, remover_como_dono, SemPermissao
+from ..services.instantaneos import instantaneo
+from peewee import SQL
+
+# Campos de GET /avisos (?fields=id,titulo,data ...)
+CAMPOS_AVISO = Projecao({
+    "id": ((Aviso.id,), lambda a: a.id),
+    "titulo": ((Aviso.titulo,), lambda a: a.titulo),
+    "categoria": ((Aviso.categoria,), lambda a: a.categoria),
+    "url": ((Aviso.url,), lambda a: a.url if a.url else ""), # Garante string vazia se for None
+    "descricao": ((Aviso.descricao,), lambda a: a.descricao),
+    # Sai como YYYY-MM-DD pelo provider JSON (services/serializacao.py)
+    "data": ((Aviso.data,), lambda a: a.data),
+    "criado_por_id": ((Aviso.criado_por,), lambda a: a.criado_por_id),
+    # Enviar de volta no If-Match ao editar
+    "version": ((Aviso.version,), lambda a: a.version),
+})
+
+
+def _listar_avisos(nomes, colunas):
+    # Busca todos os avisos, ordenados pela data (mais recentes primeiro)
+    return [CAMPOS_AVISO.serializar(a, nomes) for a in Aviso.select(*colunas).order_by(Aviso.data.desc())]
+
+
+# Corpo de GET /avisos sem parâmetros, publicado como arquivo estático (services/instantaneos.py)
+@instantaneo('avisos')
+def instantaneo_avisos():
+    return _listar_avisos(*CAMPOS_AVISO.escolher(None))
 
 @api_bp.route('/avisos', methods=['GET'])
 def get_avisos():
     try:
-        # Busca todos os avisos, ordenados pela data (mais recentes primeiro)
-        avisos = Aviso.select().order_by(Aviso.data.desc())
-        
-        lista_avisos = []
-        for a in avisos:
-            lista_avisos.append({
-                "id": a.id,
-                "titulo": a.titulo,
-                "categoria": a.categoria,
-                "url": a.url if a.url else "", # Garante string vazia se for None
-                "descricao": a.descricao,
-                # Converte objeto date para string (YYYY-MM-DD) para o React não quebrar
-                "data": str(a.data),
-                "criado_por_id": a.criado_por.idusuario if a.criado_por else None
-            })
+        nomes, colunas = CAMPOS_AVISO.escolher(request.args.get('fields'))
+    except CampoDesconhecido as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        if request.args.get('include_archived', '').lower() in ('true', '1', 't'):
+            # Avisos antigos ficam na tabela de arquivo (services/arquivamento.py)
+            colunas = tuple(dict.fromkeys(colunas + (Aviso.data,)))
+            avisos = unir_arquivo(Aviso, colunas).order_by(SQL('"data"').desc())
+            lista_avisos = [CAMPOS_AVISO.serializar(a, nomes) for a in avisos]
+        else:
+            lista_avisos = _listar_avisos(nomes, colunas)
             
         return jsonify(lista_avisos), 200
     except Exception as e:
@@ -32,6 +65,7 @@ def get_avisos():
 # O React envia: { titulo, categoria, descricao, data, url }
 @api_bp.route('/avisos', methods=['POST'])
 @login_required
+@idempotente
 def create_aviso():
     data = request.json
     
@@ -40,14 +74,17 @@ def create_aviso():
         return jsonify({"error": "Campos obrigatórios faltando (titulo, categoria, data)"}), 400
 
     try:
-        novo_aviso = Aviso.create(
-            titulo=data.get('titulo'),
-            categoria=data.get('categoria'),
-            url=data.get('url'),
-            descricao=data.get('descricao'),
-            data=data.get('data'), # O Peewee converte string 'YYYY-MM-DD' automaticamente para DateField
-            criado_por=current_user.idusuario
-        )
+        with Aviso._meta.database.atomic():
+            novo_aviso = Aviso.create(
+                titulo=data.get('titulo'),
+                categoria=data.get('categoria'),
+                url=data.get('url'),
+                descricao=data.get('descricao'),
+                data=data.get('data'), # O Peewee converte string 'YYYY-MM-DD' automaticamente para DateField
+                criado_por=current_user.idusuario
+            )
+            ajustar_contagem(current_user.idusuario, avisos=1)
+            registrar_atividade('aviso', 'criado', novo_aviso.id, novo_aviso.titulo, current_user.idusuario)
         
         return jsonify({
             "message": "Aviso criado com sucesso!", 
@@ -66,25 +103,28 @@ def create_aviso():
 def update_aviso(id):
     data = request.json
     try:
-        aviso = Aviso.get_or_none(Aviso.id == id)
-        
-        if not aviso:
-            return jsonify({"error": "Aviso não encontrado"}), 404
-        
-        # Regra: Admin tudo, Gestor apenas o dele
-        if current_user.tipo != 'admin' and aviso.criado_por.idusuario != current_user.idusuario:
-            return jsonify({"error": "Sem permissão"}), 403
+        esperada = versao_esperada()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    try:
         # Atualiza apenas os campos enviados
-        aviso.titulo = data.get('titulo', aviso.titulo)
-        aviso.categoria = data.get('categoria', aviso.categoria)
-        aviso.url = data.get('url', aviso.url)
-        aviso.descricao = data.get('descricao', aviso.descricao)
-        aviso.data = data.get('data', aviso.data)
+        campos = ('titulo', 'categoria', 'url', 'descricao', 'data')
+        valores = {getattr(Aviso, campo): data[campo] for campo in campos if campo in data}
         
-        aviso.save()
+        with Aviso._meta.database.atomic():
+            # Regra: Admin tudo, Gestor apenas o dele (no WHERE do próprio UPDATE)
+            versao, dono, titulo = atualizar_como_dono(Aviso, id, valores, current_user, esperada)
+            registrar_atividade('aviso', 'atualizado', id, titulo, dono)
         
-        return jsonify({"message": "Aviso atualizado com sucesso!"}), 200
+        return resposta_versionada({"message": "Aviso atualizado com sucesso!"}, versao), 200
+
+    except ConflitoDeVersao as e:
+        return resposta_conflito_versao(e)
+    except Aviso.DoesNotExist:
+        return jsonify({"error": "Aviso não encontrado"}), 404
+    except SemPermissao:
+        return jsonify({"error": "Sem permissão"}), 403
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -94,14 +134,16 @@ def update_aviso(id):
 @login_required
 def delete_aviso(id):
     try:
-        aviso = Aviso.get_or_none(Aviso.id == id)
-        if not aviso: return jsonify({"error": "Não encontrado"}), 404
-
-        if current_user.tipo != 'admin' and aviso.criado_por.idusuario != current_user.idusuario:
-            return jsonify({"error": "Sem permissão"}), 403
-
-        aviso.delete_instance()
+        with Aviso._meta.database.atomic():
+            dono, titulo = remover_como_dono(Aviso, id, current_user)
+            registrar_remocoes('avisos', Aviso, [id])
+            ajustar_contagem(dono, avisos=-1)
+            registrar_atividade('aviso', 'removido', id, titulo, dono)
         return jsonify({"message": "Aviso deletado!"}), 200
+    except Aviso.DoesNotExist:
+        return jsonify({"error": "Não encontrado"}), 404
+    except SemPermissao:
+        return jsonify({"error": "Sem permissão"}), 403
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
\ No newline at end of file
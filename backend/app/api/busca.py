@@ -0,0 +1,21 @@
+from flask import request, jsonify
+from . import api_bp
+from ..services.busca import buscar, LIMITE_PADRAO
+
+# --- BUSCA TEXTUAL EM AVISOS, EVENTOS E AGENDA ---
+# GET /busca?q=batizado                      -> tudo, mais relevantes primeiro
+# GET /busca?q=batizado&tipos=aviso,evento   -> só os tipos pedidos
+@api_bp.route('/busca', methods=['GET'])
+def get_busca():
+    tipos = [t.strip() for t in request.args.get('tipos', '').split(',') if t.strip()]
+    try:
+        limite = int(request.args.get('limit', LIMITE_PADRAO))
+    except ValueError:
+        return jsonify({"error": "Parâmetro 'limit' deve ser um número."}), 400
+
+    try:
+        return jsonify(buscar(request.args.get('q'), tipos, limite)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
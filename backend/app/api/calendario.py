@@ -0,0 +1,55 @@
+from datetime import date
+from flask import Response, request, jsonify, current_app, stream_with_context
+from . import api_bp
+from ..services.recorrencia import calendario
+from ..services.ics import FEEDS, versao_feed, gerar_feed, feed_em_cache, cache_feeds
+
+# --- CALENDÁRIO (horários semanais expandidos + agenda pontual) ---
+# GET /calendario?from=2025-03-01&to=2025-03-31
+@api_bp.route('/calendario', methods=['GET'])
+def get_calendario():
+    try:
+        inicio = date.fromisoformat(request.args['from'])
+        fim = date.fromisoformat(request.args['to'])
+    except (KeyError, ValueError):
+        return jsonify({"error": "Parâmetros 'from' e 'to' são obrigatórios, no formato YYYY-MM-DD."}), 400
+    if inicio > fim:
+        return jsonify({"error": "'from' deve ser anterior ou igual a 'to'."}), 400
+
+    try:
+        return jsonify(calendario(inicio, fim)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# --- FEEDS iCalendar PARA ASSINATURA ---
+# GET /calendario/agenda.ics | /calendario/horarios.ics | /calendario/eventos.ics
+# A ETag é a versão do feed (última atividade que o afeta): um app de calendário que já
+# tem a versão atual recebe 304 sem que o feed seja gerado.
+@api_bp.route('/calendario/<feed>.ics', methods=['GET'])
+def get_feed_ics(feed):
+    if feed not in FEEDS:
+        return jsonify({"error": "Feed não encontrado"}), 404
+
+    try:
+        versao = versao_feed(feed)
+        etag = f"{feed}-{versao}"
+        # Comparação fraca (If-None-Match): vale para a versão comprimida e a original
+        if request.if_none_match.contains_weak(etag):
+            resposta = Response(status=304)
+        else:
+            corpo = cache_feeds.get((feed, versao))
+            if corpo is None:
+                fuso = current_app.config.get('CALENDARIO_FUSO', 'America/Sao_Paulo')
+                corpo = stream_with_context(feed_em_cache(feed, versao, gerar_feed(feed, fuso)))
+            resposta = Response(corpo, mimetype='text/calendar')
+            resposta.headers['Content-Disposition'] = f'inline; filename="{feed}.ics"'
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    # Fraca: a versão identifica o conteúdo, mas o corpo (DTSTAMP, compressão) pode variar
+    resposta.set_etag(etag, weak=True)
+    resposta.headers['Cache-Control'] = 'public, max-age=300'
+    return resposta
@@ -1,81 +1,119 @@
-from flask import jsonify
+from flask import jsonify, current_app
+from peewee import Value, Select
 from . import api_bp
-from ..models.eventos import Evento;
-from ..models.agenda import Agenda;
-from ..models.avisos import Aviso;
+from ..models.atividade import Atividade
+from ..services.atividades import consulta_atividades, ROTULOS
+from ..services.estatisticas import consulta_estatisticas
+from ..services.cache import Cache
+from ..services.sinais import conteudo_alterado
+from ..services.versao import consultas_versao, versao_das_linhas, versao_conteudo, registrar_versao
 from flask_login import login_required, current_user
 
-# --- ROTA DASHBOARD (NOVA) ---
-@api_bp.route('/dashboard', methods=['GET'])
-@login_required # Importante: Identifica quem está logado
-def get_dashboard_data():
-    try:
-        user = current_user
-        
-        # Define o filtro base: Admin vê tudo, Gestor vê apenas o dele
-        if user.tipo == 'admin':
-            # Consultas globais
-            q_eventos = Evento.select()
-            q_avisos = Aviso.select()
-            q_agenda = Agenda.select()
-        else:
-            # Consultas filtradas por dono
-            q_eventos = Evento.select().where(Evento.criado_por == user.idusuario)
-            q_avisos = Aviso.select().where(Aviso.criado_por == user.idusuario)
-            q_agenda = Agenda.select().where(Agenda.criado_por == user.idusuario)
-
-        # 1. Contagens para os Cards
-        stats = {
-            "eventos": q_eventos.count(),
-            "avisos": q_avisos.count(),
-            "agenda": q_agenda.count(),
-            "horarios": Agenda.select().where(Agenda.is_public == True).count() # Horários públicos todos veem
-        }
-
-        # 2. Atividade Recente filtrada
-        recent_activity = []
-
-        # Eventos recentes do usuário (ou todos se admin)
-        last_eventos = q_eventos.order_by(Evento.id.desc()).limit(3)
-        for e in last_eventos:
-            recent_activity.append({
-                "action": "Evento Registrado",
-                "item": e.titulo,
-                "type": "evento",
-                "sort_id": e.id * 1000
-            })
+# Quantidade de itens em "Atividade Recente"
+ATIVIDADE_RECENTE = 5
+_COLUNAS_ATIVIDADE = ('titulo', 'tipo', 'acao', 'created_at')
+
+# Respostas prontas: uma entrada por gestor e uma única compartilhada por todos os admins,
+# guardadas como (versão do conteúdo, dados): ver services/versao.py. A reconciliação noturna
+# das contagens só corrige divergências: nos outros processos ela aparece em até DASHBOARD_CACHE_TTL
+cache_dashboard = Cache('dashboard', max_itens=2048)
+CHAVE_ADMIN = 'admin'
+
+
+def chave_dashboard(user):
+    return CHAVE_ADMIN if user.tipo == 'admin' else f"user:{user.idusuario}"
+
+
+@conteudo_alterado.connect
+def _invalidar_dashboard(tipo, dono_id=None, **extra):
+    # Horários públicos contam para todos; sem dono conhecido não dá para ser seletivo
+    if tipo == 'horario' or dono_id is None:
+        cache_dashboard.limpar()
+    else:
+        cache_dashboard.invalidar(CHAVE_ADMIN, f"user:{dono_id}")
 
-        # Avisos recentes
-        last_avisos = q_avisos.order_by(Aviso.id.desc()).limit(3)
-        for a in last_avisos:
-            recent_activity.append({
-                "action": "Aviso Publicado",
-                "item": a.titulo,
-                "type": "aviso",
-                "sort_id": a.id * 1000
-            })
 
-        # Agendas recentes
-        last_agenda = q_agenda.order_by(Agenda.id.desc()).limit(3)
-        for ag in last_agenda:
+def _atividade_recente(user):
+    # ORDER BY/LIMIT dentro de um UNION ALL exige subconsulta (no SQLite inclusive)
+    sub = (consulta_atividades(user)
+           .select(Value('atividade').alias('kind'), Atividade.id.alias('num'),
+                   *[getattr(Atividade, c).alias(c) for c in _COLUNAS_ATIVIDADE])
+           .limit(ATIVIDADE_RECENTE)
+           .alias('atividade_recente'))
+    return Select([sub], [sub.c.kind, sub.c.num] + [getattr(sub.c, c) for c in _COLUNAS_ATIVIDADE])
+
+
+def montar_dashboard(user):
+    """
+    Monta os dados do dashboard em um único round trip: um SELECT ... UNION ALL com
+    as quatro contagens (lidas de EstatisticaConteudo, ver services/estatisticas.py),
+    a versão do conteúdo e as últimas alterações do log de atividades, no formato
+    (kind, num, titulo, tipo, acao, created_at). Retorna (versão, dados).
+    """
+    consultas = [
+        c.select_extend(*[Value(None).alias(col) for col in _COLUNAS_ATIVIDADE])
+        for c in consulta_estatisticas(user) + consultas_versao()
+    ]
+    consultas.append(_atividade_recente(user))
+    query = consultas[0]
+    for consulta in consultas[1:]:
+        query = query.union_all(consulta)
+
+    # 1. Contagens para os Cards / 2. Atividade Recente filtrada
+    stats = {}
+    versao = {}
+    recent_activity = []
+    for kind, num, titulo, tipo, acao, created_at in query.tuples():
+        if kind == 'atividade':
+            created_at = Atividade.created_at.python_value(created_at)
             recent_activity.append({
-                "action": "Novo Agendamento",
-                "item": f"{ag.titulo}",
-                "type": "agenda",
-                "sort_id": ag.id * 1000
+                "action": ROTULOS.get((tipo, acao), acao),
+                "item": titulo,
+                "type": tipo,
+                "sort_id": num,
+                "created_at": created_at.isoformat(),
             })
+        elif kind.startswith('versao_'):
+            versao[kind] = num
+        else:
+            stats[kind[len('total_'):]] = num
+
+    # Mais recente primeiro (o UNION ALL não garante a ordem da subconsulta)
+    recent_activity.sort(key=lambda x: (x['created_at'], x['sort_id']), reverse=True)
+
+    return versao_das_linhas(versao.items()), {
+        "stats": {k: stats.get(k, 0) for k in ("eventos", "avisos", "agenda", "horarios")},
+        "activity": recent_activity,
+        "user_role": user.tipo # Informativo para o front
+    }
+
+
+def dashboard_atual(user, ttl=None):
+    """
+    Resposta do cache se ninguém (em nenhum processo) alterou o conteúdo desde que foi
+    montada; senão remonta, na mesma consulta que já traz a versão nova.
+    """
+    chave = chave_dashboard(user)
+    guardado = cache_dashboard.get(chave)
+    if guardado is not None and guardado[0] == versao_conteudo():
+        return guardado[1]
+    versao, dados = montar_dashboard(user)
+    registrar_versao(versao)
+    cache_dashboard.set(chave, (versao, dados), ttl)
+    return dados
 
-        recent_activity.sort(key=lambda x: x['sort_id'], reverse=True)
-        
-        return jsonify({
-            "stats": stats,
-            "activity": recent_activity[:5],
-            "user_role": user.tipo # Informativo para o front
-        }), 200
+
+# --- ROTA DASHBOARD (NOVA) ---
+@api_bp.route('/dashboard', methods=['GET'])
+@login_required # Importante: Identifica quem está logado
+def get_dashboard_data():
+    try:
+        dados = dashboard_atual(current_user, ttl=current_app.config.get('DASHBOARD_CACHE_TTL'))
+        return jsonify(dados), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    
+
 @api_bp.route('/hello', methods=['GET'])
 def hello_dashboard():
-    return jsonify({"message": "Hello from Dashboard API!"}), 200
\ No newline at end of file
+    return jsonify({"message": "Hello from Dashboard API!"}), 200
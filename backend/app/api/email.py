@@ -4,8 +4,8 @@ from ..models.eventos import Evento;
 from ..models.inscricao_evento import InscricaoEvento;
 from ..models.agenda import Agenda;
 from ..models.avisos import Aviso;
-from flask_mail import Message
 from ..extensions import mail
+from ..services.correio import flask_mail
 from flask_login import login_required, current_user
 
 # O prefixo /api/v1 já foi definido no create_app
@@ -32,7 +32,7 @@ def send_email():
             return jsonify({'error': 'Campos obrigatórios (Nome, Email, Assunto, Mensagem) estão faltando.'}), 400
 
         # Criação da Mensagem
-        msg = Message(
+        msg = flask_mail.Message(
             subject=f"[Mensagem de Contato] - {subject}",
             sender=current_app.config['MAIL_DEFAULT_SENDER'],
             recipients=[current_app.config['TARGET_EMAIL']], 
@@ -1,33 +1,58 @@
-import requests # <--- ADICIONADO: Para falar com o Google
 import os
 from flask import request, jsonify
 from . import api_bp
 from ..models.eventos import Evento;
 from ..models.inscricao_evento import InscricaoEvento;
 from flask_login import login_required, current_user
+from ..services.idempotencia import idempotente
+from ..services.telefone import normalizar_telefone
+from ..services.estatisticas import ajustar_contagem
+from ..services.atividades import registrar_atividade
+from ..services.vagas import publicar_vagas
+from ..services.campos import Projecao, CampoDesconhecido
+from ..services.conflitos import verificar_reserva, resposta_conflito
+from ..services.arquivamento import unir_arquivo
+from ..services.sincronizacao import registrar_remocoes
+from ..services.concorrencia import (versao_esperada, ConflitoDeVersao, resposta_conflito_versao,
+                                    resposta_versionada)
+from ..services.permissoes import atualizar_como_dono, remover_como_dono, condicao_de_dono, SemPermissao
+from ..services.instantaneos import instantaneo
+from ..models.arquivo import EventoArquivado, InscricaoArquivada
+from ..services.adiados import ModuloAdiado
+from peewee import PostgresqlDatabase, EXCLUDED, SQL, fn
+
+# Para falar com o Google (reCAPTCHA); importado só na primeira inscrição
+requests = ModuloAdiado('requests')
 
 # --- ROTA EVENTOS ---
 
 @api_bp.route('/eventos', methods=['POST'])
 @login_required
+@idempotente
 def create_evento():
     data = request.json
     
     try:
-        # Cria o evento usando o Peewee
-        novo_evento = Evento.create(
-            titulo=data.get('titulo'),
-            tipo=data.get('tipo'),
-            local=data.get('local'),
-            tipo_vagas=data.get('tipo_vagas'),
-            # Converte para int se houver valor, senão None
-            numero_vagas=int(data.get('numero_vagas')) if data.get('numero_vagas') else None,
-            data=data.get('data'),
-            horario=data.get('horario'),
-            descricao=data.get('descricao'),
-            criado_por=current_user.idusuario
-            
-        )
+        # Cria o evento usando o Peewee (e atualiza as contagens do dashboard na mesma transação)
+        with Evento._meta.database.atomic():
+            conflitos = verificar_reserva(Evento._meta.database, data)
+            if conflitos:
+                return jsonify(resposta_conflito(conflitos)), 409
+
+            novo_evento = Evento.create(
+                titulo=data.get('titulo'),
+                tipo=data.get('tipo'),
+                local=data.get('local'),
+                tipo_vagas=data.get('tipo_vagas'),
+                # Converte para int se houver valor, senão None
+                numero_vagas=int(data.get('numero_vagas')) if data.get('numero_vagas') else None,
+                data=data.get('data'),
+                horario=data.get('horario'),
+                descricao=data.get('descricao'),
+                criado_por=current_user.idusuario
+            )
+            ajustar_contagem(current_user.idusuario, eventos=1)
+            registrar_atividade('evento', 'criado', novo_evento.id, novo_evento.titulo, current_user.idusuario)
         
         return jsonify({
             "message": "Evento criado com sucesso!",
@@ -37,31 +62,62 @@ def create_evento():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+# Total de inscritos de cada evento: subconsulta correlacionada (usa o índice (evento, numero))
+_inscritos = (InscricaoEvento
+              .select(fn.COUNT(InscricaoEvento.id))
+              .where(InscricaoEvento.evento == Evento.id)
+              .alias('registered_count'))
+# O mesmo para os eventos arquivados
+_inscritos_arquivados = (InscricaoArquivada
+                         .select(fn.COUNT(InscricaoArquivada.id))
+                         .where(InscricaoArquivada.evento == EventoArquivado.id)
+                         .alias('registered_count'))
+
+# Campos de GET /eventos (?fields=id,titulo,registered_count ...)
+CAMPOS_EVENTO = Projecao({
+    "id": ((Evento.id,), lambda e: e.id),
+    "titulo": ((Evento.titulo,), lambda e: e.titulo),
+    "tipo": ((Evento.tipo,), lambda e: e.tipo),
+    "local": ((Evento.local,), lambda e: e.local),
+    "tipo_vagas": ((Evento.tipo_vagas,), lambda e: e.tipo_vagas),
+    "numero_vagas": ((Evento.numero_vagas,), lambda e: e.numero_vagas),
+    "data": ((Evento.data,), lambda e: e.data),
+    "horario": ((Evento.horario,), lambda e: e.horario),
+    "descricao": ((Evento.descricao,), lambda e: e.descricao),
+    "registered_count": ((_inscritos,), lambda e: e.registered_count),
+    "criado_por": ((Evento.criado_por,), lambda e: e.criado_por_id),
+    # Enviar de volta no If-Match ao editar
+    "version": ((Evento.version,), lambda e: e.version),
+})
+
+
+def _listar_eventos(nomes, colunas):
+    return [CAMPOS_EVENTO.serializar(e, nomes) for e in Evento.select(*colunas).order_by(Evento.id)]
+
+
+# Corpo de GET /eventos sem parâmetros, publicado como arquivo estático (services/instantaneos.py)
+@instantaneo('eventos')
+def instantaneo_eventos():
+    return _listar_eventos(*CAMPOS_EVENTO.escolher(None))
+
 @api_bp.route('/eventos', methods=['GET'])
 def get_eventos():
     try:
-        # Busca todos os eventos. 
-        # NOTA: Usamos a propriedade 'inscricoes' (backref) do modelo Evento.
-        eventos = Evento.select()
-        
-        lista_eventos = []
-        for e in eventos:
-            total = InscricaoEvento.select().where(InscricaoEvento.evento == e.id).count()
-            # Realiza a contagem de inscritos para cada evento
-
-            lista_eventos.append({
-                "id": e.id,
-                "titulo": e.titulo,
-                "tipo": e.tipo,
-                "local": e.local,
-                "tipo_vagas": e.tipo_vagas,
-                "numero_vagas": e.numero_vagas,
-                "data": str(e.data), 
-                "horario": str(e.horario),
-                "descricao": e.descricao,
-                "registered_count": total, # <<< CAMPO NOVO COM A CONTAGEM
-                "criado_por": e.criado_por.idusuario if e.criado_por else None
-            })
+        nomes, colunas = CAMPOS_EVENTO.escolher(request.args.get('fields'))
+    except CampoDesconhecido as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # Um único SELECT, só com as colunas pedidas; a contagem de inscritos
+        # vem da subconsulta (sem uma consulta extra por evento)
+        if request.args.get('include_archived', '').lower() in ('true', '1', 't'):
+            # Eventos passados ficam na tabela de arquivo (services/arquivamento.py)
+            colunas = tuple(dict.fromkeys(colunas + (Evento.id,)))
+            eventos = (unir_arquivo(Evento, colunas, trocas=[(_inscritos, _inscritos_arquivados)])
+                       .order_by(SQL('"id"')))
+            lista_eventos = [CAMPOS_EVENTO.serializar(e, nomes) for e in eventos]
+        else:
+            lista_eventos = _listar_eventos(nomes, colunas)
             
         return jsonify(lista_eventos), 200
     except Exception as e:
@@ -73,29 +129,36 @@ def get_eventos():
 def update_evento(id):
     data = request.json
     try:
-        # Busca o evento pelo ID
-        evento = Evento.get_or_none(Evento.id == id)
-        if not evento:
-            return jsonify({"error": "Evento não encontrado"}), 404
-        
-        # Lógica de Permissão
-        if current_user.tipo != 'admin' and evento.criado_por.idusuario != current_user.idusuario:
-            return jsonify({"error": "Sem permissão"}), 403
+        esperada = versao_esperada()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    try:
         # Atualiza os campos
-        evento.titulo = data.get('titulo')
-        evento.tipo = data.get('tipo')
-        evento.local = data.get('local')
-        evento.tipo_vagas = data.get('tipo_vagas')
-        evento.numero_vagas = int(data.get('numero_vagas')) if data.get('numero_vagas') else None
-        evento.data = data.get('data')
-        evento.horario = data.get('horario')
-        evento.descricao = data.get('descricao')
+        valores = {
+            Evento.titulo: data.get('titulo'),
+            Evento.tipo: data.get('tipo'),
+            Evento.local: data.get('local'),
+            Evento.tipo_vagas: data.get('tipo_vagas'),
+            Evento.numero_vagas: int(data.get('numero_vagas')) if data.get('numero_vagas') else None,
+            Evento.data: data.get('data'),
+            Evento.horario: data.get('horario'),
+            Evento.descricao: data.get('descricao'),
+        }
         
-        evento.save() # Salva as alterações no banco
+        with Evento._meta.database.atomic():
+            # Um UPDATE só: permissão (dono ou admin) e versão do If-Match no WHERE
+            versao, dono, titulo = atualizar_como_dono(Evento, id, valores, current_user, esperada)
+            registrar_atividade('evento', 'atualizado', id, titulo, dono)
         
-        return jsonify({"message": "Evento atualizado com sucesso!"}), 200
+        return resposta_versionada({"message": "Evento atualizado com sucesso!"}, versao), 200
 
+    except ConflitoDeVersao as e:
+        return resposta_conflito_versao(e)
+    except Evento.DoesNotExist:
+        return jsonify({"error": "Evento não encontrado"}), 404
+    except SemPermissao:
+        return jsonify({"error": "Sem permissão"}), 403
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -104,16 +167,24 @@ def update_evento(id):
 @login_required
 def delete_evento(id):
     try:
-        evento = Evento.get_or_none(Evento.id == id)
-        if not evento:
-            return jsonify({"error": "Não encontrado"}), 404
-
-        # Lógica de Permissão
-        if current_user.tipo != 'admin' and evento.criado_por.idusuario != current_user.idusuario:
-            return jsonify({"error": "Sem permissão"}), 403
-
-        evento.delete_instance()
+        with Evento._meta.database.atomic():
+            # As inscrições saem junto (ON DELETE CASCADE): lápides para elas também, só se o
+            # evento puder ser removido por quem pede (nada é gravado para outro dono)
+            do_evento = InscricaoEvento.evento == id
+            dono_evento = condicao_de_dono(Evento, current_user)
+            if dono_evento is not None:
+                do_evento &= InscricaoEvento.evento.in_(Evento.select(Evento.id).where(dono_evento))
+            registrar_remocoes('inscricoes', InscricaoEvento, do_evento)
+            # DELETE ... RETURNING: sem buscar o evento (nem o dono) antes
+            dono, titulo = remover_como_dono(Evento, id, current_user)
+            registrar_remocoes('eventos', Evento, [id])
+            ajustar_contagem(dono, eventos=-1)
+            registrar_atividade('evento', 'removido', id, titulo, dono)
         return jsonify({"message": "Excluído"}), 200
+    except Evento.DoesNotExist:
+        return jsonify({"error": "Não encontrado"}), 404
+    except SemPermissao:
+        return jsonify({"error": "Sem permissão"}), 403
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -123,6 +194,7 @@ def delete_evento(id):
 # --- ROTA INSCRIÇÃO DE EVENTOS ---
 
 @api_bp.route('/eventos/<int:evento_id>/inscricao', methods=['POST'])
+@idempotente
 def create_inscricao(evento_id):
     data = request.json
     
@@ -166,6 +238,10 @@ def create_inscricao(evento_id):
         evento = Evento.get_or_none(Evento.id == evento_id)
         if not evento:
             return jsonify({"error": "Evento não encontrado para inscrição."}), 404
+
+        numero = normalizar_telefone(data.get('telefone'))
+        if not numero or len(numero) > 13:
+            return jsonify({"error": "Telefone inválido."}), 400
             
         # 4. Verifica limite de vagas (se for limitado)
         if evento.tipo_vagas == 'limitada' and evento.numero_vagas is not None:
@@ -173,22 +249,66 @@ def create_inscricao(evento_id):
             total_inscritos = InscricaoEvento.select().where(InscricaoEvento.evento == evento).count()
             
             if total_inscritos >= evento.numero_vagas:
+                # Quem já está inscrito recebe a própria inscrição, mesmo com o evento lotado
+                existente = InscricaoEvento.get_or_none(
+                    (InscricaoEvento.evento == evento) & (InscricaoEvento.numero == numero)
+                )
+                if existente:
+                    return _resposta_inscricao(existente.id, criada=False)
                 return jsonify({"error": "As vagas para este evento já estão esgotadas."}), 403
 
-        # 5. Cria a inscrição no banco
-        InscricaoEvento.create(
-            nome=data.get('nome'),
-            numero=data.get('telefone'), # O seu modelo chama o campo de telefone de 'numero'
-            evento=evento # Peewee lida com a Foreign Key
-        )
+        # 5. Cria a inscrição no banco (ou devolve a já existente para este telefone)
+        with InscricaoEvento._meta.database.atomic():
+            inscricao_id, criada = _inserir_ou_obter_inscricao(evento.id, data.get('nome'), numero)
+            if criada:
+                registrar_atividade('inscricao', 'criado', inscricao_id, evento.titulo, evento.criado_por_id)
+
+        # Depois do COMMIT: atualiza quem acompanha as vagas ao vivo
+        if criada:
+            publicar_vagas(evento)
         
-        return jsonify({"message": "Inscrição realizada com sucesso!"}), 201
+        return _resposta_inscricao(inscricao_id, criada)
         
     except Exception as e:
         print(f"Erro ao criar inscrição: {e}")
         return jsonify({"error": "Erro interno ao processar a inscrição."}), 500
 
 
+def _resposta_inscricao(inscricao_id, criada):
+    if criada:
+        return jsonify({"message": "Inscrição realizada com sucesso!", "id": inscricao_id}), 201
+    return jsonify({"message": "Você já está inscrito neste evento.", "id": inscricao_id}), 200
+
+
+def _inserir_ou_obter_inscricao(evento_id, nome, numero):
+    """
+    Insere a inscrição contando com o índice único (evento, numero).
+    Retorna (id, criada). No Postgres uma re-inscrição custa um único
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING; 'xmax = 0' indica se a linha é nova.
+    """
+    alvo = [InscricaoEvento.evento, InscricaoEvento.numero]
+    query = InscricaoEvento.insert(nome=nome, numero=numero, evento=evento_id)
+
+    if isinstance(InscricaoEvento._meta.database, PostgresqlDatabase):
+        linha = (query
+                 .on_conflict(conflict_target=alvo, update={InscricaoEvento.numero: EXCLUDED.numero})
+                 .returning(InscricaoEvento.id, SQL('(xmax = 0)'))
+                 .tuples()
+                 .execute())
+        inscricao_id, criada = list(linha)[0]
+        return inscricao_id, criada
+
+    # Demais bancos (SQLite dos testes): DO NOTHING e busca a existente só em caso de conflito
+    linha = list(query.on_conflict(conflict_target=alvo, action='IGNORE')
+                 .returning(InscricaoEvento.id).tuples().execute())
+    if linha:
+        return linha[0][0], True
+    existente = InscricaoEvento.get(
+        (InscricaoEvento.evento == evento_id) & (InscricaoEvento.numero == numero)
+    )
+    return existente.id, False
+
+
 # --- ROTA LISTAGEM DE INSCRITOS (Para a Secretaria) ---
 
 @api_bp.route('/eventos/<int:evento_id>/inscricoes', methods=['GET'])
@@ -203,9 +323,7 @@ def get_inscricoes_evento(evento_id):
                 "id": i.id,
                 "nome": i.nome,
                 "telefone": i.numero,
-                # O Peewee pode ter um campo 'data_inscricao' se você o adicionou, 
-                # mas vou usar um padrão se não houver um campo explícito no seu modelo
-                "data_inscricao": i.data_criacao if hasattr(i, 'data_criacao') else "N/A" 
+                "data_inscricao": i.created_at.isoformat() if i.created_at else "N/A"
             })
             
         return jsonify(lista_inscricoes), 200
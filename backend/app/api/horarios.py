@@ -2,25 +2,39 @@ from flask import request, jsonify
 from . import api_bp
 from ..models.agenda import Agenda;
 from flask_login import login_required, current_user
+from ..services.estatisticas import ajustar_contagem, contagem_agenda
+from ..services.atividades import registrar_atividade
+from ..services.conflitos import verificar_horario_semanal, resposta_conflito
+from ..services.sincronizacao import registrar_remocoes
+from ..services.concorrencia import (versao_esperada, atualizar_versionado, ConflitoDeVersao,
+                                    resposta_conflito_versao, resposta_versionada)
+from ..services.instantaneos import instantaneo
+
+
+# Também publicado como arquivo estático (services/instantaneos.py)
+@instantaneo('horarios')
+def listar_horarios():
+    # Busca apenas os itens da agenda que são públicos
+    agendas = Agenda.select().where(Agenda.is_public == True).order_by(Agenda.horario.asc())
+
+    lista = []
+    for a in agendas:
+        lista.append({
+            "id": a.id,
+            "dia": a.dia_semana, 
+            "titulo": a.titulo,
+            "horario": a.horario,
+            "local": a.local,
+            "version": a.version
+        })
+    return lista
 
 
 # 1. LISTAR (GET)
 @api_bp.route('/horarios', methods=['GET'])
 def get_horarios_publicos():
     try:
-        # Busca apenas os itens da agenda que são públicos
-        agendas = Agenda.select().where(Agenda.is_public == True).order_by(Agenda.horario.asc())
-        
-        lista = []
-        for a in agendas:
-            lista.append({
-                "id": a.id,
-                "dia": a.dia_semana, 
-                "titulo": a.titulo,
-                "horario": str(a.horario),
-                "local": a.local
-            })
-        return jsonify(lista), 200
+        return jsonify(listar_horarios()), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -30,14 +44,21 @@ def create_horario_publico():
     data = request.json
     try:
         # Ao criar pela tela de horários, is_public é sempre True
-        nova_agenda = Agenda.create(
-            titulo=data.get('titulo'),
-            dia_semana=data.get('dia'),
-            horario=data.get('horario'),
-            local=data.get('local'),
-            is_public=True,
-            criado_por=current_user.idusuario
-        )
+        with Agenda._meta.database.atomic():
+            conflitos = verificar_horario_semanal(Agenda._meta.database, data)
+            if conflitos:
+                return jsonify(resposta_conflito(conflitos)), 409
+
+            nova_agenda = Agenda.create(
+                titulo=data.get('titulo'),
+                dia_semana=data.get('dia'),
+                horario=data.get('horario'),
+                local=data.get('local'),
+                is_public=True,
+                criado_por=current_user.idusuario
+            )
+            ajustar_contagem(current_user.idusuario, **contagem_agenda(True))
+            registrar_atividade('horario', 'criado', nova_agenda.id, nova_agenda.titulo, current_user.idusuario)
         return jsonify({"message": "Horário público criado!", "id": nova_agenda.id}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -48,17 +69,25 @@ def create_horario_publico():
 def update_horario(id):
     data = request.json
     try:
-        horario = Agenda.get_or_none(Agenda.id == id)
-        if not horario:
-            return jsonify({"error": "Horário não encontrado"}), 404
+        esperada = versao_esperada()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        horario.dia_semana = data.get('dia', horario.dia_semana)
-        horario.titulo = data.get('titulo', horario.titulo) # Atualiza titulo
-        horario.horario = data.get('horario', horario.horario)
-        horario.local = data.get('local', horario.local)
+    try:
+        # Só os campos enviados: o que faltar continua como está no banco, sem lê-lo antes
+        campos = {'dia': Agenda.dia_semana, 'titulo': Agenda.titulo, 'horario': Agenda.horario, 'local': Agenda.local}
+        valores = {coluna: data[chave] for chave, coluna in campos.items() if chave in data}
         
-        horario.save()
-        return jsonify({"message": "Horário atualizado!"}), 200
+        with Agenda._meta.database.atomic():
+            # Um UPDATE só: o dono e o título vêm do RETURNING (item inexistente vira 404)
+            versao, dono, titulo = atualizar_versionado(Agenda, id, valores, esperada,
+                                                        retornar=(Agenda.criado_por, Agenda.titulo))
+            registrar_atividade('horario', 'atualizado', id, titulo, dono)
+        return resposta_versionada({"message": "Horário atualizado!"}, versao), 200
+    except ConflitoDeVersao as e:
+        return resposta_conflito_versao(e)
+    except Agenda.DoesNotExist:
+        return jsonify({"error": "Horário não encontrado"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -67,10 +96,16 @@ def update_horario(id):
 @login_required
 def delete_horario(id):
     try:
-        query = Agenda.delete().where(Agenda.id == id)
-        rows = query.execute()
-        if rows == 0:
-            return jsonify({"error": "Horário não encontrado"}), 404
+        with Agenda._meta.database.atomic():
+            # RETURNING traz o dono sem precisar buscar o item antes
+            query = Agenda.delete().where(Agenda.id == id).returning(Agenda.criado_por, Agenda.is_public, Agenda.titulo)
+            rows = list(query.tuples().execute())
+            if not rows:
+                return jsonify({"error": "Horário não encontrado"}), 404
+            dono, is_public, titulo = rows[0]
+            registrar_remocoes('agenda', Agenda, [id])
+            ajustar_contagem(dono, **contagem_agenda(is_public, -1))
+            registrar_atividade('horario', 'removido', id, titulo, dono)
         return jsonify({"message": "Horário removido!"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
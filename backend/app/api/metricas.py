@@ -0,0 +1,13 @@
+from flask import jsonify
+from . import api_bp
+from .auth_routes import admin_required
+from ..extensions import agendador
+from ..services.metricas import metricas
+
+# --- ROTA DE MÉTRICAS (apenas admin) ---
+@api_bp.route('/metricas', methods=['GET'])
+@admin_required
+def get_metricas():
+    dados = metricas.snapshot()
+    dados["tarefas"] = agendador.estado()
+    return jsonify(dados), 200
@@ -0,0 +1,89 @@
+from datetime import datetime
+from flask import request, jsonify, current_app
+from flask_login import current_user
+from . import api_bp
+from ..models.eventos import Evento
+from ..models.avisos import Aviso
+from ..models.agenda import Agenda
+from ..models.inscricao_evento import InscricaoEvento
+from .eventos import CAMPOS_EVENTO
+from .avisos import CAMPOS_AVISO
+from .agenda import CAMPOS_AGENDA
+from ..services.sincronizacao import (codificar_cursor, inicio_da_janela, remocoes_desde,
+                                      CursorExpirado, RETENCAO_PADRAO_DIAS)
+
+# Conjunto -> (modelo, campos no mesmo formato das listagens)
+CONJUNTOS = {
+    "eventos": (Evento, CAMPOS_EVENTO),
+    "avisos": (Aviso, CAMPOS_AVISO),
+    "agenda": (Agenda, CAMPOS_AGENDA),
+}
+
+
+def _inscricao(i):
+    return {
+        "id": i.id,
+        "evento_id": i.evento_id,
+        "nome": i.nome,
+        "telefone": i.numero,
+        "data_inscricao": i.created_at.isoformat() if i.created_at else None,
+    }
+
+
+def _alterados(modelo, campos, desde):
+    nomes, colunas = campos.escolher(None)
+    query = modelo.select(*colunas)
+    if desde is not None:
+        # Varredura do índice em updated_at
+        condicao = modelo.updated_at >= desde
+        if modelo is Evento:
+            # registered_count muda com as inscrições, sem alterar o evento
+            condicao |= Evento.id.in_(InscricaoEvento
+                                      .select(InscricaoEvento.evento)
+                                      .where(InscricaoEvento.updated_at >= desde))
+        query = query.where(condicao)
+    return [campos.serializar(linha, nomes) for linha in query.order_by(modelo.id)]
+
+
+def _inscricoes_alteradas(desde):
+    """Inscrições (dados pessoais): só para usuários logados, e o gestor só vê as dos seus eventos."""
+    query = InscricaoEvento.select()
+    if current_user.tipo != 'admin':
+        query = query.join(Evento).where(Evento.criado_por == current_user.idusuario)
+    if desde is not None:
+        query = query.where(InscricaoEvento.updated_at >= desde)
+    return [_inscricao(i) for i in query.order_by(InscricaoEvento.id)]
+
+
+# --- SINCRONIZAÇÃO INCREMENTAL ---
+# GET /sync                -> tudo + cursor (primeira carga)
+# GET /sync?since=<cursor> -> só o que mudou desde o cursor: linhas alteradas e ids removidos
+# Cursor expirado (lápides já purgadas) -> 410: o cliente descarta o cache e começa de novo
+@api_bp.route('/sync', methods=['GET'])
+def get_sync():
+    # O cursor novo é o instante anterior às consultas: nada escrito durante elas se perde
+    agora = datetime.now()
+    retencao = current_app.config.get('SYNC_RETENCAO_DIAS', RETENCAO_PADRAO_DIAS)
+    since = request.args.get('since')
+    try:
+        desde = inicio_da_janela(since, retencao, agora) if since else None
+    except CursorExpirado as e:
+        return jsonify({"error": str(e)}), 410
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        alterados = {chave: _alterados(modelo, campos, desde) for chave, (modelo, campos) in CONJUNTOS.items()}
+        tipos = list(CONJUNTOS)
+        if current_user.is_authenticated:
+            alterados["inscricoes"] = _inscricoes_alteradas(desde)
+            tipos.append("inscricoes")
+
+        return jsonify({
+            "cursor": codificar_cursor(agora),
+            "completo": desde is None,
+            "alterados": alterados,
+            "removidos": remocoes_desde(desde, tipos) if desde is not None else {t: [] for t in tipos},
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
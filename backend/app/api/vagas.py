@@ -0,0 +1,92 @@
+import json
+from flask import Response, request, jsonify, current_app
+from . import api_bp
+from ..models.eventos import Evento
+from ..services.cache import Cache
+from ..services.vagas import transmissor, contagem_vagas, topico_evento, TOPICO_TODOS
+
+# --- VAGAS DE VÁRIOS EVENTOS ---
+# GET /eventos/vagas?ids=1,2,3 -> inscritos e vagas restantes dos cards visíveis
+MAXIMO_IDS = 100
+# Segundos em que a mesma lista de ids é respondida sem ir ao banco (e max-age para o navegador/proxy)
+VALIDADE_VAGAS = 2
+
+cache_vagas = Cache('vagas', max_itens=1024, ttl=VALIDADE_VAGAS)
+
+
+@api_bp.route('/eventos/vagas', methods=['GET'])
+def get_vagas_eventos():
+    try:
+        ids = sorted({int(i) for i in request.args.get('ids', '').split(',') if i.strip()})
+    except ValueError:
+        return jsonify({"error": "Parâmetro 'ids' deve ser uma lista de números separados por vírgula."}), 400
+    if not ids:
+        return jsonify({"error": "Informe ao menos um id em 'ids'."}), 400
+    if len(ids) > MAXIMO_IDS:
+        return jsonify({"error": f"No máximo {MAXIMO_IDS} eventos por requisição."}), 400
+
+    try:
+        # Eventos inexistentes simplesmente não aparecem na resposta
+        dados = cache_vagas.obter_ou_calcular(tuple(ids), lambda: contagem_vagas(ids))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    resposta = jsonify(dados)
+    resposta.headers['Cache-Control'] = f"public, max-age={VALIDADE_VAGAS}"
+    return resposta, 200
+
+
+# --- VAGAS AO VIVO (Server-Sent Events) ---
+# GET /eventos/vagas/stream          -> todos os eventos
+# GET /eventos/<id>/vagas/stream     -> um evento
+# Ao conectar, o cliente recebe a situação atual; depois, uma mensagem a cada
+# inscrição confirmada. Os assinantes não consultam o banco (ver services/vagas.py).
+
+def _mensagem_sse(dados, evento='vagas'):
+    return f"event: {evento}\ndata: {json.dumps(dados)}\n\n"
+
+
+def _fluxo(assinatura, iniciais, keepalive):
+    for situacao in iniciais:
+        yield _mensagem_sse(situacao)
+    while True:
+        situacao = assinatura.receber(timeout=keepalive)
+        # Comentário SSE periódico: mantém proxies abertos e detecta clientes que saíram
+        yield _mensagem_sse(situacao) if situacao is not None else ": ping\n\n"
+
+
+def _resposta_sse(topico, evento_ids=None):
+    # Assina antes de ler a situação atual para não perder inscrições no meio do caminho
+    assinatura = transmissor.assinar(topico)
+    try:
+        iniciais = contagem_vagas(evento_ids)
+    except Exception:
+        transmissor.cancelar(assinatura)
+        raise
+
+    # Gerador sem stream_with_context: a conexão com o banco é liberada ao fim da view
+    resposta = Response(
+        _fluxo(assinatura, iniciais, current_app.config.get('SSE_KEEPALIVE_SECONDS', 15)),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    resposta.call_on_close(lambda: transmissor.cancelar(assinatura))
+    return resposta
+
+
+@api_bp.route('/eventos/vagas/stream', methods=['GET'])
+def stream_vagas():
+    try:
+        return _resposta_sse(TOPICO_TODOS)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route('/eventos/<int:evento_id>/vagas/stream', methods=['GET'])
+def stream_vagas_evento(evento_id):
+    try:
+        if not Evento.select().where(Evento.id == evento_id).exists():
+            return jsonify({"error": "Evento não encontrado"}), 404
+        return _resposta_sse(topico_evento(evento_id), [evento_id])
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,8 +1,7 @@
 import os
-from dotenv import load_dotenv
 
-# Carrega as variáveis do arquivo .env
-load_dotenv()
+# O .env é carregado pelos pontos de entrada (run.py, worker.py, create_tables.py; o 'flask run'
+# já carrega sozinho), antes de importar a aplicação: aqui só se leem as variáveis de ambiente.
 
 class Config:
     """Configurações base da aplicação."""
@@ -21,3 +20,38 @@ class Config:
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'contato@paroquia.com.br')
 
     TARGET_EMAIL = os.environ.get('TARGET_EMAIL', 'contato@paroquia.com.br')
+
+    # Janela (em segundos) em que uma Idempotency-Key repetida recebe a resposta salva
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 60 * 60))
+
+    # Sobe o agendador de tarefas junto com o servidor (ver worker.py para rodar separado)
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'False').lower() in ('true', '1', 't')
+
+    # Validade (em segundos) das respostas do dashboard em cache; alterações invalidam antes
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 300))
+
+    # Vagas ao vivo (SSE): intervalo do ping e uso do LISTEN/NOTIFY para alcançar todos os processos
+    SSE_KEEPALIVE_SECONDS = int(os.environ.get('SSE_KEEPALIVE_SECONDS', 15))
+    SSE_LISTEN_NOTIFY = os.environ.get('SSE_LISTEN_NOTIFY', 'True').lower() in ('true', '1', 't')
+
+    # Compressão das respostas (gzip; brotli se o pacote 'brotli' estiver instalado)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))
+
+    # Fuso informado nos feeds .ics (os horários são gravados sem fuso)
+    CALENDARIO_FUSO = os.environ.get('CALENDARIO_FUSO', 'America/Sao_Paulo')
+
+    # Arquivamento noturno: avisos e eventos passados há mais de N dias vão para as tabelas de arquivo
+    ARQUIVO_AVISOS_DIAS = int(os.environ.get('ARQUIVO_AVISOS_DIAS', 365))
+    ARQUIVO_EVENTOS_DIAS = int(os.environ.get('ARQUIVO_EVENTOS_DIAS', 180))
+    ARQUIVO_LOTE = int(os.environ.get('ARQUIVO_LOTE', 500))
+
+    # /sync: por quantos dias as lápides das remoções são guardadas (cursores mais antigos recebem 410)
+    SYNC_RETENCAO_DIAS = int(os.environ.get('SYNC_RETENCAO_DIAS', 90))
+
+    # Instantâneos das listagens públicas (/horarios, /avisos, /agenda, /eventos) servidos pelo nginx;
+    # vazio desliga a publicação (ver services/instantaneos.py e frontend/nginx.conf)
+    SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', '')
+    # Alterações dentro desta janela (segundos) são republicadas juntas, fora da requisição; 0 = na hora
+    SNAPSHOT_DEBOUNCE_SECONDS = float(os.environ.get('SNAPSHOT_DEBOUNCE_SECONDS', 1.0))
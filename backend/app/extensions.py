@@ -1,7 +1,12 @@
-from flask_mail import Mail
 from flask_login import LoginManager
+from .services.agendador import Agendador
+from .services.compressao import Compressao
+from .services.correio import Correio
 
 # Instanciamos as extensões aqui, vazias.
 # Elas serão iniciadas com o app (init_app) depois.
-mail = Mail()
-login_manager = LoginManager()
\ No newline at end of file
+# Flask-Mail só é importado no primeiro envio (ver services/correio.py)
+mail = Correio()
+login_manager = LoginManager()
+agendador = Agendador()
+compressao = Compressao()
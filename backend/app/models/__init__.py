@@ -1,6 +1,25 @@
-from peewee import Model
+from datetime import datetime
+from peewee import Model, DateTimeField, IntegerField
 from .config import db
 
 class BaseModel(Model):
     class Meta:
         database = db
+
+class ModeloSincronizado(BaseModel):
+    """
+    Conteúdo acompanhado pelo /sync: updated_at é renovado a cada save().
+    UPDATEs em lote precisam definir updated_at explicitamente.
+    """
+    updated_at = DateTimeField(default=datetime.now, index=True)
+
+    def save(self, *args, **kwargs):
+        self.updated_at = datetime.now()
+        return super().save(*args, **kwargs)
+
+class ModeloVersionado(BaseModel):
+    """
+    Controle de concorrência otimista: 'version' sobe a cada atualização
+    (UPDATE condicional em services/concorrencia.py, exposto como ETag/If-Match).
+    """
+    version = IntegerField(default=1)
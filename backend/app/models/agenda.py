@@ -1,8 +1,8 @@
 from peewee import *
-from . import BaseModel
+from . import ModeloSincronizado, ModeloVersionado
 from .usuario import Usuario
 
-class Agenda(BaseModel):
+class Agenda(ModeloSincronizado, ModeloVersionado):
     id = AutoField()
     titulo = CharField(max_length=60)
     tipo = CharField(max_length=45, null=True)
@@ -15,3 +15,11 @@ class Agenda(BaseModel):
     dia_semana = CharField(max_length=45, null=True)
 
     criado_por = ForeignKeyField(Usuario, backref='agendas')
+
+    class Meta:
+        # Consultas de calendário: WHERE data BETWEEN ? AND ? ORDER BY data, horario
+        indexes = (
+            (('data', 'horario'), False),
+            # Verificação de conflitos: WHERE local = ? AND data BETWEEN ? AND ?
+            (('local', 'data', 'horario'), False),
+        )
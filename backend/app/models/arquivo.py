@@ -0,0 +1,52 @@
+from datetime import datetime
+from peewee import *
+from . import BaseModel
+from .usuario import Usuario
+
+# Tabelas frias: avisos e eventos antigos saem das tabelas principais (ver services/arquivamento.py).
+# Mesmas colunas e mesmos ids das tabelas de origem, para que as listagens possam unir as duas.
+
+class AvisoArquivado(BaseModel):
+    id = IntegerField(primary_key=True)
+    titulo = CharField(max_length=100)
+    categoria = CharField(max_length=45)
+    url = CharField(max_length=250, null=True)
+    descricao = TextField(null=True)
+    data = DateField(index=True)
+
+    criado_por = ForeignKeyField(Usuario, backref='avisos_arquivados')
+    version = IntegerField(default=1)
+    arquivado_em = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'aviso_arquivo'
+
+
+class EventoArquivado(BaseModel):
+    id = IntegerField(primary_key=True)
+    titulo = CharField(max_length=45)
+    tipo = CharField(max_length=45)
+    local = CharField(max_length=45)
+    tipo_vagas = CharField(max_length=45, null=True)
+    numero_vagas = IntegerField(null=True)
+    data = DateField(index=True)
+    horario = TimeField()
+    descricao = TextField(null=True)
+
+    criado_por = ForeignKeyField(Usuario, backref='eventos_arquivados')
+    version = IntegerField(default=1)
+    arquivado_em = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'evento_arquivo'
+
+
+class InscricaoArquivada(BaseModel):
+    id = IntegerField(primary_key=True)
+    nome = CharField(max_length=150)
+    numero = CharField(max_length=13)
+    evento = ForeignKeyField(EventoArquivado, backref="inscricoes", on_delete="CASCADE")
+    created_at = DateTimeField(index=True, null=True)
+
+    class Meta:
+        table_name = 'inscricao_evento_arquivo'
@@ -0,0 +1,27 @@
+from datetime import datetime
+from peewee import *
+from . import BaseModel
+
+class Atividade(BaseModel):
+    """Log append-only das alterações feitas pelas rotas (alimenta o dashboard e o feed)."""
+    id = AutoField()
+    # 'evento', 'aviso', 'agenda', 'horario', 'inscricao' ou 'usuario'
+    tipo = CharField(max_length=20)
+    # 'criado', 'atualizado' ou 'removido'
+    acao = CharField(max_length=20)
+    item_id = IntegerField(null=True)
+    titulo = CharField(max_length=150, null=True)
+
+    # Quem fez a alteração (None para ações públicas, ex.: inscrição) e dono do conteúdo
+    autor_id = IntegerField(null=True)
+    dono_id = IntegerField(null=True)
+
+    created_at = DateTimeField(default=datetime.now)
+
+    class Meta:
+        indexes = (
+            # Feed do gestor: WHERE dono_id = ? ORDER BY created_at DESC, id DESC
+            (('dono_id', 'created_at', 'id'), False),
+            # Feed do admin (tudo)
+            (('created_at', 'id'), False),
+        )
@@ -1,8 +1,8 @@
 from peewee import *
-from . import BaseModel
+from . import ModeloSincronizado, ModeloVersionado
 from .usuario import Usuario
 
-class Aviso(BaseModel):
+class Aviso(ModeloSincronizado, ModeloVersionado):
     id = AutoField()
     titulo = CharField(max_length=100)
     categoria = CharField(max_length=45)
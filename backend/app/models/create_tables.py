@@ -1,10 +1,28 @@
+from dotenv import load_dotenv
+
+# Antes dos modelos: a conexão (models/config.py) é criada com as variáveis DB_*
+load_dotenv()
+
 from app.models.config import db
 from app.models.eventos import Evento
 from app.models.inscricao_evento import InscricaoEvento
 from app.models.usuario import Usuario
 from app.models.agenda import Agenda
 from app.models.avisos import Aviso
+from app.models.idempotencia import ChaveIdempotencia
+from app.models.estatistica import EstatisticaConteudo
+from app.models.atividade import Atividade
+from app.models.arquivo import AvisoArquivado, EventoArquivado, InscricaoArquivada
+from app.models.remocao import Remocao
+from app.models.execucao_tarefa import ExecucaoTarefa
+from app.models.migracoes import aplicar_migracoes
+from app.services.estatisticas import reconciliar_estatisticas
 
 db.connect()
-db.create_tables([Usuario, Evento, Agenda, Aviso, InscricaoEvento])
+db.create_tables([Usuario, Evento, Agenda, Aviso, InscricaoEvento, ChaveIdempotencia, EstatisticaConteudo, Atividade,
+                  AvisoArquivado, EventoArquivado, InscricaoArquivada, Remocao, ExecucaoTarefa])
+# Colunas novas em tabelas que já existiam
+aplicar_migracoes(db)
+# Preenche (ou corrige) as contagens usadas pelo dashboard
+reconciliar_estatisticas()
 db.close()
\ No newline at end of file
@@ -0,0 +1,13 @@
+from peewee import *
+from . import BaseModel
+
+class EstatisticaConteudo(BaseModel):
+    # idusuario do dono do conteúdo; a linha 0 (GLOBAL) guarda os totais gerais (visão do admin)
+    usuario_id = IntegerField(primary_key=True)
+
+    eventos = IntegerField(default=0)
+    avisos = IntegerField(default=0)
+    # Todos os itens da tabela Agenda, inclusive os horários públicos
+    agenda = IntegerField(default=0)
+    # Apenas os itens públicos da Agenda (horários)
+    horarios = IntegerField(default=0)
@@ -1,8 +1,8 @@
 from peewee import *
-from . import BaseModel
+from . import ModeloSincronizado, ModeloVersionado
 from .usuario import Usuario
 
-class Evento(BaseModel):
+class Evento(ModeloSincronizado, ModeloVersionado):
     id = AutoField()
     titulo = CharField(max_length=45)
     tipo = CharField(max_length=45)
@@ -14,3 +14,9 @@ class Evento(BaseModel):
     descricao = TextField(null=True)
 
     criado_por = ForeignKeyField(Usuario, backref='eventos') # Relação
+
+    class Meta:
+        # Verificação de conflitos: WHERE local = ? AND data BETWEEN ? AND ?
+        indexes = (
+            (('local', 'data', 'horario'), False),
+        )
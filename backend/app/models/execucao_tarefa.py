@@ -0,0 +1,14 @@
+from datetime import datetime
+from peewee import *
+from . import BaseModel
+
+class ExecucaoTarefa(BaseModel):
+    """Rodadas já reivindicadas pelo agendador: uma linha por (tarefa, horário agendado)."""
+    tarefa = CharField(max_length=100)
+    # Instante da rodada (o mesmo em todos os processos, ver Tarefa.agendar)
+    horario = DateTimeField()
+    executada_em = DateTimeField(default=datetime.now)
+
+    class Meta:
+        table_name = 'execucao_tarefa'
+        primary_key = CompositeKey('tarefa', 'horario')
@@ -0,0 +1,16 @@
+from datetime import datetime
+from peewee import *
+from . import BaseModel
+
+class ChaveIdempotencia(BaseModel):
+    # sha256 de (usuário, método, rota, Idempotency-Key): tamanho fixo, tabela compacta
+    chave = CharField(max_length=64, primary_key=True)
+    # sha256 do corpo da requisição, para detectar reuso da chave com outro conteúdo
+    hash_requisicao = CharField(max_length=64)
+
+    # Enquanto status_code for NULL a requisição original ainda está em andamento
+    status_code = IntegerField(null=True)
+    corpo = TextField(null=True)
+    mimetype = CharField(max_length=100, null=True)
+
+    criado_em = DateTimeField(default=datetime.now, index=True)
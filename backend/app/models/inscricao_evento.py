@@ -1,11 +1,23 @@
+from datetime import datetime
 from peewee import *
-from . import BaseModel
+from . import ModeloSincronizado
 from .eventos import Evento
 
-class InscricaoEvento(BaseModel):
+class InscricaoEvento(ModeloSincronizado):
     id = AutoField()
     nome = CharField(max_length=150)
+    # Sempre gravado normalizado (ver services/telefone.py)
     numero = CharField(max_length=13)
 
     # Relação
     evento = ForeignKeyField(Evento, backref="inscricoes", on_delete="CASCADE")
+
+    # Momento da inscrição (base dos relatórios em services/analise.py). NULL nas inscrições
+    # anteriores à coluna sem registro no log de atividades (ver models/migracoes.py)
+    created_at = DateTimeField(default=datetime.now, index=True, null=True)
+
+    class Meta:
+        # Um mesmo telefone só pode se inscrever uma vez em cada evento
+        indexes = (
+            (('evento', 'numero'), True),
+        )
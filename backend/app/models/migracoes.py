@@ -0,0 +1,199 @@
+from datetime import datetime
+
+from peewee import Case, PostgresqlDatabase, fn
+
+from .atividade import Atividade
+from .inscricao_evento import InscricaoEvento
+from .agenda import Agenda
+from .usuario import Usuario
+from .arquivo import AvisoArquivado, EventoArquivado
+from .avisos import Aviso
+from .eventos import Evento
+
+# Colunas acrescentadas depois que as tabelas já existiam em produção.
+# create_tables(safe=True) não altera tabelas existentes; estas entram via ALTER TABLE.
+COLUNAS_NOVAS = [
+    (InscricaoEvento, 'created_at'),
+    # Sincronização incremental (/sync)
+    (Evento, 'updated_at'),
+    (Aviso, 'updated_at'),
+    (Agenda, 'updated_at'),
+    (InscricaoEvento, 'updated_at'),
+    # Concorrência otimista (If-Match nas rotas de atualização)
+    (Evento, 'version'),
+    (Aviso, 'version'),
+    (Agenda, 'version'),
+    (Usuario, 'version'),
+    (AvisoArquivado, 'version'),
+    (EventoArquivado, 'version'),
+]
+
+# Coluna nova -> função que preenche as linhas que já existiam (em vez do valor padrão,
+# que para datas seria o momento da migração)
+PREENCHIMENTOS = {}
+
+# Modelos que ganharam índices (Meta.indexes) depois da criação da tabela
+INDICES_NOVOS = [Agenda, Evento, Aviso, InscricaoEvento]
+
+
+def aplicar_migracoes(database):
+    """Adiciona as colunas e os índices que faltarem. Pode ser executada várias vezes."""
+    # Só o create_tables precisa do migrador; a busca importa as constantes deste módulo
+    from playhouse.migrate import SchemaMigrator, migrate
+
+    migrator = SchemaMigrator.from_database(database)
+    aplicadas = []
+    for modelo, nome in COLUNAS_NOVAS:
+        tabela = modelo._meta.table_name
+        campo = modelo._meta.fields[nome]
+        existentes = {coluna.name for coluna in database.get_columns(tabela)}
+        if campo.column_name in existentes:
+            continue
+        with database.atomic():
+            migrate(migrator.add_column(tabela, campo.column_name, campo))
+            preencher = PREENCHIMENTOS.get((modelo, nome))
+            if preencher:
+                preencher()
+        aplicadas.append(f"{tabela}.{campo.column_name}")
+
+    # O índice único (evento, numero) só pode ser criado sem duplicatas na tabela
+    if unificar_inscricoes(database):
+        aplicadas.append(f"{InscricaoEvento._meta.table_name}.(evento_id, numero) UNIQUE")
+
+    # CREATE INDEX IF NOT EXISTS para cada índice declarado no modelo
+    for modelo in INDICES_NOVOS:
+        modelo._schema.create_indexes(safe=True)
+
+    criar_indices_busca(database)
+    return aplicadas
+
+
+# --- DATA DAS INSCRIÇÕES ANTIGAS ---
+
+def preencher_data_inscricoes():
+    """
+    created_at das inscrições que já existiam, tirado do log de atividades ("Nova Inscrição"
+    é gravada na mesma transação que a inscrição), em um único UPDATE ... FROM. Sem registro
+    no log a data fica NULL, e a inscrição fica fora da série dos relatórios.
+    """
+    log = (Atividade
+           .select(Atividade.item_id, fn.MIN(Atividade.created_at).alias('criado'))
+           .where((Atividade.tipo == 'inscricao') & (Atividade.acao == 'criado'))
+           .group_by(Atividade.item_id)
+           .alias('log'))
+    return (InscricaoEvento
+            .update({InscricaoEvento.created_at: log.c.criado})
+            .from_(log)
+            .where((log.c.item_id == InscricaoEvento.id) & InscricaoEvento.created_at.is_null())
+            .execute())
+
+
+PREENCHIMENTOS[(InscricaoEvento, 'created_at')] = preencher_data_inscricoes
+
+
+# --- UMA INSCRIÇÃO POR TELEFONE EM CADA EVENTO ---
+
+LOTE_NORMALIZACAO = 500
+
+
+def _tem_indice_unico(database, modelo, colunas):
+    return any(indice.unique and list(indice.columns) == colunas
+               for indice in database.get_indexes(modelo._meta.table_name))
+
+
+def unificar_inscricoes(database):
+    """
+    Prepara as inscrições antigas para o índice único (evento, numero), na ordem:
+    1. grava 'numero' normalizado (o mesmo telefone escrito de formas diferentes vira igual);
+    2. apaga as duplicatas, mantendo a primeira inscrição (MIN(id)) de cada (evento, numero);
+    3. cria o índice.
+    Sem o índice, o ON CONFLICT (evento_id, numero) do create_inscricao falha no Postgres.
+    Retorna True se o índice foi criado agora (False se já existia).
+    """
+    if _tem_indice_unico(database, InscricaoEvento, ['evento_id', 'numero']):
+        return False
+
+    # Imports locais: os serviços importam os modelos
+    from ..services.telefone import normalizar_telefone
+    from ..services.sincronizacao import registrar_remocoes
+
+    with database.atomic():
+        trocas = [(inscricao_id, normalizado)
+                  for inscricao_id, numero in InscricaoEvento.select(InscricaoEvento.id, InscricaoEvento.numero).tuples()
+                  if (normalizado := normalizar_telefone(numero)) != numero]
+        agora = datetime.now()
+        for inicio in range(0, len(trocas), LOTE_NORMALIZACAO):
+            lote = trocas[inicio:inicio + LOTE_NORMALIZACAO]
+            (InscricaoEvento
+             .update({InscricaoEvento.numero: Case(InscricaoEvento.id, lote),
+                      InscricaoEvento.updated_at: agora})
+             .where(InscricaoEvento.id.in_([inscricao_id for inscricao_id, _ in lote]))
+             .execute())
+
+        primeiras = (InscricaoEvento
+                     .select(fn.MIN(InscricaoEvento.id))
+                     .group_by(InscricaoEvento.evento, InscricaoEvento.numero))
+        duplicadas = InscricaoEvento.id.not_in(primeiras)
+        # registered_count e as vagas são contados a partir da tabela; o /sync recebe as remoções
+        registrar_remocoes('inscricoes', InscricaoEvento, duplicadas)
+        InscricaoEvento.delete().where(duplicadas).execute()
+
+        InscricaoEvento._schema.create_indexes(safe=True)
+    return True
+
+
+# --- BUSCA TEXTUAL (services/busca.py) ---
+
+# Tipo exposto na busca -> modelo com 'titulo' e 'descricao'
+MODELOS_BUSCA = {"aviso": Aviso, "evento": Evento, "agenda": Agenda}
+COLUNA_BUSCA = "busca"
+TABELA_FTS = "busca_fts"
+
+
+def _indices_busca_postgres(database):
+    """
+    Coluna tsvector gerada (o próprio Postgres a recalcula a cada INSERT/UPDATE),
+    título com peso A e descrição com peso B, e um índice GIN sobre ela.
+    """
+    for modelo in MODELOS_BUSCA.values():
+        tabela = modelo._meta.table_name
+        database.execute_sql(
+            f'ALTER TABLE "{tabela}" ADD COLUMN IF NOT EXISTS "{COLUNA_BUSCA}" tsvector GENERATED ALWAYS AS ('
+            f"setweight(to_tsvector('portuguese', coalesce(titulo, '')), 'A') || "
+            f"setweight(to_tsvector('portuguese', coalesce(descricao, '')), 'B')) STORED")
+        database.execute_sql(
+            f'CREATE INDEX IF NOT EXISTS "{tabela}_{COLUNA_BUSCA}" ON "{tabela}" USING GIN ("{COLUNA_BUSCA}")')
+
+
+def _indices_busca_sqlite(database):
+    """
+    Fallback para o SQLite (testes e desenvolvimento): uma tabela FTS5 com o conteúdo
+    das três tabelas, mantida por triggers nas escritas.
+    """
+    existia = database.table_exists(TABELA_FTS)
+    database.execute_sql(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{TABELA_FTS}" USING fts5('
+        "tipo UNINDEXED, item_id UNINDEXED, data UNINDEXED, titulo, descricao, "
+        "tokenize = 'unicode61 remove_diacritics 2')")
+    for tipo, modelo in MODELOS_BUSCA.items():
+        tabela = modelo._meta.table_name
+        novo = f"'{tipo}', NEW.id, NEW.data, NEW.titulo, NEW.descricao"
+        remover = f"DELETE FROM \"{TABELA_FTS}\" WHERE tipo = '{tipo}' AND item_id = OLD.id;"
+        inserir = f"INSERT INTO \"{TABELA_FTS}\" (tipo, item_id, data, titulo, descricao) VALUES ({novo});"
+        for evento, corpo in (("INSERT", inserir), ("UPDATE", remover + inserir), ("DELETE", remover)):
+            database.execute_sql(
+                f'CREATE TRIGGER IF NOT EXISTS "{tabela}_{TABELA_FTS}_{evento.lower()}" '
+                f'AFTER {evento} ON "{tabela}" BEGIN {corpo} END')
+        if not existia:
+            database.execute_sql(
+                f'INSERT INTO "{TABELA_FTS}" (tipo, item_id, data, titulo, descricao) '
+                f"SELECT '{tipo}', id, data, titulo, descricao FROM \"{tabela}\"")
+
+
+def criar_indices_busca(database):
+    """Cria (se faltar) o índice de busca textual de avisos, eventos e agenda."""
+    with database.atomic():
+        if isinstance(database, PostgresqlDatabase):
+            _indices_busca_postgres(database)
+        else:
+            _indices_busca_sqlite(database)
@@ -0,0 +1,17 @@
+from datetime import datetime
+from peewee import *
+from . import BaseModel
+
+class Remocao(BaseModel):
+    """Lápides: o que foi apagado (ou arquivado), para que o /sync avise os clientes."""
+    id = AutoField()
+    # Conjunto do /sync: 'eventos', 'avisos', 'agenda' ou 'inscricoes'
+    tipo = CharField(max_length=20)
+    item_id = IntegerField()
+    removido_em = DateTimeField(default=datetime.now)
+
+    class Meta:
+        indexes = (
+            # /sync: WHERE removido_em >= ? (por tipo)
+            (('removido_em', 'tipo'), False),
+        )
@@ -1,8 +1,8 @@
 from peewee import *
 from flask_login import UserMixin
-from . import BaseModel
+from . import ModeloVersionado
 
-class Usuario(BaseModel, UserMixin):
+class Usuario(ModeloVersionado, UserMixin):
     idusuario = AutoField()
     nome = CharField(max_length=150)
     email = CharField(max_length=150, unique=True)
@@ -0,0 +1 @@
+# Serviços de apoio às rotas (lógica que não é rota nem modelo)
@@ -0,0 +1,26 @@
+import importlib
+
+# Dependências pesadas que só algumas rotas usam (requests, flask_mail) ficam fora da
+# importação da aplicação: cada worker sobe sem elas e as carrega no primeiro uso.
+
+
+class ModuloAdiado:
+    """
+    Substitui 'import nome' no topo do módulo: o import de verdade acontece no primeiro
+    acesso a um atributo (modulo.post, modulo.Message ...) e depois vem do sys.modules.
+    Atributos podem ser substituídos no objeto (unittest.mock.patch) sem tocar no módulo real.
+    """
+
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+
+    def __getattr__(self, atributo):
+        if self._modulo is None:
+            # import_module já serializa importações concorrentes (lock de importação)
+            self._modulo = importlib.import_module(self._nome)
+        return getattr(self._modulo, atributo)
+
+    def __repr__(self):
+        estado = 'carregado' if self._modulo is not None else 'adiado'
+        return f"<ModuloAdiado {self._nome!r} ({estado})>"
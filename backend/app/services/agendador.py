@@ -0,0 +1,262 @@
+import logging
+import threading
+import zlib
+from datetime import datetime, timedelta
+
+from peewee import PostgresqlDatabase
+
+from ..models.execucao_tarefa import ExecucaoTarefa
+from .metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+# Por quanto tempo as rodadas reivindicadas ficam registradas
+RETENCAO_EXECUCOES = timedelta(days=7)
+
+
+# --- EXPRESSÕES CRON (minuto hora dia mês dia_da_semana) ---
+
+_LIMITES_CRON = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+
+def _parse_campo(campo, minimo, maximo):
+    valores = set()
+    for parte in campo.split(','):
+        passo = 1
+        if '/' in parte:
+            parte, passo_txt = parte.split('/', 1)
+            passo = int(passo_txt)
+            if passo < 1:
+                raise ValueError(f"Passo inválido na expressão cron: {campo}")
+        if parte == '*':
+            inicio, fim = minimo, maximo
+        elif '-' in parte:
+            inicio, fim = (int(v) for v in parte.split('-', 1))
+        else:
+            inicio = fim = int(parte)
+        if inicio < minimo or fim > maximo or inicio > fim:
+            raise ValueError(f"Valor fora do intervalo na expressão cron: {campo}")
+        valores.update(range(inicio, fim + 1, passo))
+    return frozenset(valores)
+
+
+class Cron:
+    """Expressão cron de 5 campos. Dia da semana: 0 = domingo ... 6 = sábado (7 também é domingo)."""
+
+    def __init__(self, expressao):
+        campos = expressao.split()
+        if len(campos) != 5:
+            raise ValueError(f"Expressão cron deve ter 5 campos: '{expressao}'")
+        if campos[4] != '*':
+            campos[4] = ','.join('0' if p == '7' else p for p in campos[4].split(','))
+        self.expressao = expressao
+        self.minutos, self.horas, self.dias, self.meses, self.dias_semana = (
+            _parse_campo(c, *lim) for c, lim in zip(campos, _LIMITES_CRON)
+        )
+
+    def _dia_confere(self, dia):
+        # isoweekday(): segunda = 1 ... domingo = 7 -> converte para domingo = 0
+        return dia.month in self.meses and dia.day in self.dias and \
+            dia.isoweekday() % 7 in self.dias_semana
+
+    def proxima(self, depois_de):
+        """Próximo instante (com precisão de minuto) estritamente depois de 'depois_de'."""
+        instante = depois_de.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = instante + timedelta(days=366 * 4)
+        while instante < limite:
+            if not self._dia_confere(instante):
+                instante = (instante + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if instante.hour not in self.horas:
+                instante = (instante + timedelta(hours=1)).replace(minute=0)
+                continue
+            if instante.minute not in self.minutos:
+                instante += timedelta(minutes=1)
+                continue
+            return instante
+        raise ValueError(f"Expressão cron nunca dispara: '{self.expressao}'")
+
+
+# --- TAREFAS E AGENDADOR ---
+
+_ORIGEM_INTERVALOS = datetime(2000, 1, 1)
+
+class Tarefa:
+    def __init__(self, nome, funcao, intervalo=None, cron=None):
+        if (intervalo is None) == (cron is None):
+            raise ValueError("Informe 'intervalo' (segundos) ou 'cron', não ambos.")
+        self.nome = nome
+        self.funcao = funcao
+        self.intervalo = intervalo
+        self.cron = Cron(cron) if cron else None
+        self.proxima_execucao = None
+
+    def agendar(self, agora):
+        if self.cron:
+            self.proxima_execucao = self.cron.proxima(agora)
+        else:
+            # Múltiplos do intervalo contados da meia-noite de 01/01/2000, e não da subida do
+            # processo: todos os agendadores chegam ao mesmo horário para a mesma rodada
+            decorridos = int((agora - _ORIGEM_INTERVALOS).total_seconds())
+            self.proxima_execucao = _ORIGEM_INTERVALOS + timedelta(
+                seconds=(decorridos // self.intervalo + 1) * self.intervalo)
+
+
+class Agendador:
+    """
+    Agendador leve, em uma thread, para tarefas periódicas de manutenção.
+
+    Com vários processos rodando o mesmo agendador, todos calculam o mesmo horário para
+    cada rodada, e só o primeiro que a reivindica (INSERT ... ON CONFLICT DO NOTHING em
+    ExecucaoTarefa) executa; os demais pulam a rodada. Além disso, cada execução é protegida
+    por um advisory lock do Postgres (pg_try_advisory_lock), para que uma execução manual
+    nunca se sobreponha à agendada. Em outros bancos usa-se um lock local do processo.
+    """
+
+    def __init__(self, app=None, database=None):
+        self.app = app
+        self.database = database
+        self.tarefas = {}
+        self._parar = threading.Event()
+        self._thread = None
+        self._locks_locais = {}
+
+    def init_app(self, app, database):
+        self.app = app
+        self.database = database
+
+    def a_cada(self, segundos, nome=None):
+        """Decorator: executa a função a cada 'segundos'."""
+        def registrar(funcao):
+            self.adicionar(Tarefa(nome or funcao.__name__, funcao, intervalo=segundos))
+            return funcao
+        return registrar
+
+    def cron(self, expressao, nome=None):
+        """Decorator: executa a função conforme a expressão cron."""
+        def registrar(funcao):
+            self.adicionar(Tarefa(nome or funcao.__name__, funcao, cron=expressao))
+            return funcao
+        return registrar
+
+    def adicionar(self, tarefa):
+        if tarefa.nome in self.tarefas:
+            raise ValueError(f"Tarefa '{tarefa.nome}' já registrada.")
+        tarefa.agendar(datetime.now())
+        self.tarefas[tarefa.nome] = tarefa
+
+    # --- Locks ---
+
+    def _usa_advisory_lock(self):
+        return isinstance(self.database, PostgresqlDatabase)
+
+    @staticmethod
+    def _chave_lock(nome):
+        # pg_try_advisory_lock recebe um bigint; crc32 dá um inteiro estável por nome
+        return zlib.crc32(f"agendador:{nome}".encode('utf-8'))
+
+    def _obter_lock(self, nome):
+        if self._usa_advisory_lock():
+            cursor = self.database.execute_sql('SELECT pg_try_advisory_lock(%s)', (self._chave_lock(nome),))
+            return bool(cursor.fetchone()[0])
+        lock = self._locks_locais.setdefault(nome, threading.Lock())
+        return lock.acquire(blocking=False)
+
+    def _liberar_lock(self, nome):
+        if self._usa_advisory_lock():
+            self.database.execute_sql('SELECT pg_advisory_unlock(%s)', (self._chave_lock(nome),))
+        else:
+            self._locks_locais[nome].release()
+
+    def _reivindicar(self, nome, horario):
+        """Registra a rodada 'horario' da tarefa; False se outro processo já a registrou."""
+        query = (ExecucaoTarefa
+                 .insert(tarefa=nome, horario=horario)
+                 .on_conflict_ignore()
+                 .returning(ExecucaoTarefa.tarefa))
+        reivindicada = bool(list(query.execute()))
+        if reivindicada:
+            (ExecucaoTarefa
+             .delete()
+             .where((ExecucaoTarefa.tarefa == nome) & (ExecucaoTarefa.horario < horario - RETENCAO_EXECUCOES))
+             .execute())
+        return reivindicada
+
+    # --- Execução ---
+
+    def executar(self, nome, horario=None):
+        """
+        Executa a tarefa agora, se obtiver o lock e, quando 'horario' (a rodada agendada) é
+        informado, se nenhum outro processo já tiver executado essa rodada. Retorna True se ela rodou.
+        """
+        tarefa = self.tarefas[nome]
+        # Só fecha a conexão se foi aberta aqui (a thread do agendador tem a sua própria)
+        abriu_conexao = self.database.is_closed()
+        if abriu_conexao:
+            self.database.connect()
+        try:
+            with self.app.app_context():
+                if not self._obter_lock(nome):
+                    metricas.incrementar(f"tarefa.{nome}.puladas")
+                    return False
+                try:
+                    if horario is not None and not self._reivindicar(nome, horario):
+                        metricas.incrementar(f"tarefa.{nome}.puladas")
+                        return False
+                    try:
+                        with metricas.cronometrar(f"tarefa.{nome}.duracao"):
+                            tarefa.funcao()
+                        metricas.incrementar(f"tarefa.{nome}.execucoes")
+                    except Exception:
+                        metricas.incrementar(f"tarefa.{nome}.erros")
+                        logger.exception("Erro na tarefa agendada '%s'", nome)
+                finally:
+                    self._liberar_lock(nome)
+            return True
+        finally:
+            if abriu_conexao and not self.database.is_closed():
+                self.database.close()
+
+    def executar_pendentes(self, agora=None):
+        agora = agora or datetime.now()
+        for tarefa in list(self.tarefas.values()):
+            if tarefa.proxima_execucao <= agora:
+                self.executar(tarefa.nome, tarefa.proxima_execucao)
+                tarefa.agendar(datetime.now())
+
+    def _espera(self):
+        if not self.tarefas:
+            return 60.0
+        proxima = min(t.proxima_execucao for t in self.tarefas.values())
+        return max(0.0, min(60.0, (proxima - datetime.now()).total_seconds()))
+
+    def rodar(self):
+        """Laço principal (bloqueante). Usado pela thread e pelo worker.py."""
+        logger.info("Agendador iniciado com %d tarefa(s).", len(self.tarefas))
+        while not self._parar.is_set():
+            self.executar_pendentes()
+            self._parar.wait(self._espera())
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self.rodar, name='agendador', daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout=5):
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def estado(self):
+        return [
+            {
+                "nome": t.nome,
+                "intervalo": t.intervalo,
+                "cron": t.cron.expressao if t.cron else None,
+                "proxima_execucao": t.proxima_execucao.isoformat() if t.proxima_execucao else None,
+            }
+            for t in self.tarefas.values()
+        ]
@@ -0,0 +1,144 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from peewee import fn, JOIN, SQL, PostgresqlDatabase, Select
+
+from ..models.arquivo import EventoArquivado, InscricaoArquivada
+from ..models.eventos import Evento
+from ..models.inscricao_evento import InscricaoEvento
+from .cache import Cache
+from .versao import versao_conteudo
+
+# Granularidade da série -> unidade do date_trunc do Postgres
+GRANULARIDADES = {"dia": "day", "semana": "week", "mes": "month"}
+
+# Séries de períodos já encerrados, por versão do conteúdo (services/versao.py): a entrada
+# de um processo deixa de valer quando qualquer processo apaga ou arquiva um evento
+cache_historico = Cache('analise', max_itens=512, ttl=24 * 60 * 60)
+
+# (inscrições, eventos): tabelas quentes e frias (services/arquivamento.py), que guardam os
+# eventos passados e as suas inscrições com os mesmos ids
+FONTES = ((InscricaoEvento, Evento), (InscricaoArquivada, EventoArquivado))
+
+
+def inicio_do_periodo(instante, granularidade):
+    """Início do balde que contém 'instante' (mesma regra do date_trunc: semana começa na segunda)."""
+    dia = instante.date() if isinstance(instante, datetime) else instante
+    if granularidade == "semana":
+        dia -= timedelta(days=dia.weekday())
+    elif granularidade == "mes":
+        dia = dia.replace(day=1)
+    return datetime.combine(dia, datetime.min.time())
+
+
+def _filtrar(query, fonte, dono_id, evento_id, de, ate):
+    inscricao, evento = fonte
+    # Inscrições antigas sem data conhecida (ver models/migracoes.py) ficam fora da série
+    query = query.where(inscricao.created_at.is_null(False))
+    if dono_id is not None:
+        query = query.join(evento).where(evento.criado_por == dono_id)
+    if evento_id is not None:
+        query = query.where(inscricao.evento == evento_id)
+    if de is not None:
+        query = query.where(inscricao.created_at >= de)
+    if ate is not None:
+        query = query.where(inscricao.created_at < ate)
+    return query
+
+
+def _contar_por_periodo(granularidade, dono_id, evento_id, de, ate, fontes=FONTES[:1]):
+    """{inicio_do_periodo: total} para as inscrições em [de, ate), somando as tabelas de 'fontes'."""
+    datas = None
+    for fonte in fontes:
+        query = _filtrar(fonte[0].select(fonte[0].created_at.alias('criado')), fonte, dono_id, evento_id, de, ate)
+        datas = query if datas is None else datas.union_all(query)
+
+    if isinstance(InscricaoEvento._meta.database, PostgresqlDatabase):
+        datas = datas.alias('datas')
+        balde = fn.date_trunc(GRANULARIDADES[granularidade], datas.c.criado)
+        return dict(Select([datas], [balde, fn.COUNT(SQL('*'))]).group_by(balde).tuples())
+
+    # Demais bancos (SQLite dos testes): lê só a coluna de data, sem montar objetos,
+    # e agrupa em memória
+    converter = InscricaoEvento.created_at.python_value
+    return Counter(inicio_do_periodo(converter(criado), granularidade)
+                   for (criado,) in datas.tuples().iterator())
+
+
+def serie_inscricoes(granularidade, dono_id=None, evento_id=None, de=None, ate=None, agora=None):
+    """
+    Inscrições por período. Os períodos já encerrados vêm do cache e incluem as inscrições
+    arquivadas; só o período corrente (que ainda recebe inscrições, sempre de eventos que
+    não foram arquivados) é consultado a cada chamada.
+    """
+    corte = inicio_do_periodo(agora or datetime.now(), granularidade)
+    fim_historico = corte if ate is None else min(ate, corte)
+
+    totais = {}
+    if de is None or de < fim_historico:
+        chave = (granularidade, dono_id, evento_id, de, fim_historico, versao_conteudo())
+        totais.update(cache_historico.obter_ou_calcular(
+            chave, lambda: _contar_por_periodo(granularidade, dono_id, evento_id, de, fim_historico, FONTES)))
+    if ate is None or ate > corte:
+        totais.update(_contar_por_periodo(granularidade, dono_id, evento_id, max(de or corte, corte), ate))
+
+    return [
+        {"inicio": inicio.date().isoformat(), "total": total}
+        for inicio, total in sorted(totais.items())
+    ]
+
+
+def ocupacao_eventos(dono_id=None):
+    """Inscritos e taxa de ocupação de cada evento, ativos e arquivados (um SELECT ... UNION ALL)."""
+    query = None
+    for inscricao, evento in FONTES:
+        parte = (evento
+                 .select(evento.id.alias('evento_id'), evento.titulo, evento.tipo, evento.tipo_vagas,
+                         evento.numero_vagas, fn.COUNT(inscricao.id).alias('inscritos'), evento.data.alias('data'))
+                 .join(inscricao, JOIN.LEFT_OUTER)
+                 .group_by(evento.id))
+        if dono_id is not None:
+            parte = parte.where(evento.criado_por == dono_id)
+        query = parte if query is None else query.union_all(parte)
+    query = query.order_by(SQL('data').desc(), SQL('evento_id').desc())
+
+    eventos = []
+    for evento_id, titulo, tipo, tipo_vagas, vagas, total, _ in query.tuples():
+        limitado = tipo_vagas == 'limitada' and vagas
+        eventos.append({
+            "id": evento_id,
+            "titulo": titulo,
+            "tipo": tipo,
+            "numero_vagas": vagas,
+            "inscritos": total,
+            "taxa_ocupacao": round(total / vagas, 4) if limitado else None,
+        })
+    return eventos
+
+
+def inscricoes_por_tipo(dono_id=None):
+    """Quantidade de eventos e de inscrições agrupada por tipo, somando ativos e arquivados."""
+    query = None
+    for inscricao, evento in FONTES:
+        parte = (evento
+                 .select(evento.tipo, fn.COUNT(fn.DISTINCT(evento.id)), fn.COUNT(inscricao.id))
+                 .join(inscricao, JOIN.LEFT_OUTER)
+                 .group_by(evento.tipo))
+        if dono_id is not None:
+            parte = parte.where(evento.criado_por == dono_id)
+        query = parte if query is None else query.union_all(parte)
+
+    # Um evento está em uma só das tabelas: as contagens das duas partes se somam
+    totais = {}
+    for tipo, eventos, inscricoes in query.tuples():
+        anterior = totais.get(tipo, (0, 0))
+        totais[tipo] = (anterior[0] + eventos, anterior[1] + inscricoes)
+    return [
+        {"tipo": tipo, "eventos": eventos, "inscricoes": inscricoes}
+        for tipo, (eventos, inscricoes) in sorted(totais.items())
+    ]
+
+
+def parse_data(valor):
+    """'YYYY-MM-DD' -> datetime (meia-noite). Lança ValueError para formatos inválidos."""
+    return datetime.combine(date.fromisoformat(valor), datetime.min.time())
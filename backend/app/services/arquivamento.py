@@ -0,0 +1,107 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from peewee import PostgresqlDatabase, Value
+
+from ..models.arquivo import AvisoArquivado, EventoArquivado, InscricaoArquivada
+from ..models.avisos import Aviso
+from ..models.eventos import Evento
+from ..models.inscricao_evento import InscricaoEvento
+from .estatisticas import ajustar_contagem
+from .sinais import notificar_alteracao
+from .sincronizacao import registrar_remocoes
+
+# Itens movidos por transação: cada lote segura as linhas por pouco tempo
+LOTE_PADRAO = 500
+DIAS_AVISOS_PADRAO = 365
+DIAS_EVENTOS_PADRAO = 180
+
+# Tabela quente -> (tabela fria, campo das estatísticas, tipo do log de atividades)
+# O campo das estatísticas é também o conjunto das lápides do /sync
+ARQUIVOS = {
+    Aviso: (AvisoArquivado, "avisos", "aviso"),
+    Evento: (EventoArquivado, "eventos", "evento"),
+}
+
+
+def _copiar(origem, destino, condicao, carimbo=None):
+    """INSERT INTO destino SELECT ... FROM origem WHERE condicao (colunas pelo nome)."""
+    campos = [f for f in origem._meta.sorted_fields if f.name in destino._meta.fields]
+    colunas = [destino._meta.fields[f.name] for f in campos]
+    selecao = list(campos)
+    if carimbo is not None:
+        colunas.append(destino.arquivado_em)
+        selecao.append(Value(carimbo))
+    destino.insert_from(origem.select(*selecao).where(condicao), colunas).execute()
+
+
+def _mover_lote(modelo, limite, lote):
+    """Move até 'lote' itens com data < limite para a tabela fria. Retorna quantos moveu."""
+    arquivo, campo, _ = ARQUIVOS[modelo]
+    database = modelo._meta.database
+    with database.atomic():
+        query = (modelo
+                 .select(modelo.id, modelo.criado_por)
+                 .where(modelo.data < limite)
+                 .order_by(modelo.id)
+                 .limit(lote))
+        if isinstance(database, PostgresqlDatabase):
+            # Linhas que uma rota estiver alterando ficam para o próximo lote
+            query = query.for_update('FOR UPDATE SKIP LOCKED')
+        linhas = list(query.tuples())
+        if not linhas:
+            return 0
+
+        ids = [item_id for item_id, _ in linhas]
+        _copiar(modelo, arquivo, modelo.id.in_(ids), datetime.now())
+        if modelo is Evento:
+            # As inscrições acompanham o evento (relatórios e histórico continuam disponíveis)
+            _copiar(InscricaoEvento, InscricaoArquivada, InscricaoEvento.evento.in_(ids))
+            registrar_remocoes('inscricoes', InscricaoEvento, InscricaoEvento.evento.in_(ids))
+            InscricaoEvento.delete().where(InscricaoEvento.evento.in_(ids)).execute()
+        modelo.delete().where(modelo.id.in_(ids)).execute()
+        # Para o /sync, sair da tabela quente é uma remoção
+        registrar_remocoes(campo, modelo, ids)
+
+        # As contagens do dashboard refletem só o conteúdo ativo
+        for dono_id, total in Counter(dono_id for _, dono_id in linhas).items():
+            ajustar_contagem(dono_id, **{campo: -total})
+    return len(ids)
+
+
+def arquivar(modelo, limite, lote=LOTE_PADRAO):
+    """Move para o arquivo todos os itens de 'modelo' com data anterior a 'limite', lote a lote."""
+    total = 0
+    while True:
+        movidos = _mover_lote(modelo, limite, lote)
+        total += movidos
+        if movidos < lote:
+            break
+    if total:
+        notificar_alteracao(ARQUIVOS[modelo][2], None)
+    return total
+
+
+def arquivar_antigos(dias_avisos=DIAS_AVISOS_PADRAO, dias_eventos=DIAS_EVENTOS_PADRAO,
+                     lote=LOTE_PADRAO, hoje=None):
+    """Avisos publicados há mais de 'dias_avisos' e eventos que passaram há mais de 'dias_eventos'."""
+    hoje = hoje or date.today()
+    return {
+        "avisos": arquivar(Aviso, hoje - timedelta(days=dias_avisos), lote),
+        "eventos": arquivar(Evento, hoje - timedelta(days=dias_eventos), lote),
+    }
+
+
+
+def unir_arquivo(modelo, colunas, trocas=()):
+    """
+    SELECT das 'colunas' na tabela quente UNION ALL as mesmas colunas na tabela fria
+    (?include_archived=true nas listagens). 'trocas' são pares (coluna quente, coluna fria)
+    para o que não é um campo do modelo, como subconsultas.
+    """
+    arquivo = ARQUIVOS[modelo][0]
+    frias = []
+    for coluna in colunas:
+        troca = next((fria for quente, fria in trocas if quente is coluna), None)
+        frias.append(troca if troca is not None else arquivo._meta.fields[coluna.name])
+    return modelo.select(*colunas) + arquivo.select(*frias)
@@ -0,0 +1,120 @@
+import base64
+from datetime import datetime
+
+from flask_login import current_user
+from peewee import Tuple
+
+from ..models.atividade import Atividade
+from .sinais import notificar_alteracao
+
+# Texto exibido para cada (tipo, acao)
+ROTULOS = {
+    ("evento", "criado"): "Evento Registrado",
+    ("evento", "atualizado"): "Evento Atualizado",
+    ("evento", "removido"): "Evento Removido",
+    ("aviso", "criado"): "Aviso Publicado",
+    ("aviso", "atualizado"): "Aviso Atualizado",
+    ("aviso", "removido"): "Aviso Removido",
+    ("agenda", "criado"): "Novo Agendamento",
+    ("agenda", "atualizado"): "Agendamento Atualizado",
+    ("agenda", "removido"): "Agendamento Removido",
+    ("horario", "criado"): "Horário Publicado",
+    ("horario", "atualizado"): "Horário Atualizado",
+    ("horario", "removido"): "Horário Removido",
+    ("inscricao", "criado"): "Nova Inscrição",
+    ("usuario", "criado"): "Usuário Cadastrado",
+    ("usuario", "atualizado"): "Usuário Atualizado",
+    ("usuario", "removido"): "Usuário Removido",
+}
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+
+def registrar_atividade(tipo, acao, item_id, titulo, dono_id):
+    """
+    Acrescenta uma linha ao log. Chamar dentro da transação da própria alteração;
+    os caches dependentes são avisados (conteudo_alterado) depois do COMMIT.
+    """
+    autor_id = current_user.idusuario if current_user and current_user.is_authenticated else None
+    Atividade.insert(
+        tipo=tipo,
+        acao=acao,
+        item_id=item_id,
+        titulo=(titulo or '')[:150] or None,
+        autor_id=autor_id,
+        dono_id=dono_id,
+        created_at=datetime.now()
+    ).execute()
+    notificar_alteracao(tipo, dono_id)
+
+
+def registrar_atividades(itens):
+    """
+    Versão em lote de registrar_atividade: 'itens' são tuplas
+    (tipo, acao, item_id, titulo, dono_id), gravadas em um único INSERT.
+    """
+    if not itens:
+        return
+    autor_id = current_user.idusuario if current_user and current_user.is_authenticated else None
+    agora = datetime.now()
+    Atividade.insert_many([
+        {"tipo": tipo, "acao": acao, "item_id": item_id, "titulo": (titulo or '')[:150] or None,
+         "autor_id": autor_id, "dono_id": dono_id, "created_at": agora}
+        for tipo, acao, item_id, titulo, dono_id in itens
+    ]).execute()
+    for tipo, _, _, _, dono_id in itens:
+        notificar_alteracao(tipo, dono_id)
+
+
+def serializar(atividade):
+    return {
+        "id": atividade.id,
+        "action": ROTULOS.get((atividade.tipo, atividade.acao), atividade.acao),
+        "item": atividade.titulo,
+        "type": atividade.tipo,
+        "acao": atividade.acao,
+        "item_id": atividade.item_id,
+        "created_at": atividade.created_at.isoformat(),
+    }
+
+
+def consulta_atividades(user):
+    """Admin vê tudo; gestor vê as alterações no conteúdo que é dele."""
+    query = Atividade.select()
+    if user.tipo != 'admin':
+        query = query.where(Atividade.dono_id == user.idusuario)
+    return query.order_by(Atividade.created_at.desc(), Atividade.id.desc())
+
+
+# --- CURSOR (opaco para o cliente: "created_at|id" em base64) ---
+
+def codificar_cursor(atividade):
+    bruto = f"{atividade.created_at.isoformat()}|{atividade.id}"
+    return base64.urlsafe_b64encode(bruto.encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    """Retorna (created_at, id). Lança ValueError para cursores inválidos."""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, item_id = bruto.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except Exception:
+        raise ValueError("Cursor inválido.")
+
+
+def pagina_atividades(user, cursor=None, limite=LIMITE_PADRAO):
+    """
+    Uma página do feed em uma única varredura de índice:
+    WHERE (created_at, id) < (cursor) ORDER BY created_at DESC, id DESC LIMIT n + 1.
+    """
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+    query = consulta_atividades(user)
+    if cursor:
+        created_at, item_id = decodificar_cursor(cursor)
+        query = query.where(Tuple(Atividade.created_at, Atividade.id) < Tuple(created_at, item_id))
+
+    linhas = list(query.limit(limite + 1))
+    proximo = codificar_cursor(linhas[limite - 1]) if len(linhas) > limite else None
+    return [serializar(a) for a in linhas[:limite]], proximo
@@ -0,0 +1,92 @@
+import operator
+import re
+from functools import reduce
+
+from peewee import Expression, PostgresqlDatabase, SQL, Value, fn
+
+from ..models.migracoes import COLUNA_BUSCA, MODELOS_BUSCA, TABELA_FTS
+
+# Dicionário do Postgres (stemming e stopwords em português)
+CONFIGURACAO = 'portuguese'
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 50
+TAMANHO_MINIMO = 2
+TAMANHO_TRECHO = 200
+# Pesos do bm25 no FTS5, na ordem das colunas (tipo, item_id, data, titulo, descricao)
+PESOS_FTS = (0, 0, 0, 10.0, 1.0)
+
+
+def _trecho(descricao):
+    if not descricao or len(descricao) <= TAMANHO_TRECHO:
+        return descricao
+    return descricao[:TAMANHO_TRECHO].rsplit(' ', 1)[0] + '…'
+
+
+def _consulta_postgres(tipo, modelo, consulta):
+    vetor = SQL(f'"{COLUNA_BUSCA}"')
+    return (modelo
+            .select(Value(tipo).alias('tipo'), modelo.id.alias('item_id'), modelo.titulo,
+                    modelo.descricao, modelo.data, fn.ts_rank(vetor, consulta).alias('rank'))
+            .where(Expression(vetor, '@@', consulta)))
+
+
+def _buscar_postgres(texto, tipos, limite):
+    """Uma consulta por tabela (varredura do índice GIN), unidas e ordenadas pelo ts_rank."""
+    consulta = fn.websearch_to_tsquery(CONFIGURACAO, texto)
+    partes = [_consulta_postgres(tipo, MODELOS_BUSCA[tipo], consulta) for tipo in tipos]
+    query = reduce(operator.add, partes).order_by(SQL('rank').desc()).limit(limite)
+    return list(query.dicts())
+
+
+def _consulta_fts(texto):
+    """
+    Termos do usuário como uma consulta FTS5 segura: cada palavra entre aspas e como
+    prefixo ("batiz"* encontra batizado/batismo), todas obrigatórias.
+    """
+    return ' '.join(f'"{palavra}"*' for palavra in re.findall(r'\w+', texto)[:10])
+
+
+def _buscar_sqlite(database, texto, tipos, limite):
+    consulta = _consulta_fts(texto)
+    if not consulta:
+        return []
+    pesos = ', '.join(str(p) for p in PESOS_FTS)
+    marcadores = ', '.join('?' for _ in tipos)
+    cursor = database.execute_sql(
+        f'SELECT tipo, item_id, titulo, descricao, data, -bm25("{TABELA_FTS}", {pesos}) AS rank '
+        f'FROM "{TABELA_FTS}" WHERE "{TABELA_FTS}" MATCH ? AND tipo IN ({marcadores}) '
+        f'ORDER BY rank DESC LIMIT ?',
+        (consulta, *tipos, limite))
+    colunas = [c[0] for c in cursor.description]
+    return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+
+def buscar(texto, tipos=None, limite=LIMITE_PADRAO):
+    """
+    Busca textual em avisos, eventos e agenda (título pesa mais que descrição), mais
+    relevantes primeiro. Lança ValueError para termos curtos demais ou tipos desconhecidos.
+    """
+    texto = (texto or '').strip()
+    if len(texto) < TAMANHO_MINIMO:
+        raise ValueError(f"Informe ao menos {TAMANHO_MINIMO} caracteres para buscar.")
+    tipos = tuple(tipos or MODELOS_BUSCA)
+    desconhecidos = [t for t in tipos if t not in MODELOS_BUSCA]
+    if desconhecidos:
+        raise ValueError(f"Tipos desconhecidos: {', '.join(desconhecidos)}. "
+                         f"Disponíveis: {', '.join(MODELOS_BUSCA)}.")
+    limite = max(1, min(int(limite), LIMITE_MAXIMO))
+
+    database = MODELOS_BUSCA[tipos[0]]._meta.database
+    if isinstance(database, PostgresqlDatabase):
+        linhas = _buscar_postgres(texto, tipos, limite)
+    else:
+        linhas = _buscar_sqlite(database, texto, tipos, limite)
+
+    return [{
+        "tipo": linha["tipo"],
+        "id": linha["item_id"],
+        "titulo": linha["titulo"],
+        "trecho": _trecho(linha["descricao"]),
+        "data": str(linha["data"]) if linha["data"] else None,
+        "relevancia": round(float(linha["rank"]), 4),
+    } for linha in linhas]
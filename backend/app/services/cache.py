@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .metricas import metricas
+
+_AUSENTE = object()
+
+
+class Cache:
+    """
+    Cache em memória do processo, com TTL e limite de itens (LRU).
+    Acertos e falhas vão para as métricas como 'cache.<nome>.hits' / '.misses'.
+    """
+
+    def __init__(self, nome, max_itens=1024, ttl=300):
+        self.nome = nome
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave, padrao=None):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._itens.get(chave, _AUSENTE)
+            if item is not _AUSENTE and item[0] > agora:
+                self._itens.move_to_end(chave)
+                metricas.incrementar(f"cache.{self.nome}.hits")
+                return item[1]
+            if item is not _AUSENTE:
+                del self._itens[chave]
+        metricas.incrementar(f"cache.{self.nome}.misses")
+        return padrao
+
+    def set(self, chave, valor, ttl=None):
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._itens[chave] = (expira, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def obter_ou_calcular(self, chave, calcular, ttl=None):
+        valor = self.get(chave, _AUSENTE)
+        if valor is _AUSENTE:
+            valor = calcular()
+            self.set(chave, valor, ttl)
+        return valor
+
+    def invalidar(self, *chaves):
+        with self._lock:
+            for chave in chaves:
+                self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
@@ -0,0 +1,35 @@
+from functools import lru_cache
+
+
+class CampoDesconhecido(ValueError):
+    pass
+
+
+class Projecao:
+    """
+    Campos que uma rota de listagem sabe devolver: nome no JSON -> (colunas, conversão).
+    Com ?fields=titulo,data a consulta seleciona só as colunas necessárias e o JSON
+    traz só esses campos. O parse de cada valor de 'fields' fica em cache (por rota).
+    """
+
+    def __init__(self, campos):
+        self.campos = campos
+        self.escolher = lru_cache(maxsize=128)(self._escolher)
+
+    def _escolher(self, parametro):
+        """Retorna (nomes, colunas). Lança CampoDesconhecido para campos que não existem."""
+        if not parametro:
+            nomes = tuple(self.campos)
+        else:
+            nomes = tuple(dict.fromkeys(p.strip() for p in parametro.split(',') if p.strip()))
+            desconhecidos = [n for n in nomes if n not in self.campos]
+            if desconhecidos or not nomes:
+                raise CampoDesconhecido(
+                    f"Campos desconhecidos: {', '.join(desconhecidos) or '(nenhum)'}. "
+                    f"Disponíveis: {', '.join(self.campos)}."
+                )
+        colunas = tuple(dict.fromkeys(c for n in nomes for c in self.campos[n][0]))
+        return nomes, colunas
+
+    def serializar(self, linha, nomes):
+        return {nome: self.campos[nome][1](linha) for nome in nomes}
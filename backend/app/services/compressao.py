@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import zlib
+
+from flask import request, current_app
+
+from .cache import Cache
+from .metricas import metricas
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = ('application/json', 'text/', 'application/javascript', 'application/xml')
+
+# Listagens públicas: o mesmo corpo se repete para todos, então o resultado comprimido
+# é guardado (chave = hash do corpo, sem necessidade de invalidação)
+ENDPOINTS_EM_CACHE = ('api.get_eventos', 'api.get_avisos', 'api.get_agenda', 'api.get_horarios_publicos')
+
+cache_comprimido = Cache('compressao', max_itens=64, ttl=60 * 60)
+
+
+def _escolher_codificacao():
+    aceitas = request.accept_encodings
+    if brotli is not None and aceitas['br']:
+        return 'br'
+    if aceitas['gzip']:
+        return 'gzip'
+    return None
+
+
+def _comprimir(corpo, codificacao, nivel_gzip, nivel_br):
+    if codificacao == 'br':
+        return brotli.compress(corpo, quality=nivel_br)
+    return gzip.compress(corpo, compresslevel=nivel_gzip, mtime=0)
+
+
+def _comprimir_fluxo(partes, codificacao, nivel_gzip, nivel_br):
+    """Comprime um corpo em streaming: cada parte é enviada assim que produzida (sync flush)."""
+    if codificacao == 'br':
+        compressor = brotli.Compressor(quality=nivel_br)
+        for parte in partes:
+            dados = compressor.process(parte) + compressor.flush()
+            if dados:
+                yield dados
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for parte in partes:
+        dados = compressor.compress(parte) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if dados:
+            yield dados
+    yield compressor.flush()
+
+
+class Compressao:
+    """
+    Compressão gzip/brotli negociada pelo Accept-Encoding (after_request).
+    Respostas pequenas (abaixo de COMPRESS_MIN_SIZE) saem como estão; respostas
+    em streaming (ex.: SSE) são comprimidas parte a parte.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+        app.after_request(self.processar)
+
+    def processar(self, response):
+        if request.method == 'HEAD' or response.direct_passthrough or \
+                not (200 <= response.status_code < 300) or response.status_code == 204 or \
+                'Content-Encoding' in response.headers or \
+                not (response.mimetype or '').startswith(TIPOS_COMPRIMIVEIS):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        codificacao = _escolher_codificacao()
+        if codificacao is None:
+            return response
+
+        config = current_app.config
+        niveis = (config['COMPRESS_LEVEL'], config['COMPRESS_BR_LEVEL'])
+
+        if response.is_streamed:
+            response.response = _comprimir_fluxo(response.iter_encoded(), codificacao, *niveis)
+            response.headers.pop('Content-Length', None)
+        else:
+            corpo = response.get_data()
+            if len(corpo) < config['COMPRESS_MIN_SIZE']:
+                return response
+            if request.method == 'GET' and request.endpoint in ENDPOINTS_EM_CACHE:
+                chave = (codificacao, niveis, hashlib.blake2b(corpo, digest_size=16).digest())
+                comprimido = cache_comprimido.obter_ou_calcular(
+                    chave, lambda: _comprimir(corpo, codificacao, *niveis))
+            else:
+                comprimido = _comprimir(corpo, codificacao, *niveis)
+            response.set_data(comprimido)
+            metricas.incrementar(f"compressao.{codificacao}.bytes_economizados", len(corpo) - len(comprimido))
+
+        response.headers['Content-Encoding'] = codificacao
+        # A mesma ETag forte não pode valer para o corpo original e o comprimido (RFC 9110, 8.8.3):
+        # comprimida, a representação passa a ter uma ETag fraca
+        etag, fraca = response.get_etag()
+        if etag and not fraca:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from flask import request, jsonify
+
+
+class ConflitoDeVersao(Exception):
+    def __init__(self, atual):
+        super().__init__(f"Versão atual: {atual}")
+        self.atual = atual
+
+
+def versao_esperada():
+    """
+    Versão exigida pelo cabeçalho If-Match ("3" ou W/"3"); None se ausente ou '*'
+    (atualização incondicional). Lança ValueError para valores inválidos.
+    """
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return None
+    valores = if_match.as_set(include_weak=True)
+    if len(valores) != 1:
+        raise ValueError("If-Match deve trazer uma única versão.")
+    try:
+        return int(valores.pop())
+    except ValueError:
+        raise ValueError("If-Match deve trazer a versão do item (ex.: \"3\").")
+
+
+def update_versionado(modelo, item_id, valores, esperada=None, retornar=(), condicao_extra=None):
+    """
+    UPDATE ... SET valores, version = version + 1 WHERE pk = item_id [AND version = esperada]
+    [AND condicao_extra] RETURNING version, *retornar. Retorna a linha devolvida (tupla) ou
+    None se nada foi alterado.
+    """
+    pk = modelo._meta.primary_key
+    valores = dict(valores)
+    valores[modelo.version] = modelo.version + 1
+    if 'updated_at' in modelo._meta.fields:
+        valores[modelo.updated_at] = datetime.now()
+
+    condicao = pk == item_id
+    if esperada is not None:
+        condicao &= modelo.version == esperada
+    if condicao_extra is not None:
+        condicao &= condicao_extra
+    linhas = list(modelo.update(valores).where(condicao).returning(modelo.version, *retornar).tuples().execute())
+    return linhas[0] if linhas else None
+
+
+def atualizar_versionado(modelo, item_id, valores, esperada=None, retornar=()):
+    """
+    Atualização condicional em uma instrução, sem travar a linha entre requisições.
+    Retorna a nova versão ou, com 'retornar', a linha (versão, *retornar) do RETURNING.
+    Lança ConflitoDeVersao se o item mudou desde 'esperada' e modelo.DoesNotExist se
+    ele não existe (mais).
+    """
+    linha = update_versionado(modelo, item_id, valores, esperada, retornar)
+    if linha:
+        return linha if retornar else linha[0]
+
+    # Só no caminho do conflito: distingue "mudou" de "não existe"
+    atual = modelo.select(modelo.version).where(modelo._meta.primary_key == item_id).scalar()
+    if atual is None:
+        raise modelo.DoesNotExist
+    raise ConflitoDeVersao(atual)
+
+
+def resposta_conflito_versao(conflito):
+    resposta = jsonify({
+        "error": "O item foi alterado por outra pessoa. Recarregue e tente novamente.",
+        "version": conflito.atual,
+    })
+    resposta.status_code = 409
+    resposta.set_etag(str(conflito.atual))
+    return resposta
+
+
+def resposta_versionada(corpo, versao):
+    """Resposta 200 com a nova versão no corpo e no ETag (para o próximo If-Match)."""
+    resposta = jsonify(dict(corpo, version=versao))
+    resposta.set_etag(str(versao))
+    return resposta
@@ -0,0 +1,158 @@
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from peewee import PostgresqlDatabase
+
+from ..models.agenda import Agenda
+from ..models.eventos import Evento
+from .recorrencia import expandir_horarios, normalizar_dia_semana
+
+# Os modelos não têm horário de término: toda reserva ocupa o local por uma hora
+DURACAO = timedelta(hours=1)
+# Até onde olhar reservas pontuais ao criar um horário semanal
+HORIZONTE_RECORRENTE = timedelta(days=365)
+
+
+class IndiceIntervalos:
+    """
+    Índice em memória das reservas de cada local: inícios ordenados + bisect.
+    Como todas as reservas têm a mesma duração, duas se sobrepõem se e só se
+    os inícios distam menos que DURACAO; cada consulta é O(log n + conflitos).
+    """
+
+    def __init__(self):
+        self._locais = defaultdict(lambda: ([], []))
+
+    def adicionar(self, local, inicio, reserva):
+        inicios, reservas = self._locais[local]
+        posicao = bisect_right(inicios, inicio)
+        inicios.insert(posicao, inicio)
+        reservas.insert(posicao, reserva)
+
+    def sobrepostas(self, local, inicio):
+        if local not in self._locais:
+            return []
+        inicios, reservas = self._locais[local]
+        return reservas[bisect_right(inicios, inicio - DURACAO):bisect_left(inicios, inicio + DURACAO)]
+
+
+def _reserva(tipo, item_id, titulo, dia, horario):
+    return {"tipo": tipo, "id": item_id, "titulo": titulo, "data": dia.isoformat(), "horario": str(horario)}
+
+
+def carregar_reservas(locais, inicio, fim):
+    """
+    Índice com as reservas pontuais (Agenda e Evento) e as ocorrências dos horários
+    semanais dos 'locais' entre 'inicio' e 'fim' (datas). Uma varredura de intervalo
+    por tabela no índice (local, data, horario); os horários vêm da expansão memoizada.
+    """
+    locais = set(locais)
+    indice = IndiceIntervalos()
+    # Um dia de folga nas pontas: reservas perto da meia-noite invadem o dia vizinho
+    de, ate = inicio - timedelta(days=1), fim + timedelta(days=1)
+
+    for tipo, modelo in (("agenda", Agenda), ("evento", Evento)):
+        query = (modelo
+                 .select(modelo.id, modelo.titulo, modelo.local, modelo.data, modelo.horario)
+                 .where(modelo.local.in_(list(locais)) & (modelo.data >= de) & (modelo.data <= ate))
+                 .tuples())
+        for item_id, titulo, local, dia, horario in query:
+            indice.adicionar(local, datetime.combine(dia, horario), _reserva(tipo, item_id, titulo, dia, horario))
+
+    for ocorrencia in expandir_horarios(de, ate):
+        if ocorrencia["local"] in locais:
+            dia = date.fromisoformat(ocorrencia["data"])
+            horario = time.fromisoformat(ocorrencia["horario"])
+            indice.adicionar(ocorrencia["local"], datetime.combine(dia, horario),
+                             _reserva("horario", ocorrencia["id"], ocorrencia["titulo"], dia, horario))
+    return indice
+
+
+def conflitos_reserva(local, dia, horario):
+    """Reservas que se sobrepõem a uma nova reserva pontual em 'local'."""
+    indice = carregar_reservas([local], dia, dia)
+    return indice.sobrepostas(local, datetime.combine(dia, horario))
+
+
+def _minutos(horario):
+    return horario.hour * 60 + horario.minute
+
+
+def conflitos_horario_semanal(local, dia_semana, horario):
+    """
+    Conflitos de um novo horário semanal: outros horários do mesmo local em dias
+    em comum e reservas pontuais futuras (até HORIZONTE_RECORRENTE) nesses dias.
+    """
+    dias = normalizar_dia_semana(dia_semana)
+    if not dias:
+        return []
+    janela = DURACAO.total_seconds() // 60
+    conflitos = []
+
+    horarios = (Agenda
+                .select(Agenda.id, Agenda.titulo, Agenda.horario, Agenda.dia_semana)
+                .where((Agenda.local == local) & (Agenda.is_public == True) & Agenda.dia_semana.is_null(False)))
+    for h in horarios:
+        if dias & normalizar_dia_semana(h.dia_semana) and abs(_minutos(h.horario) - _minutos(horario)) < janela:
+            conflitos.append({"tipo": "horario", "id": h.id, "titulo": h.titulo,
+                              "dia_semana": h.dia_semana, "horario": str(h.horario)})
+
+    hoje = date.today()
+    indice = carregar_reservas([local], hoje, hoje + HORIZONTE_RECORRENTE)
+    dia = hoje
+    while dia <= hoje + HORIZONTE_RECORRENTE:
+        if dia.weekday() in dias:
+            conflitos.extend(r for r in indice.sobrepostas(local, datetime.combine(dia, horario))
+                             if r["tipo"] != "horario")
+        dia += timedelta(days=1)
+    return conflitos
+
+
+def travar_local(database, local):
+    """
+    No Postgres, serializa as reservas de um mesmo local até o fim da transação
+    (pg_advisory_xact_lock), para que duas criações simultâneas não passem ambas
+    pela verificação. No SQLite as escritas já são serializadas.
+    """
+    if isinstance(database, PostgresqlDatabase):
+        chave = zlib.crc32(f"local:{local}".encode('utf-8'))
+        database.execute_sql('SELECT pg_advisory_xact_lock(%s)', (chave,))
+
+
+def verificar_reserva(database, dados):
+    """
+    Conflitos da reserva pontual descrita em 'dados' (local, data, horario), com o local
+    travado até o fim da transação. Vazio se faltar algum campo ou se o cliente
+    enviou 'ignorar_conflitos'.
+    """
+    local = dados.get('local')
+    try:
+        dia, horario = date.fromisoformat(str(dados.get('data'))), time.fromisoformat(str(dados.get('horario')))
+    except ValueError:
+        return []
+    if dados.get('ignorar_conflitos') or not local:
+        return []
+    travar_local(database, local)
+    return conflitos_reserva(local, dia, horario)
+
+
+def verificar_horario_semanal(database, dados):
+    """Como verificar_reserva, para um horário semanal (local, dia, horario)."""
+    local = dados.get('local')
+    try:
+        horario = time.fromisoformat(str(dados.get('horario')))
+    except ValueError:
+        return []
+    if dados.get('ignorar_conflitos') or not local:
+        return []
+    travar_local(database, local)
+    return conflitos_horario_semanal(local, dados.get('dia'), horario)
+
+
+def resposta_conflito(conflitos):
+    return {
+        "error": "Já existe uma reserva neste local e horário (envie 'ignorar_conflitos' para criar mesmo assim).",
+        "conflitos": conflitos,
+    }
@@ -0,0 +1,36 @@
+import threading
+
+from flask import current_app
+
+from .adiados import ModuloAdiado
+
+flask_mail = ModuloAdiado('flask_mail')
+
+
+class Correio:
+    """
+    Flask-Mail sob demanda: init_app não importa a extensão; a configuração
+    (app.extensions['mail']) é montada no primeiro envio, a partir de app.config.
+    """
+
+    def __init__(self, app=None):
+        self._mail = None
+        self._trava = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Nada a preparar: MAIL_* são lidos de app.config no primeiro envio
+        app.extensions.setdefault('correio', self)
+
+    def _extensao(self):
+        app = current_app._get_current_object()
+        with self._trava:
+            if self._mail is None:
+                self._mail = flask_mail.Mail()
+            if 'mail' not in app.extensions:
+                self._mail.init_app(app)
+        return self._mail
+
+    def send(self, message):
+        self._extensao().send(message)
@@ -0,0 +1,112 @@
+from peewee import fn, Case, Value, Select, EXCLUDED, PostgresqlDatabase
+
+from ..models.estatistica import EstatisticaConteudo
+from ..models.eventos import Evento
+from ..models.avisos import Aviso
+from ..models.agenda import Agenda
+
+# Linha com os totais de todos os usuários
+GLOBAL = 0
+CAMPOS = ("eventos", "avisos", "agenda", "horarios")
+
+
+def ajustar_contagem(dono_id, **deltas):
+    """
+    Soma 'deltas' (ex.: eventos=1, agenda=-1) na linha do dono e na linha GLOBAL,
+    em um único INSERT ... ON CONFLICT DO UPDATE. Deve ser chamada dentro da mesma
+    transação que cria/apaga o conteúdo.
+    """
+    linha = {campo: deltas.get(campo, 0) for campo in CAMPOS}
+    update = {
+        getattr(EstatisticaConteudo, campo): getattr(EstatisticaConteudo, campo) + getattr(EXCLUDED, campo)
+        for campo in CAMPOS if deltas.get(campo)
+    }
+    (EstatisticaConteudo
+     .insert_many([dict(linha, usuario_id=dono_id), dict(linha, usuario_id=GLOBAL)])
+     .on_conflict(conflict_target=[EstatisticaConteudo.usuario_id], update=update)
+     .execute())
+
+
+def contagem_agenda(is_public, sinal=1):
+    """Deltas para um item da tabela Agenda (horários públicos contam nos dois cards)."""
+    deltas = {"agenda": sinal}
+    if is_public:
+        deltas["horarios"] = sinal
+    return deltas
+
+
+def consulta_estatisticas(user):
+    """
+    Consultas (uma por card, no formato (kind, num) do dashboard) que leem
+    as contagens prontas: no máximo duas linhas por chave primária.
+    """
+    dono = GLOBAL if user.tipo == 'admin' else user.idusuario
+    consultas = []
+    for campo in CAMPOS:
+        # Horários públicos todos veem: sempre vêm da linha GLOBAL
+        linha = GLOBAL if campo == "horarios" else dono
+        consultas.append(
+            EstatisticaConteudo
+            .select(Value(f'total_{campo}').alias('kind'),
+                    getattr(EstatisticaConteudo, campo).alias('num'))
+            .where(EstatisticaConteudo.usuario_id == linha)
+        )
+    return consultas
+
+
+def _contagens():
+    """
+    SELECT usuario_id, eventos, avisos, agenda, horarios: uma linha por dono e a GLOBAL,
+    com as contagens agregadas uma única vez (CTE).
+    """
+    zero = Value(0)
+    publicos = fn.SUM(Case(None, [(Agenda.is_public == True, 1)], 0))
+    partes = (
+        Evento.select(Evento.criado_por.alias('usuario_id'), fn.COUNT(Evento.id).alias('eventos'),
+                      zero.alias('avisos'), zero.alias('agenda'), zero.alias('horarios'))
+        .group_by(Evento.criado_por)
+        .union_all(Aviso.select(Aviso.criado_por, zero, fn.COUNT(Aviso.id), zero, zero)
+                   .group_by(Aviso.criado_por))
+        .union_all(Agenda.select(Agenda.criado_por, zero, zero, fn.COUNT(Agenda.id), publicos)
+                   .group_by(Agenda.criado_por))
+    ).cte('partes', columns=('usuario_id',) + CAMPOS)
+    somas = [fn.COALESCE(fn.SUM(getattr(partes.c, c)), 0).alias(c) for c in CAMPOS]
+    por_dono = Select([partes], [partes.c.usuario_id] + somas).group_by(partes.c.usuario_id)
+    geral = Select([partes], [Value(GLOBAL).alias('usuario_id')] + somas)
+    totais = por_dono.union_all(geral).cte('totais', columns=('usuario_id',) + CAMPOS)
+    # WHERE explícito: sem ele o SQLite confunde o ON CONFLICT do INSERT ... SELECT com um JOIN
+    return (Select([totais], [totais.c.usuario_id] + [getattr(totais.c, c) for c in CAMPOS])
+            .where(Value(1) == 1)
+            .with_cte(partes, totais))
+
+
+def reconciliar_estatisticas():
+    """
+    Recalcula todas as contagens a partir das tabelas de conteúdo (corrige divergências).
+    Contagem e gravação na mesma transação, com a tabela travada para as escritas: um
+    ajustar_contagem concorrente espera e soma depois, em vez de ser sobrescrito.
+    """
+    database = EstatisticaConteudo._meta.database
+    with database.atomic():
+        if isinstance(database, PostgresqlDatabase):
+            # Leituras seguem livres; ajustar_contagem (ROW EXCLUSIVE) espera o COMMIT
+            database.execute_sql(f'LOCK TABLE "{EstatisticaConteudo._meta.table_name}" IN EXCLUSIVE MODE')
+
+        campos = [EstatisticaConteudo.usuario_id] + [getattr(EstatisticaConteudo, c) for c in CAMPOS]
+        # INSERT ... SELECT ... ON CONFLICT (usuario_id) DO UPDATE: uma instrução para todas as linhas
+        linhas = (EstatisticaConteudo
+                  .insert_from(_contagens(), campos)
+                  .on_conflict(conflict_target=[EstatisticaConteudo.usuario_id],
+                               update={getattr(EstatisticaConteudo, c): getattr(EXCLUDED, c) for c in CAMPOS})
+                  .as_rowcount()
+                  .execute())
+
+        # Donos que não têm mais nenhum conteúdo
+        donos = (Evento.select(Evento.criado_por)
+                 | Aviso.select(Aviso.criado_por)
+                 | Agenda.select(Agenda.criado_por))
+        (EstatisticaConteudo
+         .update({getattr(EstatisticaConteudo, c): 0 for c in CAMPOS})
+         .where((EstatisticaConteudo.usuario_id != GLOBAL) & EstatisticaConteudo.usuario_id.not_in(donos))
+         .execute())
+    return linhas
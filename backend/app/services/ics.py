@@ -0,0 +1,156 @@
+from datetime import date, datetime, timedelta, timezone
+
+from peewee import fn
+
+from ..models.agenda import Agenda
+from ..models.atividade import Atividade
+from ..models.eventos import Evento
+from .cache import Cache
+from .recorrencia import normalizar_dia_semana
+from .sinais import conteudo_alterado
+
+# Feed -> tipos do log de atividades que alteram o seu conteúdo
+FEEDS = {
+    "agenda": ("agenda", "horario"),
+    "horarios": ("horario", "agenda"),
+    "eventos": ("evento",),
+}
+
+# Sem horário de término no modelo: cada item ocupa uma hora na agenda do celular
+DURACAO_PADRAO = "PT1H"
+# Âncora do DTSTART dos horários semanais (a RRULE cuida das repetições)
+INICIO_RECORRENCIA = date(2024, 1, 1)
+_BYDAY = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# Versão de cada feed (id da última atividade que o afeta), relida do banco a cada poucos
+# segundos: vale entre processos, e as escritas deste processo a descartam na hora
+cache_versoes = Cache('ics_versao', max_itens=16, ttl=5)
+# Corpo gerado por (feed, versão): assinantes novos também não regeram o feed
+cache_feeds = Cache('ics', max_itens=16, ttl=24 * 60 * 60)
+TAMANHO_MAXIMO_CACHE = 2 * 1024 * 1024
+
+
+@conteudo_alterado.connect
+def _invalidar_versoes(tipo, dono_id=None, **extra):
+    for feed, tipos in FEEDS.items():
+        if tipo in tipos:
+            cache_versoes.invalidar(feed)
+
+
+def versao_feed(feed):
+    def consultar():
+        ultimo = Atividade.select(fn.MAX(Atividade.id)).where(Atividade.tipo.in_(FEEDS[feed])).scalar()
+        return ultimo or 0
+    return cache_versoes.obter_ou_calcular(feed, consultar)
+
+
+# --- FORMATO iCalendar (RFC 5545) ---
+
+def _escapar(texto):
+    return (str(texto or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _linha(nome, valor):
+    """Uma propriedade, dobrada em linhas de até 75 octetos."""
+    linha = f"{nome}:{valor}".encode('utf-8')
+    partes = []
+    while len(linha) > 75:
+        corte = 75 if not partes else 74
+        # Não quebra no meio de um caractere UTF-8
+        while corte > 0 and (linha[corte] & 0xC0) == 0x80:
+            corte -= 1
+        partes.append(linha[:corte].decode('utf-8'))
+        linha = linha[corte:]
+    partes.append(linha.decode('utf-8'))
+    return "\r\n ".join(partes) + "\r\n"
+
+
+def _data_hora(dia, hora):
+    return datetime.combine(dia, hora).strftime('%Y%m%dT%H%M%S')
+
+
+def _vevent(uid, titulo, inicio, carimbo, local=None, descricao=None, rrule=None):
+    bloco = ["BEGIN:VEVENT\r\n",
+             _linha("UID", uid),
+             _linha("DTSTAMP", carimbo),
+             _linha("DTSTART", inicio),
+             _linha("DURATION", DURACAO_PADRAO),
+             _linha("SUMMARY", _escapar(titulo))]
+    if rrule:
+        bloco.append(_linha("RRULE", rrule))
+    if local:
+        bloco.append(_linha("LOCATION", _escapar(local)))
+    if descricao:
+        bloco.append(_linha("DESCRIPTION", _escapar(descricao)))
+    bloco.append("END:VEVENT\r\n")
+    return ''.join(bloco)
+
+
+def _itens_agenda(carimbo):
+    query = (Agenda
+             .select(Agenda.id, Agenda.titulo, Agenda.local, Agenda.descricao, Agenda.data, Agenda.horario)
+             .where(Agenda.data.is_null(False))
+             .order_by(Agenda.data, Agenda.horario))
+    for a in query.iterator():
+        yield _vevent(f"agenda-{a.id}@paroquia", a.titulo, _data_hora(a.data, a.horario), carimbo,
+                      a.local, a.descricao)
+
+
+def _itens_horarios(carimbo):
+    query = (Agenda
+             .select(Agenda.id, Agenda.titulo, Agenda.local, Agenda.horario, Agenda.dia_semana)
+             .where((Agenda.is_public == True) & Agenda.dia_semana.is_null(False))
+             .order_by(Agenda.id))
+    for h in query.iterator():
+        dias = sorted(normalizar_dia_semana(h.dia_semana))
+        if not dias:
+            continue
+        primeiro = min(INICIO_RECORRENCIA + timedelta(days=(d - INICIO_RECORRENCIA.weekday()) % 7) for d in dias)
+        yield _vevent(f"horario-{h.id}@paroquia", h.titulo, _data_hora(primeiro, h.horario), carimbo, h.local,
+                      rrule=f"FREQ=WEEKLY;BYDAY={','.join(_BYDAY[d] for d in dias)}")
+
+
+def _itens_eventos(carimbo):
+    query = (Evento
+             .select(Evento.id, Evento.titulo, Evento.local, Evento.descricao, Evento.data, Evento.horario)
+             .order_by(Evento.data, Evento.horario))
+    for e in query.iterator():
+        yield _vevent(f"evento-{e.id}@paroquia", e.titulo, _data_hora(e.data, e.horario), carimbo,
+                      e.local, e.descricao)
+
+
+_GERADORES = {"agenda": _itens_agenda, "horarios": _itens_horarios, "eventos": _itens_eventos}
+_NOMES = {"agenda": "Agenda da Paróquia", "horarios": "Horários da Paróquia", "eventos": "Eventos da Paróquia"}
+
+
+def gerar_feed(feed, fuso='America/Sao_Paulo'):
+    """Gera o .ics em partes (~8 KB), lendo as linhas do banco com um cursor, sem montar tudo em memória."""
+    carimbo = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    cabecalho = ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Paroquia//Calendario//PT-BR\r\n"
+                 "CALSCALE:GREGORIAN\r\nMETHOD:PUBLISH\r\n"
+                 + _linha("X-WR-CALNAME", _escapar(_NOMES[feed])) + _linha("X-WR-TIMEZONE", fuso))
+    bloco = [cabecalho]
+    tamanho = len(cabecalho)
+    for item in _GERADORES[feed](carimbo):
+        bloco.append(item)
+        tamanho += len(item)
+        if tamanho >= 8192:
+            yield ''.join(bloco)
+            bloco, tamanho = [], 0
+    bloco.append("END:VCALENDAR\r\n")
+    yield ''.join(bloco)
+
+
+def feed_em_cache(feed, versao, partes):
+    """Repassa as partes e, se o feed não for grande demais, guarda o corpo para a mesma versão."""
+    guardadas, tamanho = [], 0
+    for parte in partes:
+        if guardadas is not None:
+            guardadas.append(parte)
+            tamanho += len(parte)
+            if tamanho > TAMANHO_MAXIMO_CACHE:
+                guardadas = None
+        yield parte
+    if guardadas is not None:
+        cache_feeds.set((feed, versao), ''.join(guardadas))
@@ -0,0 +1,129 @@
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import request, jsonify, current_app, make_response
+from flask_login import current_user
+from peewee import IntegrityError
+
+from ..models.idempotencia import ChaveIdempotencia
+
+# Valores padrão caso a configuração da aplicação não os defina
+TTL_PADRAO = 24 * 60 * 60
+# Tempo máximo que uma requisição pode ficar "em andamento" antes de ser
+# considerada abandonada (ex.: worker morto no meio do processamento)
+TIMEOUT_PENDENTE = 60
+
+
+def _hash(*partes):
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(parte if isinstance(parte, bytes) else str(parte).encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def _ttl():
+    return timedelta(seconds=current_app.config.get('IDEMPOTENCY_TTL_SECONDS', TTL_PADRAO))
+
+
+def _replay(registro):
+    resposta = current_app.response_class(
+        registro.corpo,
+        status=registro.status_code,
+        mimetype=registro.mimetype or 'application/json'
+    )
+    resposta.headers['Idempotent-Replayed'] = 'true'
+    return resposta
+
+
+def _reservar(chave, hash_requisicao):
+    """Tenta reservar a chave. Retorna None se conseguiu, ou o registro já existente."""
+    database = ChaveIdempotencia._meta.database
+    agora = datetime.now()
+
+    for _ in range(2):
+        try:
+            with database.atomic():
+                ChaveIdempotencia.create(chave=chave, hash_requisicao=hash_requisicao, criado_em=agora)
+            return None
+        except IntegrityError:
+            pass
+
+        existente = ChaveIdempotencia.get_or_none(ChaveIdempotencia.chave == chave)
+        if existente is None:
+            # Foi removida entre o INSERT e o SELECT, tenta de novo
+            continue
+
+        expirada = existente.criado_em < agora - _ttl()
+        abandonada = existente.status_code is None and \
+            existente.criado_em < agora - timedelta(seconds=TIMEOUT_PENDENTE)
+        if not (expirada or abandonada):
+            return existente
+
+        # Registro vencido: descarta e tenta reservar novamente
+        ChaveIdempotencia.delete().where(
+            (ChaveIdempotencia.chave == chave) &
+            (ChaveIdempotencia.criado_em == existente.criado_em)
+        ).execute()
+
+    return ChaveIdempotencia.get_or_none(ChaveIdempotencia.chave == chave)
+
+
+def idempotente(view):
+    """
+    Suporte ao header 'Idempotency-Key' em rotas POST.
+
+    A primeira requisição com uma chave reserva o registro antes de executar a rota;
+    repetições dentro da janela (IDEMPOTENCY_TTL_SECONDS) recebem a resposta salva,
+    e duplicatas concorrentes recebem 409 sem chegar ao reCAPTCHA nem ao banco.
+    Deve ficar abaixo de @login_required para que a chave seja separada por usuário.
+    """
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        chave_cliente = request.headers.get('Idempotency-Key')
+        if not chave_cliente:
+            return view(*args, **kwargs)
+
+        if len(chave_cliente) > 255:
+            return jsonify({"error": "Idempotency-Key muito longa (máximo 255 caracteres)."}), 400
+
+        usuario = current_user.get_id() if current_user.is_authenticated else 'anonimo'
+        chave = _hash(usuario, request.method, request.path, chave_cliente)
+        hash_requisicao = _hash(request.get_data(cache=True))
+
+        existente = _reservar(chave, hash_requisicao)
+        if existente is not None:
+            if existente.hash_requisicao != hash_requisicao:
+                return jsonify({"error": "Idempotency-Key já utilizada com outro conteúdo."}), 422
+            if existente.status_code is None:
+                resposta = jsonify({"error": "Requisição com esta Idempotency-Key ainda em processamento."})
+                resposta.status_code = 409
+                resposta.headers['Retry-After'] = '1'
+                return resposta
+            return _replay(existente)
+
+        try:
+            resposta = make_response(view(*args, **kwargs))
+        except Exception:
+            ChaveIdempotencia.delete().where(ChaveIdempotencia.chave == chave).execute()
+            raise
+
+        if 200 <= resposta.status_code < 300 and not resposta.is_streamed:
+            # Guarda apenas sucessos: erros liberam a chave para uma nova tentativa
+            ChaveIdempotencia.update(
+                status_code=resposta.status_code,
+                corpo=resposta.get_data(as_text=True),
+                mimetype=resposta.mimetype
+            ).where(ChaveIdempotencia.chave == chave).execute()
+        else:
+            ChaveIdempotencia.delete().where(ChaveIdempotencia.chave == chave).execute()
+
+        return resposta
+    return decorated_function
+
+
+def purgar_chaves_expiradas(ttl_segundos=TTL_PADRAO):
+    """Remove as chaves fora da janela de replay. Retorna quantas foram apagadas."""
+    limite = datetime.now() - timedelta(seconds=ttl_segundos)
+    return ChaveIdempotencia.delete().where(ChaveIdempotencia.criado_em < limite).execute()
@@ -0,0 +1,231 @@
+import atexit
+import gzip
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from flask import current_app, has_app_context
+
+from .sinais import conteudo_alterado
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Instantâneos das listagens públicas: o corpo de GET /api/v1/<nome> (sem parâmetros) é gravado
+# em SNAPSHOT_DIR/<nome>.json (+ .json.gz e .json.br) depois de cada alteração, e o nginx serve
+# os arquivos sem passar pelo Flask (ver frontend/nginx.conf).
+
+# Instantâneo -> tipos do log de atividades que alteram o seu conteúdo
+INSTANTANEOS = {
+    "avisos": ("aviso",),
+    # registered_count muda com as inscrições
+    "eventos": ("evento", "inscricao"),
+    # Os horários públicos são itens da agenda
+    "agenda": ("agenda", "horario"),
+    "horarios": ("horario", "agenda"),
+}
+
+# Níveis de compressão (gzip, brotli): o máximo para o que muda pouco; rápidos para os
+# eventos, regerados a cada inscrição
+NIVEIS_PADRAO = (9, 11)
+NIVEIS = {"eventos": (5, 4)}
+
+# Janela (segundos) em que as alterações se juntam numa única republicação
+DEBOUNCE_PADRAO = 1.0
+
+# Instantâneo -> função que monta a lista (registrada pela rota, ver @instantaneo)
+_geradores = {}
+
+
+def instantaneo(nome):
+    """Registra a função que monta o corpo padrão da listagem 'nome'."""
+    def decorador(funcao):
+        _geradores[nome] = funcao
+        return funcao
+    return decorador
+
+
+def _gravar(caminho, dados):
+    """Escreve num temporário do mesmo diretório e troca pelo nome final: o leitor vê o arquivo antigo ou o novo."""
+    diretorio = os.path.dirname(caminho)
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix='.' + os.path.basename(caminho), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as arquivo:
+            arquivo.write(dados)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        # O nginx lê o arquivo como o próprio usuário dele
+        os.chmod(temporario, 0o644)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.unlink(temporario)
+        raise
+
+
+@contextmanager
+def _exclusivo(base):
+    """
+    Vários processos podem publicar o mesmo instantâneo: com a trava, quem grava por último
+    também consultou por último, e um corpo antigo nunca substitui um mais novo.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(base + '.lock', 'a') as trava:
+        fcntl.flock(trava, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(trava, fcntl.LOCK_UN)
+
+
+def publicar(nome, diretorio=None):
+    """Consulta e grava o instantâneo 'nome' (chamar depois do COMMIT). Retorna o tamanho do .json."""
+    diretorio = diretorio or current_app.config.get('SNAPSHOT_DIR')
+    os.makedirs(diretorio, exist_ok=True)
+    base = os.path.join(diretorio, nome)
+    with _exclusivo(base):
+        corpo = current_app.json.dumps_bytes(_geradores[nome]()) + b"\n"
+        nivel_gzip, nivel_br = NIVEIS.get(nome, NIVEIS_PADRAO)
+        # Variantes comprimidas antes do .json: o nginx só procura o .gz ao lado de um .json existente
+        _gravar(base + '.json.gz', gzip.compress(corpo, compresslevel=nivel_gzip, mtime=0))
+        if brotli is not None:
+            _gravar(base + '.json.br', brotli.compress(corpo, quality=nivel_br))
+        _gravar(base + '.json', corpo)
+    return len(corpo)
+
+
+def descartar(nome, diretorio=None):
+    """Remove o instantâneo: o nginx volta a repassar a listagem para o Flask."""
+    base = os.path.join(diretorio or current_app.config.get('SNAPSHOT_DIR'), nome)
+    # O .json primeiro: sem ele o nginx já não procura as variantes
+    for caminho in (base + '.json', base + '.json.gz', base + '.json.br'):
+        try:
+            os.unlink(caminho)
+        except FileNotFoundError:
+            pass
+
+
+def publicar_todos(diretorio=None):
+    return {nome: publicar(nome, diretorio) for nome in INSTANTANEOS}
+
+
+def _publicar_ou_descartar(nome):
+    try:
+        publicar(nome)
+    except Exception:
+        # Um instantâneo desatualizado seria servido para sempre: sem ele, o Flask responde
+        current_app.logger.exception(f"Falha ao publicar o instantâneo '{nome}'")
+        try:
+            descartar(nome)
+        except OSError:
+            pass
+
+
+class Republicador:
+    """
+    Tira a republicação do caminho das escritas: a rota só marca o instantâneo como
+    desatualizado, e uma thread do processo o regera depois de uma pequena janela
+    (SNAPSHOT_DEBOUNCE_SECONDS). Uma rajada de inscrições vira uma consulta e uma gravação.
+    """
+
+    def __init__(self, app=None, database=None):
+        self.app = app
+        self.database = database
+        self._pendentes = set()
+        self._trava = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+        atexit.register(self._descarregar_na_saida)
+
+    def init_app(self, app, database):
+        self.app = app
+        self.database = database
+
+    def marcar(self, nomes):
+        with self._trava:
+            self._pendentes.update(nomes)
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = threading.Thread(target=self._rodar, name='instantaneos', daemon=True)
+                self._thread.start()
+        self._acordar.set()
+
+    def pendentes(self):
+        with self._trava:
+            return set(self._pendentes)
+
+    def _rodar(self):
+        while not self._parar.is_set():
+            self._acordar.wait()
+            # O que chegar durante a espera sai na mesma republicação
+            if self._parar.wait(self.app.config.get('SNAPSHOT_DEBOUNCE_SECONDS', DEBOUNCE_PADRAO)):
+                break
+            self._acordar.clear()
+            try:
+                self.descarregar()
+            except Exception:
+                self.app.logger.exception("Falha ao republicar os instantâneos")
+
+    def descarregar(self):
+        """Regera agora os instantâneos pendentes."""
+        with self._trava:
+            nomes, self._pendentes = self._pendentes, set()
+        if not nomes:
+            return
+        # Só fecha a conexão se foi aberta aqui (a thread abre a sua própria)
+        abriu_conexao = self.database.is_closed()
+        if abriu_conexao:
+            self.database.connect()
+        try:
+            with self.app.app_context():
+                for nome in sorted(nomes):
+                    _publicar_ou_descartar(nome)
+        finally:
+            if abriu_conexao and not self.database.is_closed():
+                self.database.close()
+
+    def _descarregar_na_saida(self):
+        if self.app is None:
+            return
+        try:
+            self.descarregar()
+        except Exception:
+            # Banco indisponível na saída: a tarefa publicar_instantaneos regera os arquivos
+            pass
+
+    def parar(self, timeout=5):
+        self._parar.set()
+        self._acordar.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+republicador = Republicador()
+
+
+@conteudo_alterado.connect
+def _republicar(tipo, dono_id=None, **extra):
+    if not has_app_context() or not current_app.config.get('SNAPSHOT_DIR'):
+        return
+    nomes = [nome for nome, tipos in INSTANTANEOS.items() if tipo in tipos]
+    if not nomes:
+        return
+    if republicador.app is not current_app._get_current_object() or \
+            current_app.config.get('SNAPSHOT_DEBOUNCE_SECONDS', DEBOUNCE_PADRAO) <= 0:
+        # Sem janela (ou app sem o republicador): na hora, ainda depois do COMMIT
+        for nome in nomes:
+            _publicar_ou_descartar(nome)
+        return
+    republicador.marcar(nomes)
@@ -0,0 +1,232 @@
+from collections import defaultdict
+from datetime import date, datetime, time
+
+from peewee import Case, PostgresqlDatabase
+
+from ..models.agenda import Agenda
+from .atividades import registrar_atividades
+from .conflitos import carregar_reservas, travar_local
+from .estatisticas import ajustar_contagem, contagem_agenda
+from .sincronizacao import registrar_remocoes
+
+OPERACOES = ('criar', 'atualizar', 'remover')
+# Campos que um item do lote pode definir (os demais ficam com o padrão do modelo)
+CAMPOS_EDITAVEIS = ('titulo', 'tipo', 'local', 'data', 'horario', 'descricao')
+OBRIGATORIOS_CRIACAO = ('titulo', 'data', 'local', 'horario')
+MAXIMO_OPERACOES = 200
+
+
+class OperacaoInvalida(Exception):
+    def __init__(self, status, mensagem, **extra):
+        super().__init__(mensagem)
+        self.status = status
+        self.resultado = {"error": mensagem, **extra}
+
+
+def _converter(campo, valor):
+    if valor is None or valor == '':
+        if campo in OBRIGATORIOS_CRIACAO:
+            raise OperacaoInvalida(400, f"Campo '{campo}' não pode ser vazio.")
+        return None
+    try:
+        if campo == 'data':
+            return date.fromisoformat(str(valor))
+        if campo == 'horario':
+            return time.fromisoformat(str(valor))
+    except ValueError:
+        raise OperacaoInvalida(400, f"Campo '{campo}' em formato inválido.")
+    valor = str(valor)
+    limite = getattr(getattr(Agenda, campo), 'max_length', None)
+    if limite and len(valor) > limite:
+        raise OperacaoInvalida(400, f"Campo '{campo}' excede {limite} caracteres.")
+    return valor
+
+
+def _interpretar(operacao, vistos):
+    """Valida uma operação do lote; retorna (op, id, campos convertidos, versão esperada ou None)."""
+    if not isinstance(operacao, dict) or operacao.get('op') not in OPERACOES:
+        raise OperacaoInvalida(400, f"'op' deve ser um de: {', '.join(OPERACOES)}.")
+    op = operacao['op']
+
+    item_id = None
+    if op != 'criar':
+        try:
+            item_id = int(operacao.get('id'))
+        except (TypeError, ValueError):
+            raise OperacaoInvalida(400, "'id' é obrigatório para atualizar e remover.")
+        if item_id in vistos:
+            raise OperacaoInvalida(400, "Item repetido no lote.")
+        vistos.add(item_id)
+
+    # Mesmo papel do If-Match nas rotas de um item: sem ela, a operação é incondicional
+    versao = operacao.get('version')
+    if versao is not None:
+        if op == 'criar':
+            raise OperacaoInvalida(400, "'version' só vale para atualizar e remover.")
+        try:
+            versao = int(versao)
+        except (TypeError, ValueError):
+            raise OperacaoInvalida(400, "'version' deve ser um número inteiro.")
+
+    dados = operacao.get('dados') or {}
+    if not isinstance(dados, dict):
+        raise OperacaoInvalida(400, "'dados' deve ser um objeto.")
+    campos = {c: _converter(c, dados[c]) for c in CAMPOS_EDITAVEIS if c in dados}
+    if op == 'criar':
+        faltando = [c for c in OBRIGATORIOS_CRIACAO if campos.get(c) is None]
+        if faltando:
+            raise OperacaoInvalida(400, f"Campos obrigatórios ausentes: {', '.join(faltando)}.")
+    elif op == 'atualizar' and not campos:
+        raise OperacaoInvalida(400, "Nenhum campo para atualizar.")
+    return op, item_id, campos, versao
+
+
+def _carregar_existentes(database, ids):
+    """Os itens referenciados pelo lote, em uma consulta (travados até o COMMIT no Postgres)."""
+    if not ids:
+        return {}
+    query = (Agenda
+             .select(Agenda.id, Agenda.titulo, Agenda.local, Agenda.data, Agenda.horario,
+                     Agenda.is_public, Agenda.criado_por, Agenda.version)
+             .where(Agenda.id.in_(sorted(ids))))
+    if isinstance(database, PostgresqlDatabase):
+        query = query.for_update()
+    return {item.id: item for item in query}
+
+
+def _verificar_conflitos(database, pendentes, existentes):
+    """
+    Marca como 409 as operações cuja reserva final (local, data, horario) se sobrepõe a outra:
+    do banco ou de uma operação anterior do mesmo lote. Um único índice em memória para o
+    intervalo de datas do lote inteiro; as posições antigas dos itens alterados não contam.
+    """
+    reservas = []
+    for pendente in pendentes:
+        op, item_id, campos = pendente["op"], pendente["id"], pendente["campos"]
+        if op == 'remover' or pendente.get("ignorar_conflitos"):
+            continue
+        if op == 'atualizar' and not {'local', 'data', 'horario'} & campos.keys():
+            continue
+        atual = existentes.get(item_id)
+        final = {c: campos[c] if c in campos else getattr(atual, c, None) for c in ('local', 'data', 'horario')}
+        if final['data'] is None or final['horario'] is None or not final['local']:
+            continue
+        reservas.append((pendente, final))
+    if not reservas:
+        return
+
+    locais = sorted({final['local'] for _, final in reservas})
+    # Sempre na mesma ordem, para dois lotes concorrentes não travarem um ao outro
+    for local in locais:
+        travar_local(database, local)
+    indice = carregar_reservas(locais, min(f['data'] for _, f in reservas), max(f['data'] for _, f in reservas))
+    movidos = {p["id"] for p in pendentes if p["op"] in ('atualizar', 'remover')}
+
+    for pendente, final in reservas:
+        inicio = datetime.combine(final['data'], final['horario'])
+        conflitos = [r for r in indice.sobrepostas(final['local'], inicio)
+                     if not (r["tipo"] in ('agenda', 'horario') and r["id"] in movidos)]
+        if conflitos:
+            pendente["resultado"] = {"status": 409, "error": "Já existe uma reserva neste local e horário.",
+                                     "conflitos": conflitos}
+            continue
+        indice.adicionar(final['local'], inicio, {"tipo": "agenda", "id": pendente["id"],
+                                                  "titulo": pendente["campos"].get('titulo'),
+                                                  "data": final['data'].isoformat(),
+                                                  "horario": str(final['horario'])})
+
+
+def _atualizar_em_lote(atualizacoes):
+    """Um UPDATE ... WHERE id IN (...), com um CASE id por coluna alterada."""
+    colunas = {}
+    for item_id, campos in atualizacoes:
+        for campo, valor in campos.items():
+            colunas.setdefault(campo, []).append((item_id, valor))
+    valores_novos = {getattr(Agenda, campo): Case(Agenda.id, valores, getattr(Agenda, campo))
+                     for campo, valores in colunas.items()}
+    valores_novos[Agenda.updated_at] = datetime.now()
+    # Um If-Match com a versão anterior ao lote passa a receber 409
+    valores_novos[Agenda.version] = Agenda.version + 1
+    (Agenda
+     .update(valores_novos)
+     .where(Agenda.id.in_([item_id for item_id, _ in atualizacoes]))
+     .execute())
+
+
+def aplicar_lote(operacoes, user, ignorar_conflitos=False):
+    """
+    Aplica um lote de operações na Agenda. Chamar dentro de uma transação: as operações
+    válidas viram no máximo um INSERT, um UPDATE e um DELETE (mais estatísticas e log);
+    as inválidas não impedem as demais. Retorna um resultado por operação, na ordem recebida.
+    """
+    database = Agenda._meta.database
+    is_admin = user.tipo == 'admin'
+
+    pendentes, vistos = [], set()
+    for indice, operacao in enumerate(operacoes):
+        bruta = operacao if isinstance(operacao, dict) else {}
+        pendente = {"indice": indice, "op": bruta.get('op'), "id": bruta.get('id'), "campos": {}}
+        try:
+            pendente["op"], pendente["id"], pendente["campos"], pendente["versao"] = _interpretar(operacao, vistos)
+            pendente["ignorar_conflitos"] = ignorar_conflitos or bool(bruta.get('ignorar_conflitos'))
+        except OperacaoInvalida as e:
+            pendente["resultado"] = dict(e.resultado, status=e.status)
+        pendentes.append(pendente)
+
+    existentes = _carregar_existentes(database, {p["id"] for p in pendentes if p["id"] and "resultado" not in p})
+    for pendente in pendentes:
+        if "resultado" in pendente or pendente["op"] == 'criar':
+            continue
+        item = existentes.get(pendente["id"])
+        if item is None:
+            pendente["resultado"] = {"status": 404, "error": "Item não encontrado"}
+        elif not (is_admin or item.criado_por_id == user.idusuario):
+            pendente["resultado"] = {"status": 403, "error": "Você não tem permissão para alterar este registro"}
+        elif pendente["versao"] is not None and item.version != pendente["versao"]:
+            pendente["resultado"] = {"status": 409, "version": item.version,
+                                     "error": "O item foi alterado por outra pessoa. Recarregue e tente novamente."}
+
+    _verificar_conflitos(database, [p for p in pendentes if "resultado" not in p], existentes)
+    validas = [p for p in pendentes if "resultado" not in p]
+
+    criacoes = [p for p in validas if p["op"] == 'criar']
+    atualizacoes = [p for p in validas if p["op"] == 'atualizar']
+    remocoes = [p for p in validas if p["op"] == 'remover']
+    deltas = defaultdict(lambda: defaultdict(int))
+    atividades = []
+
+    if criacoes:
+        # Mesmas colunas em todas as linhas: o insert_many tira a lista de colunas da primeira
+        linhas = [dict({c: p["campos"].get(c) for c in CAMPOS_EDITAVEIS}, criado_por=user.idusuario)
+                  for p in criacoes]
+        novos = Agenda.insert_many(linhas).returning(Agenda.id).execute()
+        for pendente, novo in zip(criacoes, novos):
+            pendente["id"] = novo.id
+            pendente["resultado"] = {"status": 201}
+            for campo, delta in contagem_agenda(False).items():
+                deltas[user.idusuario][campo] += delta
+            atividades.append(('agenda', 'criado', novo.id, pendente["campos"]['titulo'], user.idusuario))
+
+    if atualizacoes:
+        _atualizar_em_lote([(p["id"], p["campos"]) for p in atualizacoes])
+        for pendente in atualizacoes:
+            item = existentes[pendente["id"]]
+            pendente["resultado"] = {"status": 200, "version": item.version + 1}
+            atividades.append(('agenda', 'atualizado', item.id, pendente["campos"].get('titulo', item.titulo),
+                               item.criado_por_id))
+
+    if remocoes:
+        Agenda.delete().where(Agenda.id.in_([p["id"] for p in remocoes])).execute()
+        registrar_remocoes('agenda', Agenda, [p["id"] for p in remocoes])
+        for pendente in remocoes:
+            item = existentes[pendente["id"]]
+            pendente["resultado"] = {"status": 200}
+            for campo, delta in contagem_agenda(item.is_public, -1).items():
+                deltas[item.criado_por_id][campo] += delta
+            atividades.append(('agenda', 'removido', item.id, item.titulo, item.criado_por_id))
+
+    for dono_id, delta in deltas.items():
+        ajustar_contagem(dono_id, **delta)
+    registrar_atividades(atividades)
+
+    return [{"indice": p["indice"], "op": p["op"], "id": p["id"], **p["resultado"]} for p in pendentes]
@@ -0,0 +1,53 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Metricas:
+    """
+    Registro simples, em memória, de contadores e durações do processo.
+    Exposto em JSON pela rota /api/v1/metricas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = {}
+        self._duracoes = {}
+
+    def incrementar(self, nome, quantidade=1):
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + quantidade
+
+    def observar(self, nome, segundos):
+        with self._lock:
+            d = self._duracoes.get(nome)
+            if d is None:
+                d = self._duracoes[nome] = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+            d["count"] += 1
+            d["total"] += segundos
+            d["last"] = segundos
+            if segundos > d["max"]:
+                d["max"] = segundos
+
+    @contextmanager
+    def cronometrar(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio)
+
+    def snapshot(self):
+        with self._lock:
+            duracoes = {}
+            for nome, d in self._duracoes.items():
+                duracoes[nome] = dict(d, avg=d["total"] / d["count"] if d["count"] else 0.0)
+            return {"counters": dict(self._contadores), "timings": duracoes}
+
+    def limpar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._duracoes.clear()
+
+
+metricas = Metricas()
@@ -0,0 +1,75 @@
+from .concorrencia import ConflitoDeVersao, update_versionado
+
+
+class SemPermissao(Exception):
+    pass
+
+
+def pode_alterar(user, dono_id):
+    """Admin altera tudo; gestor só o que criou."""
+    return user.tipo == 'admin' or dono_id == user.idusuario
+
+
+def condicao_de_dono(modelo, user):
+    """Filtro do que 'user' pode alterar em 'modelo' (None para o admin: tudo)."""
+    if user.tipo == 'admin':
+        return None
+    return modelo.criado_por == user.idusuario
+
+
+# Escrita e verificação de permissão em uma única instrução: o dono (ou admin) entra no WHERE
+# do UPDATE/DELETE ... RETURNING, e o item de outro dono nem é tocado (sem trava, cascata ou
+# gatilho). Só quando nada é devolvido um SELECT distingue 404 ("não existe") de 403
+# ("de outro dono") e, com If-Match, de 409 ("mudou").
+# As funções precisam rodar dentro de database.atomic().
+
+def _situacao(modelo, item_id, *colunas):
+    """(criado_por, *colunas) atuais do item, ou None se ele não existe."""
+    return (modelo
+            .select(modelo.criado_por, *colunas)
+            .where(modelo._meta.primary_key == item_id)
+            .tuples()
+            .first())
+
+
+def atualizar_como_dono(modelo, item_id, valores, user, esperada=None):
+    """
+    UPDATE ... WHERE id = ? [AND version = ?] [AND criado_por = ?] RETURNING version, criado_por, titulo.
+    Retorna (versão nova, dono, título). Lança modelo.DoesNotExist, SemPermissao ou
+    ConflitoDeVersao (só nestes casos há uma segunda consulta).
+    """
+    linha = update_versionado(modelo, item_id, valores, esperada, retornar=(modelo.criado_por, modelo.titulo),
+                              condicao_extra=condicao_de_dono(modelo, user))
+    if linha:
+        return linha
+
+    atual = _situacao(modelo, item_id, modelo.version)
+    if atual is None:
+        raise modelo.DoesNotExist
+    if not pode_alterar(user, atual[0]):
+        raise SemPermissao()
+    raise ConflitoDeVersao(atual[1])
+
+
+def remover_como_dono(modelo, item_id, user, *colunas):
+    """
+    DELETE ... WHERE id = ? [AND criado_por = ?] RETURNING criado_por, titulo, *colunas.
+    Retorna a linha removida; lança modelo.DoesNotExist ou SemPermissao.
+    """
+    condicao = modelo._meta.primary_key == item_id
+    dono = condicao_de_dono(modelo, user)
+    if dono is not None:
+        condicao &= dono
+    linhas = list(modelo
+                  .delete()
+                  .where(condicao)
+                  .returning(modelo.criado_por, modelo.titulo, *colunas)
+                  .tuples()
+                  .execute())
+    if linhas:
+        return linhas[0]
+
+    atual = _situacao(modelo, item_id)
+    if atual is not None and not pode_alterar(user, atual[0]):
+        raise SemPermissao()
+    raise modelo.DoesNotExist
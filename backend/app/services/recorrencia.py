@@ -0,0 +1,124 @@
+import logging
+import re
+import unicodedata
+from datetime import timedelta
+
+from ..models.agenda import Agenda
+from .cache import Cache
+from .versao import versao_conteudo
+
+logger = logging.getLogger(__name__)
+
+# Dias da semana no padrão do Python (date.weekday()): segunda = 0 ... domingo = 6
+_PREFIXOS = {"seg": 0, "ter": 1, "qua": 2, "qui": 3, "sex": 4, "sab": 5, "dom": 6}
+# "2ª", "3a" ... "6ª" (a forma ordinal usada para os dias úteis)
+_ORDINAIS = {"2": 0, "3": 1, "4": 2, "5": 3, "6": 4}
+_TODOS = frozenset(range(7))
+
+_TOKEN = re.compile(
+    r"\b(seg(?:unda)?|ter(?:ca)?|qua(?:rta)?|qui(?:nta)?|sex(?:ta)?|sab(?:ado)?|dom(?:ingo)?)s?\b"
+    r"|\b([2-6])a\b"
+    r"|(\ba\b|\bate\b|-)"
+    r"|(todos os dias|diariamente|todo dia)"
+)
+
+# Maior intervalo aceito em uma expansão
+MAXIMO_DIAS = 366
+
+# Ocorrências dos horários semanais por (data_inicio, data_fim, versão do conteúdo): uma
+# alteração feita em qualquer processo muda a versão (services/versao.py) e a expansão é refeita
+cache_expansoes = Cache('recorrencia', max_itens=256, ttl=24 * 60 * 60)
+
+
+def _sem_acentos(texto):
+    return ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+
+
+def normalizar_dia_semana(texto):
+    """
+    Converte o texto livre de 'dia_semana' em um frozenset de dias (segunda = 0).
+    Aceita nomes e abreviações ("Segunda-feira", "seg", "2ª"), listas
+    ("Sábado e Domingo", "Seg, Qua") e intervalos ("Segunda a Sexta").
+    Texto não reconhecido resulta em conjunto vazio.
+    """
+    if not texto:
+        return frozenset()
+    # NFKD transforma "ª" em "a"; "-feira" não distingue nada
+    normal = _sem_acentos(texto).lower().replace('-feira', '').replace(' feira', '')
+
+    dias = set()
+    anterior = None
+    intervalo = False
+    for m in _TOKEN.finditer(normal):
+        prefixo, ordinal, conector, todos = m.groups()
+        if todos:
+            return _TODOS
+        if conector:
+            intervalo = anterior is not None
+            continue
+        dia = _PREFIXOS[prefixo[:3]] if prefixo else _ORDINAIS[ordinal]
+        if intervalo:
+            # "Sexta a Segunda" atravessa o fim de semana
+            passo = anterior
+            while passo != dia:
+                passo = (passo + 1) % 7
+                dias.add(passo)
+        dias.add(dia)
+        anterior, intervalo = dia, False
+    return frozenset(dias)
+
+
+def _ocorrencia(item, dia, recorrente):
+    return {
+        "id": item.id,
+        "titulo": item.titulo,
+        "tipo": item.tipo,
+        "local": item.local,
+        "data": dia.isoformat(),
+        "horario": str(item.horario),
+        "recorrente": recorrente,
+    }
+
+
+def _expandir(inicio, fim):
+    horarios = (Agenda
+                .select(Agenda.id, Agenda.titulo, Agenda.tipo, Agenda.local, Agenda.horario, Agenda.dia_semana)
+                .where((Agenda.is_public == True) & Agenda.dia_semana.is_null(False)))
+
+    # Um dia por posição da semana: cada horário só percorre os seus dias
+    por_dia_semana = {d: [] for d in range(7)}
+    dia = inicio
+    while dia <= fim:
+        por_dia_semana[dia.weekday()].append(dia)
+        dia += timedelta(days=1)
+
+    ocorrencias = []
+    for item in horarios:
+        dias = normalizar_dia_semana(item.dia_semana)
+        if not dias:
+            logger.warning("Horário %s com dia_semana não reconhecido: %r", item.id, item.dia_semana)
+        for dia_semana in dias:
+            ocorrencias.extend(_ocorrencia(item, d, True) for d in por_dia_semana[dia_semana])
+    return ocorrencias
+
+
+def expandir_horarios(inicio, fim):
+    """Ocorrências dos horários semanais em [inicio, fim] (memoizado por intervalo e versão)."""
+    return cache_expansoes.obter_ou_calcular((inicio, fim, versao_conteudo()), lambda: _expandir(inicio, fim))
+
+
+def calendario(inicio, fim):
+    """
+    Horários semanais expandidos + itens pontuais da Agenda no intervalo,
+    em ordem de data e horário.
+    """
+    if (fim - inicio).days >= MAXIMO_DIAS:
+        raise ValueError(f"Intervalo máximo de {MAXIMO_DIAS} dias.")
+
+    pontuais = (Agenda
+                .select(Agenda.id, Agenda.titulo, Agenda.tipo, Agenda.local, Agenda.horario, Agenda.data)
+                .where((Agenda.data >= inicio) & (Agenda.data <= fim)))
+    itens = list(expandir_horarios(inicio, fim))
+    itens.extend(_ocorrencia(item, item.data, False) for item in pontuais)
+    itens.sort(key=lambda o: (o["data"], o["horario"], o["id"]))
+    return itens
@@ -0,0 +1,70 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+from peewee import Model
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+
+def para_json(o):
+    """
+    Tipos que o JSON não conhece. Datas e horas saem em ISO 8601 (o mesmo formato
+    de str()/isoformat() usado nas rotas); linhas do Peewee viram dict com as
+    colunas carregadas (chaves estrangeiras como id).
+    """
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, Model):
+        return dict(o.__data__)
+    if isinstance(o, Decimal):
+        return float(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"Objeto do tipo {type(o).__name__} não é serializável em JSON")
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    """
+    Provider JSON da aplicação (app.json). Usa o orjson quando instalado e cai
+    para o json da biblioteca padrão caso contrário, com a mesma saída.
+    """
+
+    # Saída em UTF-8 nos dois casos (o orjson não escapa caracteres não ASCII)
+    ensure_ascii = False
+
+    def default(self, o):
+        return para_json(o)
+
+    def _opcoes(self, indentar):
+        opcoes = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opcoes |= orjson.OPT_INDENT_2
+        return opcoes
+
+    def dumps_bytes(self, obj, indentar=False):
+        if orjson is not None:
+            return orjson.dumps(obj, default=para_json, option=self._opcoes(indentar))
+        kwargs = {"indent": 2} if indentar else {"separators": (",", ":")}
+        return super().dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=para_json, option=self._opcoes(False)).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        # Gera os bytes direto (sem passar por str) para o corpo da resposta
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumps_bytes(obj, indentar) + b"\n", mimetype=self.mimetype)
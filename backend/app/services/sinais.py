@@ -0,0 +1,31 @@
+from blinker import Namespace
+from flask import g, has_request_context
+
+_sinais = Namespace()
+
+# Disparado depois do COMMIT de qualquer alteração de conteúdo.
+# sender: tipo ('evento', 'aviso', 'agenda', 'horario', 'inscricao', 'usuario');
+# kwargs: dono_id (dono do conteúdo alterado).
+conteudo_alterado = _sinais.signal('conteudo-alterado')
+
+
+def notificar_alteracao(tipo, dono_id):
+    """
+    Durante uma requisição a notificação fica pendente e só é enviada se a rota
+    terminar com sucesso (a transação já foi confirmada); fora dela é imediata.
+    """
+    if has_request_context():
+        pendentes = g.setdefault('_alteracoes_pendentes', [])
+        if (tipo, dono_id) not in pendentes:
+            pendentes.append((tipo, dono_id))
+    else:
+        conteudo_alterado.send(tipo, dono_id=dono_id)
+
+
+def despachar_alteracoes(response):
+    """after_request: envia as notificações pendentes da requisição."""
+    pendentes = g.pop('_alteracoes_pendentes', None)
+    if pendentes and response.status_code < 400:
+        for tipo, dono_id in pendentes:
+            conteudo_alterado.send(tipo, dono_id=dono_id)
+    return response
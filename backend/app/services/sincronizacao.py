@@ -0,0 +1,71 @@
+import base64
+from datetime import datetime, timedelta
+
+from peewee import Node, Value
+
+from ..models.remocao import Remocao
+
+# Transações que começaram antes do cursor podem confirmar depois dele com um updated_at
+# anterior: as linhas desses últimos segundos são reenviadas (o cliente só as aplica de novo)
+MARGEM = timedelta(seconds=5)
+RETENCAO_PADRAO_DIAS = 90
+
+
+class CursorExpirado(ValueError):
+    pass
+
+
+def codificar_cursor(instante):
+    return base64.urlsafe_b64encode(instante.isoformat().encode('utf-8')).decode('ascii')
+
+
+def decodificar_cursor(cursor):
+    """Retorna o instante do cursor. Lança ValueError para cursores inválidos."""
+    try:
+        return datetime.fromisoformat(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError("Cursor inválido.")
+
+
+def inicio_da_janela(cursor, retencao_dias=RETENCAO_PADRAO_DIAS, agora=None):
+    """
+    A partir de quando reenviar alterações para 'cursor'. Lança CursorExpirado se as
+    lápides daquele período já foram purgadas (o cliente precisa baixar tudo de novo).
+    """
+    desde = decodificar_cursor(cursor)
+    if desde < (agora or datetime.now()) - timedelta(days=retencao_dias):
+        raise CursorExpirado("Cursor antigo demais: sincronize novamente sem 'since'.")
+    return desde - MARGEM
+
+
+def registrar_remocoes(tipo, modelo, ids):
+    """
+    Grava as lápides dos itens de 'modelo' removidos. 'ids' é uma lista de ids ou uma
+    condição sobre o modelo (ex.: InscricaoEvento.evento == 5), avaliada antes do DELETE.
+    Chamar dentro da transação da remoção.
+    """
+    agora = datetime.now()
+    colunas = [Remocao.tipo, Remocao.item_id, Remocao.removido_em]
+    if isinstance(ids, Node):
+        Remocao.insert_from(modelo.select(Value(tipo), modelo.id, Value(agora)).where(ids), colunas).execute()
+    elif ids:
+        Remocao.insert_many([(tipo, item_id, agora) for item_id in ids], fields=colunas).execute()
+
+
+def remocoes_desde(desde, tipos):
+    """{tipo: [ids]} das lápides gravadas a partir de 'desde' (varredura do índice (removido_em, tipo))."""
+    removidos = {tipo: [] for tipo in tipos}
+    query = (Remocao
+             .select(Remocao.tipo, Remocao.item_id)
+             .where((Remocao.removido_em >= desde) & Remocao.tipo.in_(list(tipos)))
+             .order_by(Remocao.id)
+             .tuples())
+    for tipo, item_id in query:
+        removidos[tipo].append(item_id)
+    return removidos
+
+
+def purgar_remocoes(retencao_dias=RETENCAO_PADRAO_DIAS):
+    """Apaga as lápides mais antigas que a retenção; retorna quantas removeu."""
+    limite = datetime.now() - timedelta(days=retencao_dias)
+    return Remocao.delete().where(Remocao.removido_em < limite).execute()
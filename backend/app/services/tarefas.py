@@ -0,0 +1,53 @@
+# Tarefas periódicas de manutenção executadas pelo agendador.
+# Importar este módulo registra as tarefas em 'agendador' (ver create_app e worker.py).
+from flask import current_app
+
+from ..extensions import agendador
+from .idempotencia import purgar_chaves_expiradas, TTL_PADRAO
+from .estatisticas import reconciliar_estatisticas
+from .sinais import notificar_alteracao
+from .arquivamento import arquivar_antigos, DIAS_AVISOS_PADRAO, DIAS_EVENTOS_PADRAO, LOTE_PADRAO
+from .sincronizacao import purgar_remocoes, RETENCAO_PADRAO_DIAS
+from .instantaneos import publicar_todos
+
+
+@agendador.a_cada(60 * 60)
+def purgar_idempotencia():
+    ttl = current_app.config.get('IDEMPOTENCY_TTL_SECONDS', TTL_PADRAO)
+    removidas = purgar_chaves_expiradas(ttl)
+    current_app.logger.info(f"Idempotência: {removidas} chave(s) expirada(s) removida(s)")
+
+
+@agendador.cron("15 3 * * *")
+def reconciliar_contagens():
+    linhas = reconciliar_estatisticas()
+    # Contagens de todos os usuários podem ter mudado
+    notificar_alteracao('estatisticas', None)
+    current_app.logger.info(f"Estatísticas: {linhas} linha(s) recalculada(s)")
+
+
+@agendador.cron("45 3 * * *")
+def arquivar_conteudo_antigo():
+    config = current_app.config
+    movidos = arquivar_antigos(
+        dias_avisos=config.get('ARQUIVO_AVISOS_DIAS', DIAS_AVISOS_PADRAO),
+        dias_eventos=config.get('ARQUIVO_EVENTOS_DIAS', DIAS_EVENTOS_PADRAO),
+        lote=config.get('ARQUIVO_LOTE', LOTE_PADRAO),
+    )
+    current_app.logger.info(f"Arquivamento: {movidos['avisos']} aviso(s) e {movidos['eventos']} evento(s) arquivado(s)")
+
+
+@agendador.cron("0 4 * * *")
+def purgar_lapides():
+    removidas = purgar_remocoes(current_app.config.get('SYNC_RETENCAO_DIAS', RETENCAO_PADRAO_DIAS))
+    current_app.logger.info(f"Sincronização: {removidas} lápide(s) antiga(s) removida(s)")
+
+
+@agendador.a_cada(15 * 60)
+def publicar_instantaneos():
+    # As rotas republicam a cada alteração; aqui os arquivos são recriados se faltarem
+    # (volume novo, falha na publicação) ou se o banco mudou por fora da API
+    if not current_app.config.get('SNAPSHOT_DIR'):
+        return
+    tamanhos = publicar_todos()
+    current_app.logger.info(f"Instantâneos: {', '.join(f'{n} ({t} bytes)' for n, t in tamanhos.items())}")
@@ -0,0 +1,14 @@
+import re
+
+_NAO_DIGITOS = re.compile(r'\D')
+
+
+def normalizar_telefone(telefone):
+    """
+    Reduz o telefone aos dígitos, sem o código do país (+55).
+    '+55 (11) 99988-7766', '11 99988 7766' e '11999887766' viram '11999887766'.
+    """
+    digitos = _NAO_DIGITOS.sub('', str(telefone or ''))
+    if len(digitos) in (12, 13) and digitos.startswith('55'):
+        digitos = digitos[2:]
+    return digitos
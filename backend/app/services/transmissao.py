@@ -0,0 +1,145 @@
+import json
+import logging
+import queue
+import select
+import threading
+from collections import defaultdict
+
+from .metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+
+class Assinatura:
+    """Fila de mensagens de um assinante (uma conexão SSE)."""
+
+    def __init__(self, topico, tamanho):
+        self.topico = topico
+        self.fila = queue.Queue(maxsize=tamanho)
+
+    def receber(self, timeout=None):
+        """Próxima mensagem, ou None se nada chegar dentro do timeout."""
+        try:
+            return self.fila.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def entregar(self, mensagem):
+        # Assinante lento: descarta a mensagem mais antiga (só o estado mais recente importa)
+        while True:
+            try:
+                self.fila.put_nowait(mensagem)
+                return
+            except queue.Full:
+                try:
+                    self.fila.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class Transmissor:
+    """
+    Broker em memória do processo: publica uma mensagem para todos os assinantes
+    de um tópico. Publicar custa uma cópia de referência por assinante; nenhum
+    assinante consulta o banco.
+    """
+
+    def __init__(self, tamanho_fila=100):
+        self.tamanho_fila = tamanho_fila
+        self._assinantes = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def assinar(self, topico):
+        assinatura = Assinatura(topico, self.tamanho_fila)
+        with self._lock:
+            self._assinantes[topico].add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            assinantes = self._assinantes.get(assinatura.topico)
+            if assinantes is not None:
+                assinantes.discard(assinatura)
+                if not assinantes:
+                    del self._assinantes[assinatura.topico]
+
+    def publicar(self, topico, mensagem):
+        with self._lock:
+            assinantes = list(self._assinantes.get(topico, ()))
+        for assinatura in assinantes:
+            assinatura.entregar(mensagem)
+        metricas.incrementar("transmissao.mensagens")
+        return len(assinantes)
+
+    def total_assinantes(self):
+        with self._lock:
+            return sum(len(a) for a in self._assinantes.values())
+
+
+class PontePostgres:
+    """
+    Liga processos diferentes pelo LISTEN/NOTIFY do Postgres: quem publica faz
+    pg_notify(canal, json) e cada processo, em uma thread com conexão própria,
+    repassa o payload recebido para o 'callback' (o transmissor local).
+    """
+
+    def __init__(self, canal, callback):
+        self.canal = canal
+        self.callback = callback
+        self.database = None
+        self._parar = threading.Event()
+        self._thread = None
+
+    @property
+    def ativa(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self, database):
+        if self.ativa:
+            return
+        self.database = database
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._escutar, name=f'listen-{self.canal}', daemon=True)
+        self._thread.start()
+
+    def parar(self, timeout=5):
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notificar(self, payload):
+        """Envia o payload a todos os processos (inclusive este). Fora de transação: sai na hora."""
+        self.database.execute_sql('SELECT pg_notify(%s, %s)', (self.canal, json.dumps(payload)))
+
+    def _conectar(self):
+        import psycopg2
+        conexao = psycopg2.connect(database=self.database.database, **self.database.connect_params)
+        conexao.autocommit = True
+        with conexao.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.canal}"')
+        return conexao
+
+    def _escutar(self):
+        while not self._parar.is_set():
+            try:
+                conexao = self._conectar()
+            except Exception:
+                logger.exception("LISTEN %s: falha ao conectar; nova tentativa em 5s", self.canal)
+                self._parar.wait(5)
+                continue
+            try:
+                while not self._parar.is_set():
+                    if select.select([conexao], [], [], 5) == ([], [], []):
+                        continue
+                    conexao.poll()
+                    while conexao.notifies:
+                        aviso = conexao.notifies.pop(0)
+                        try:
+                            self.callback(json.loads(aviso.payload))
+                        except Exception:
+                            logger.exception("LISTEN %s: payload inválido", self.canal)
+            except Exception:
+                logger.exception("LISTEN %s: conexão perdida; reconectando", self.canal)
+            finally:
+                conexao.close()
@@ -0,0 +1,66 @@
+import logging
+
+from peewee import fn, JOIN
+
+from ..models.eventos import Evento
+from ..models.inscricao_evento import InscricaoEvento
+from .transmissao import Transmissor, PontePostgres
+
+logger = logging.getLogger(__name__)
+
+# Tópicos do transmissor: um por evento e um com todos os eventos
+TOPICO_TODOS = "vagas"
+CANAL_POSTGRES = "vagas_evento"
+
+
+def topico_evento(evento_id):
+    return f"vagas:{evento_id}"
+
+
+def _situacao(evento_id, inscritos, tipo_vagas, numero_vagas):
+    limitado = tipo_vagas == 'limitada' and numero_vagas is not None
+    return {
+        "evento_id": evento_id,
+        "inscritos": inscritos,
+        "numero_vagas": numero_vagas if limitado else None,
+        "restantes": max(numero_vagas - inscritos, 0) if limitado else None,
+    }
+
+
+def contagem_vagas(evento_ids=None):
+    """Inscritos e vagas restantes por evento, em um único SELECT ... GROUP BY."""
+    query = (Evento
+             .select(Evento.id, fn.COUNT(InscricaoEvento.id), Evento.tipo_vagas, Evento.numero_vagas)
+             .join(InscricaoEvento, JOIN.LEFT_OUTER)
+             .group_by(Evento.id)
+             .order_by(Evento.id))
+    if evento_ids is not None:
+        query = query.where(Evento.id.in_(list(evento_ids)))
+    return [_situacao(*linha) for linha in query.tuples()]
+
+
+def _distribuir(situacao):
+    transmissor.publicar(topico_evento(situacao["evento_id"]), situacao)
+    transmissor.publicar(TOPICO_TODOS, situacao)
+
+
+transmissor = Transmissor()
+# Com o Postgres, a publicação passa pelo NOTIFY e chega a todos os processos
+ponte_vagas = PontePostgres(CANAL_POSTGRES, _distribuir)
+
+
+def publicar_vagas(evento):
+    """
+    Avisa os assinantes da nova contagem do evento. Chamar depois do COMMIT da
+    inscrição: custa um COUNT por inscrição, independente de quantos assistem.
+    """
+    try:
+        inscritos = InscricaoEvento.select().where(InscricaoEvento.evento == evento.id).count()
+        situacao = _situacao(evento.id, inscritos, evento.tipo_vagas, evento.numero_vagas)
+        if ponte_vagas.ativa:
+            ponte_vagas.notificar(situacao)
+        else:
+            _distribuir(situacao)
+    except Exception:
+        # A inscrição já foi gravada; falhar aqui só atrasa o painel ao vivo
+        logger.exception("Falha ao publicar vagas do evento %s", evento.id)
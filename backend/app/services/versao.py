@@ -0,0 +1,44 @@
+from peewee import Value, fn
+
+from ..models.atividade import Atividade
+from ..models.remocao import Remocao
+from .cache import Cache
+from .sinais import conteudo_alterado
+
+# Versão do conteúdo para os caches em memória: (último id do log de atividades, última lápide).
+# As rotas registram atividade a cada escrita e o arquivamento grava lápides, então a versão
+# muda com qualquer alteração, feita por qualquer processo (inclusive as tarefas do worker).
+# Relida do banco a cada poucos segundos; as escritas deste processo a descartam na hora.
+cache_versao = Cache('versao_conteudo', max_itens=1, ttl=5)
+CHAVE_VERSAO = 'versao'
+
+
+@conteudo_alterado.connect
+def _invalidar_versao(tipo, dono_id=None, **extra):
+    cache_versao.invalidar(CHAVE_VERSAO)
+
+
+def consultas_versao():
+    """(kind, num) com o último id de cada tabela da versão (para compor um UNION ALL)."""
+    return [
+        Atividade.select(Value('versao_atividade').alias('kind'), fn.MAX(Atividade.id).alias('num')),
+        Remocao.select(Value('versao_remocao').alias('kind'), fn.MAX(Remocao.id).alias('num')),
+    ]
+
+
+def versao_das_linhas(linhas):
+    """Versão a partir das linhas (kind, num) de consultas_versao()."""
+    versao = dict(linhas)
+    return (versao.get('versao_atividade') or 0, versao.get('versao_remocao') or 0)
+
+
+def versao_conteudo():
+    def consultar():
+        atividade, remocao = consultas_versao()
+        return versao_das_linhas(atividade.union_all(remocao).tuples())
+    return cache_versao.obter_ou_calcular(CHAVE_VERSAO, consultar)
+
+
+def registrar_versao(versao):
+    """Guarda a versão lida junto com outra consulta (evita relê-la em seguida)."""
+    cache_versao.set(CHAVE_VERSAO, versao)
@@ -0,0 +1,140 @@
+"""
+Testes do agendador de tarefas (app/services/agendador.py)
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from flask import Flask
+from peewee import SqliteDatabase
+
+from app.models.execucao_tarefa import ExecucaoTarefa
+from app.services.agendador import Agendador, Cron, Tarefa
+from app.services.metricas import metricas
+
+
+@pytest.fixture
+def banco():
+    db = SqliteDatabase(":memory:")
+    db.bind([ExecucaoTarefa])
+    db.create_tables([ExecucaoTarefa])
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def agendador(banco):
+    metricas.limpar()
+    yield Agendador(Flask(__name__), banco)
+    metricas.limpar()
+
+
+def test_cron_proxima_execucao():
+    """'30 3 * * *' dispara todo dia às 03:30."""
+    cron = Cron("30 3 * * *")
+    assert cron.proxima(datetime(2026, 1, 1, 3, 29)) == datetime(2026, 1, 1, 3, 30)
+    assert cron.proxima(datetime(2026, 1, 1, 3, 30)) == datetime(2026, 1, 2, 3, 30)
+
+
+def test_cron_passos_e_dia_da_semana():
+    """'*/15 * * * 0' dispara a cada 15 minutos, só aos domingos."""
+    cron = Cron("*/15 * * * 0")
+    # 2026-01-01 é uma quinta-feira; o próximo domingo é 2026-01-04
+    assert cron.proxima(datetime(2026, 1, 1, 10, 0)) == datetime(2026, 1, 4, 0, 0)
+    assert cron.proxima(datetime(2026, 1, 4, 0, 0)) == datetime(2026, 1, 4, 0, 15)
+
+
+def test_cron_expressao_invalida():
+    with pytest.raises(ValueError):
+        Cron("* * *")
+    with pytest.raises(ValueError):
+        Cron("61 * * * *")
+
+
+def test_tarefa_executa_e_registra_metricas(agendador):
+    chamadas = []
+
+    @agendador.a_cada(60)
+    def limpar():
+        chamadas.append(1)
+
+    assert agendador.executar("limpar") is True
+    assert chamadas == [1]
+
+    dados = metricas.snapshot()
+    assert dados["counters"]["tarefa.limpar.execucoes"] == 1
+    assert dados["timings"]["tarefa.limpar.duracao"]["count"] == 1
+
+
+def test_tarefa_com_erro_nao_derruba_agendador(agendador):
+    @agendador.a_cada(60)
+    def quebrada():
+        raise RuntimeError("falhou")
+
+    assert agendador.executar("quebrada") is True
+    assert metricas.snapshot()["counters"]["tarefa.quebrada.erros"] == 1
+
+
+def test_tarefa_pulada_quando_lock_ocupado(agendador):
+    """Só um executor por tarefa: com o lock ocupado a rodada é pulada."""
+    chamadas = []
+
+    @agendador.a_cada(60)
+    def unica():
+        chamadas.append(1)
+
+    assert agendador._obter_lock("unica")
+    assert agendador.executar("unica") is False
+    agendador._liberar_lock("unica")
+
+    assert chamadas == []
+    assert metricas.snapshot()["counters"]["tarefa.unica.puladas"] == 1
+
+
+def test_executar_pendentes_reagenda(agendador):
+    chamadas = []
+
+    @agendador.a_cada(3600)
+    def horaria():
+        chamadas.append(1)
+
+    tarefa = agendador.tarefas["horaria"]
+    agendador.executar_pendentes(agora=tarefa.proxima_execucao)
+    assert chamadas == [1]
+    assert tarefa.proxima_execucao > datetime.now()
+
+
+def test_tarefa_duplicada(agendador):
+    agendador.a_cada(60, nome="x")(lambda: None)
+    with pytest.raises(ValueError):
+        agendador.a_cada(60, nome="x")(lambda: None)
+
+
+def test_intervalo_alinhado_entre_processos():
+    """Processos que sobem em momentos diferentes chegam ao mesmo horário para a rodada."""
+    primeiro, segundo = Tarefa("t", None, intervalo=900), Tarefa("t", None, intervalo=900)
+    primeiro.agendar(datetime(2026, 1, 1, 10, 1, 7))
+    segundo.agendar(datetime(2026, 1, 1, 10, 14, 59))
+    assert primeiro.proxima_execucao == segundo.proxima_execucao == datetime(2026, 1, 1, 10, 15)
+
+
+def test_rodada_executada_por_um_unico_processo(banco):
+    """Dois agendadores (dois processos) com a mesma tarefa: a rodada roda uma vez só."""
+    metricas.limpar()
+    chamadas = []
+    processos = [Agendador(Flask(__name__), banco) for _ in range(2)]
+    for processo in processos:
+        processo.a_cada(3600, nome="compartilhada")(lambda: chamadas.append(1))
+
+    rodada = processos[0].tarefas["compartilhada"].proxima_execucao
+    assert processos[1].tarefas["compartilhada"].proxima_execucao == rodada
+    # O segundo acorda depois que o primeiro já terminou (e liberou o lock)
+    for processo in processos:
+        processo.executar_pendentes(agora=rodada)
+
+    assert chamadas == [1]
+    assert metricas.snapshot()["counters"]["tarefa.compartilhada.puladas"] == 1
+    assert ExecucaoTarefa.select().where(ExecucaoTarefa.tarefa == "compartilhada").count() == 1
+
+    # A rodada seguinte é de novo de quem chegar primeiro
+    assert processos[1].executar("compartilhada", rodada + timedelta(hours=1)) is True
+    assert chamadas == [1, 1]
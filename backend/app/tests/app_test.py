@@ -3,6 +3,11 @@ Testes para inicialização da aplicação Flask (app/__init__.py)
 Testa a factory function create_app(), middlewares e handlers
 """
 
+import json
+import os
+import subprocess
+import sys
+
 import pytest
 from flask import Flask
 from peewee import SqliteDatabase
@@ -20,6 +25,7 @@ class TestConfig(Config):
     """Configuração de teste."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SSE_LISTEN_NOTIFY = False
 
 
 @pytest.fixture(scope="module")
@@ -153,3 +159,34 @@ def test_app_error_handlers(app_instance):
     """Testa se a aplicação tem handlers de erro registrados."""
     # Verifica se existem handlers de erro
     assert hasattr(app_instance, 'error_handler_spec')
+
+
+# Orçamento da subida a frio: o que create_app() custa num interpretador novo além do Flask
+# e do Peewee (que já vêm importados na medição). Ver benchmarks/importacao_bench.py.
+ORCAMENTO_IMPORTACAO_SEGUNDOS = 0.25
+# Dependências carregadas só no primeiro uso (reCAPTCHA, e-mail, migrações, .env)
+IMPORTACOES_ADIADAS = ('requests', 'flask_mail', 'playhouse.shortcuts', 'playhouse.migrate', 'dotenv')
+
+
+def test_create_app_dentro_do_orcamento_de_importacao():
+    """create_app() num processo novo: sem as dependências adiadas e dentro do orçamento."""
+    codigo = (
+        "import json, sys, time\n"
+        "import flask, peewee, flask_login, flask_cors\n"
+        "inicio = time.perf_counter()\n"
+        "from app import create_app\n"
+        "create_app()\n"
+        "segundos = time.perf_counter() - inicio\n"
+        f"print(json.dumps([segundos, [m for m in {IMPORTACOES_ADIADAS!r} if m in sys.modules]]))\n"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, SCHEDULER_ENABLED='false', SSE_LISTEN_NOTIFY='false')
+    medidas = []
+    # Melhor de três: a primeira execução pode pagar o disco frio e a compilação dos .pyc
+    for _ in range(3):
+        resultado = subprocess.run([sys.executable, '-c', codigo], cwd=backend, env=env,
+                                   capture_output=True, text=True, check=True)
+        medidas.append(json.loads(resultado.stdout.strip().splitlines()[-1]))
+
+    assert medidas[-1][1] == []
+    assert min(segundos for segundos, _ in medidas) < ORCAMENTO_IMPORTACAO_SEGUNDOS
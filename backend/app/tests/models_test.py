@@ -225,4 +225,18 @@ def test_inscricao_on_delete_cascade(test_db, admin_user):
     e.delete_instance()  # Deleta o evento
 
     final_count = InscricaoEvento.select().count()
-    assert final_count == initial_count - 2
\ No newline at end of file
+    assert final_count == initial_count - 2
+
+def test_inscricao_unique_numero_por_evento(test_db, admin_user):
+    """O mesmo telefone não pode se inscrever duas vezes no mesmo evento."""
+    e = Evento.create(
+        titulo="Retiro",
+        tipo="Formação",
+        local="Salão",
+        data=date.today(),
+        horario=time(hour=9, minute=0),
+        criado_por=admin_user
+    )
+    InscricaoEvento.create(nome="Pedro", numero="11988888888", evento=e)
+    with pytest.raises(IntegrityError):
+        InscricaoEvento.create(nome="Pedro", numero="11988888888", evento=e)
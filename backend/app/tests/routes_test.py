@@ -25,25 +25,43 @@ Estrutura de Fixtures:
 
 import pytest
 import json
+import re
 from datetime import date, time, timedelta
 from peewee import SqliteDatabase
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, ANY
 
 from app.models.usuario import Usuario
 from app.models.eventos import Evento
 from app.models.inscricao_evento import InscricaoEvento
 from app.models.agenda import Agenda
 from app.models.avisos import Aviso
+from app.models.idempotencia import ChaveIdempotencia
+from app.models.estatistica import EstatisticaConteudo
+from app.models.atividade import Atividade
+from app.models.arquivo import AvisoArquivado, EventoArquivado, InscricaoArquivada
+from app.models.remocao import Remocao
+from app.api.dashboard import cache_dashboard
+from app.services.versao import cache_versao
+from app.services.analise import cache_historico, serie_inscricoes
+from app.api.vagas import cache_vagas, MAXIMO_IDS
+from app.services.metricas import metricas
+from app.services.serializacao import ProvedorJSON
+from app.services.compressao import Compressao, cache_comprimido
+from app.services.recorrencia import cache_expansoes, normalizar_dia_semana
+from app.services.ics import cache_feeds, cache_versoes
+from app.models.migracoes import criar_indices_busca
 
 # --- Fixtures de Setup ---
 @pytest.fixture(scope="session")
 def test_db():
-    models = [Usuario, Evento, InscricaoEvento, Agenda, Aviso] 
+    models = [Usuario, Evento, InscricaoEvento, Agenda, Aviso, ChaveIdempotencia, EstatisticaConteudo, Atividade,
+              AvisoArquivado, EventoArquivado, InscricaoArquivada, Remocao]
     db = SqliteDatabase(":memory:")
     db.bind(models, bind_refs=False, bind_backrefs=False)
     db.connect()
     db.execute_sql('PRAGMA foreign_keys = ON;')
     db.create_tables(models)
+    criar_indices_busca(db)
     yield db
     db.drop_tables(models)
     db.close()
@@ -65,6 +83,8 @@ def create_test_app():
     
     app = Flask(__name__)
     app.config.from_object(TestingConfig())
+    app.json = ProvedorJSON(app)
+    Compressao(app)
     
     mail = Mail(app)
     login_manager = LoginManager()
@@ -113,6 +133,16 @@ def logged_in_client(client, test_db):
     yield client
     client.post('/auth/logout')
 
+@pytest.fixture(scope="function")
+def admin_client(client, admin_user):
+    """Cliente autenticado direto na sessão (sem passar pelo reCAPTCHA do login)."""
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(admin_user.idusuario)
+        sess['_fresh'] = True
+    yield client
+    with client.session_transaction() as sess:
+        sess.clear()
+
 @pytest.fixture(scope="function")
 def admin_user(test_db):
     """Cria um usuário admin para testes de relação com modelos."""
@@ -131,11 +161,26 @@ def admin_user(test_db):
 
 @pytest.fixture(autouse=True)
 def cleanup_data(test_db):
+    InscricaoArquivada.delete().execute()
+    EventoArquivado.delete().execute()
+    AvisoArquivado.delete().execute()
     Evento.delete().execute()
     InscricaoEvento.delete().execute()
     Agenda.delete().execute()
     Aviso.delete().execute()
+    ChaveIdempotencia.delete().execute()
+    Remocao.delete().execute()
+    EstatisticaConteudo.delete().execute()
+    Atividade.delete().execute()
     Usuario.delete().where(Usuario.idusuario != 999).execute()
+    cache_dashboard.limpar()
+    cache_versao.limpar()
+    cache_historico.limpar()
+    cache_vagas.limpar()
+    cache_comprimido.limpar()
+    cache_expansoes.limpar()
+    cache_feeds.limpar()
+    cache_versoes.limpar()
 
 # ---------------------------------------------------------------------
 # --- TESTES DE AUTENTICAÇÃO (auth_routes.py) ---
@@ -222,11 +267,12 @@ def test_dashboard_data_empty(logged_in_client, test_db):
 
 def test_dashboard_data_full(logged_in_client, test_db):
     """Testa a rota de dashboard com dados preenchidos e ordenação."""
-    admin_user = Usuario.get_or_none(Usuario.idusuario == 999)
+    # A atividade recente vem do log gravado pelas rotas, então os dados são criados pela API
     for i in range(5):
-        Evento.create(titulo=f"E{i}", tipo="T", local="L", data=date.today(), horario=time(10, 0), criado_por=admin_user)
-        Aviso.create(titulo=f"A{i}", categoria="C", data=date.today(), criado_por=admin_user)
-        Agenda.create(titulo=f"Ag{i}", tipo="T", local="L", data=date.today(), horario=time(10, 0), criado_por=admin_user)
+        logged_in_client.post('/api/v1/avisos', json={"titulo": f"A{i}", "categoria": "C", "data": str(date.today())})
+        # Horários e locais distintos para não esbarrar na verificação de conflitos
+        logged_in_client.post('/api/v1/agenda', json={"titulo": f"Ag{i}", "tipo": "T", "local": "Sala", "data": str(date.today()), "horario": f"1{i}:00"})
+        logged_in_client.post('/api/v1/eventos', json={"titulo": f"E{i}", "tipo": "T", "local": "Salão", "data": str(date.today()), "horario": f"1{i}:00"})
 
     response = logged_in_client.get('/api/v1/dashboard')
     assert response.status_code == 200
@@ -1223,3 +1269,1328 @@ def test_dashboard_with_all_data_types(logged_in_client, test_db):
     assert data['stats']['avisos'] >= 0
     assert data['stats']['agenda'] >= 0
     assert data['stats']['horarios'] >= 0
+
+
+# ---------------------------------------------------------------------
+# --- TESTES DE IDEMPOTÊNCIA (services/idempotencia.py) ---
+# ---------------------------------------------------------------------
+
+def test_idempotency_key_replays_response(admin_client, test_db):
+    """Repetir o POST com a mesma Idempotency-Key não cria outra linha."""
+    payload = {"titulo": "Retiro", "tipo": "T", "local": "L", "data": "2026-06-20", "horario": "18:00"}
+    headers = {"Idempotency-Key": "abc-123"}
+
+    r1 = admin_client.post('/api/v1/eventos', json=payload, headers=headers)
+    r2 = admin_client.post('/api/v1/eventos', json=payload, headers=headers)
+
+    assert r1.status_code == 201
+    assert r2.status_code == 201
+    assert r2.headers.get('Idempotent-Replayed') == 'true'
+    assert r1.get_json()['id'] == r2.get_json()['id']
+    assert Evento.select().count() == 1
+
+def test_idempotency_key_reused_with_other_payload(admin_client, test_db):
+    """A mesma chave com outro corpo é rejeitada."""
+    headers = {"Idempotency-Key": "abc-456"}
+    admin_client.post('/api/v1/avisos', json={"titulo": "A", "categoria": "C", "data": "2026-01-01"}, headers=headers)
+    response = admin_client.post('/api/v1/avisos', json={"titulo": "B", "categoria": "C", "data": "2026-01-01"}, headers=headers)
+
+    assert response.status_code == 422
+    assert Aviso.select().count() == 1
+
+def test_idempotency_concurrent_duplicate_short_circuits(client, test_db):
+    """Duplicata concorrente recebe 409 antes do reCAPTCHA e sem gravar nada."""
+    from app.services.idempotencia import _hash
+    admin = Usuario.get_by_id(999)
+    evento = Evento.create(titulo="E", tipo="T", local="L", data=date.today(), horario=time(10, 0), criado_por=admin)
+    path = f'/api/v1/eventos/{evento.id}/inscricao'
+    payload = {"nome": "Maria", "telefone": "11999990000", "recaptchaToken": "tok"}
+    body = json.dumps(payload)
+
+    # Simula a requisição original ainda em andamento
+    ChaveIdempotencia.create(chave=_hash('anonimo', 'POST', path, 'k-1'), hash_requisicao=_hash(body.encode()))
+
+    with patch('app.api.eventos.requests.post') as mock_google:
+        response = client.post(path, data=body, content_type='application/json', headers={"Idempotency-Key": "k-1"})
+
+    assert response.status_code == 409
+    mock_google.assert_not_called()
+    assert InscricaoEvento.select().count() == 0
+
+def test_idempotency_purge_expired_keys(test_db):
+    """Chaves fora da janela são removidas pela purga."""
+    from app.services.idempotencia import purgar_chaves_expiradas
+    from datetime import datetime
+    ChaveIdempotencia.create(chave="a" * 64, hash_requisicao="x", status_code=201, criado_em=datetime.now() - timedelta(days=2))
+    ChaveIdempotencia.create(chave="b" * 64, hash_requisicao="x", status_code=201)
+
+    assert purgar_chaves_expiradas(ttl_segundos=24 * 60 * 60) == 1
+    assert ChaveIdempotencia.select().count() == 1
+
+# ---------------------------------------------------------------------
+# --- TESTES DE INSCRIÇÃO DUPLICADA (eventos.py) ---
+# ---------------------------------------------------------------------
+
+@pytest.fixture
+def recaptcha_ok(monkeypatch):
+    """Simula o Google aprovando o reCAPTCHA."""
+    monkeypatch.setenv('RECAPTCHA_SECRET_KEY', 'test-secret')
+    with patch('app.api.eventos.requests.post') as mock_google:
+        mock_google.return_value.json.return_value = {"success": True}
+        yield mock_google
+
+def test_normalizar_telefone():
+    from app.services.telefone import normalizar_telefone
+    assert normalizar_telefone("+55 (11) 99988-7766") == "11999887766"
+    assert normalizar_telefone("11 99988 7766") == "11999887766"
+    assert normalizar_telefone("(11) 3333-4444") == "1133334444"
+    assert normalizar_telefone(None) == ""
+
+def test_inscricao_duplicada_retorna_existente(client, recaptcha_ok, test_db):
+    """Re-inscrição do mesmo telefone (em outro formato) devolve a inscrição original."""
+    admin = Usuario.get_by_id(999)
+    evento = Evento.create(titulo="E", tipo="T", local="L", data=date.today(), horario=time(10, 0), criado_por=admin)
+    url = f'/api/v1/eventos/{evento.id}/inscricao'
+
+    r1 = client.post(url, json={"nome": "Maria", "telefone": "(11) 99988-7766", "recaptchaToken": "t"})
+    r2 = client.post(url, json={"nome": "Maria", "telefone": "+55 11 99988 7766", "recaptchaToken": "t"})
+
+    assert r1.status_code == 201
+    assert r2.status_code == 200
+    assert r1.get_json()['id'] == r2.get_json()['id']
+    assert InscricaoEvento.select().count() == 1
+    assert InscricaoEvento.get().numero == "11999887766"
+
+def test_inscricao_duplicada_em_evento_lotado(client, recaptcha_ok, test_db):
+    """Quem já está inscrito recebe a inscrição mesmo com as vagas esgotadas."""
+    admin = Usuario.get_by_id(999)
+    evento = Evento.create(titulo="E", tipo="T", local="L", data=date.today(), horario=time(10, 0),
+                           tipo_vagas='limitada', numero_vagas=1, criado_por=admin)
+    inscricao = InscricaoEvento.create(nome="Maria", numero="11999887766", evento=evento)
+
+    response = client.post(f'/api/v1/eventos/{evento.id}/inscricao',
+                           json={"nome": "Maria", "telefone": "11999887766", "recaptchaToken": "t"})
+
+    assert response.status_code == 200
+    assert response.get_json()['id'] == inscricao.id
+
+def test_inscricao_telefone_invalido(client, recaptcha_ok, test_db):
+    admin = Usuario.get_by_id(999)
+    evento = Evento.create(titulo="E", tipo="T", local="L", data=date.today(), horario=time(10, 0), criado_por=admin)
+    response = client.post(f'/api/v1/eventos/{evento.id}/inscricao',
+                           json={"nome": "Maria", "telefone": "sem número", "recaptchaToken": "t"})
+    assert response.status_code == 400
+
+# ---------------------------------------------------------------------
+# --- TESTES DE MÉTRICAS (metricas.py) ---
+# ---------------------------------------------------------------------
+
+def test_metricas_admin(admin_client, test_db):
+    """Admin vê contadores, durações e as tarefas agendadas."""
+    import app.services.tarefas  # registra as tarefas (normalmente feito pelo create_app)
+    response = admin_client.get('/api/v1/metricas')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert "counters" in data
+    assert "timings" in data
+    assert any(t["nome"] == "purgar_idempotencia" for t in data["tarefas"])
+
+def test_metricas_requer_login(client, test_db):
+    response = client.get('/api/v1/metricas')
+    assert response.status_code == 401
+
+# ---------------------------------------------------------------------
+# --- TESTES DE DASHBOARD EM CONSULTA ÚNICA (dashboard.py) ---
+# ---------------------------------------------------------------------
+
+from app.services.estatisticas import reconciliar_estatisticas
+
+def _consultas_de_conteudo(mock_execute_sql):
+    """SQL executado, sem a carga do usuário logado feita pelo Flask-Login."""
+    return [c.args[0] for c in mock_execute_sql.call_args_list if 'FROM "usuario"' not in c.args[0]]
+
+def test_dashboard_single_query(admin_client, test_db):
+    """O dashboard inteiro sai de um único SELECT."""
+    admin = Usuario.get_by_id(999)
+    for i in range(4):
+        Evento.create(titulo=f"E{i}", tipo="T", local="L", data=date.today(), horario=time(10, 0), criado_por=admin)
+        Aviso.create(titulo=f"A{i}", categoria="C", data=date.today(), criado_por=admin)
+    reconciliar_estatisticas()
+
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        response = admin_client.get('/api/v1/dashboard')
+
+    assert response.status_code == 200
+    assert len(_consultas_de_conteudo(mock_sql)) == 1
+    data = response.get_json()
+    assert data['stats'] == {"eventos": 4, "avisos": 4, "agenda": 0, "horarios": 0}
+
+def test_dashboard_gestor_filtra_por_dono(test_db):
+    """Gestor vê só o próprio conteúdo; horários públicos são contados para todos."""
+    from types import SimpleNamespace
+    from app.api.dashboard import montar_dashboard
+    admin = Usuario.get_by_id(999)
+    gestor = Usuario.create(nome="Gestor", email="gestor@test.com", senha="x", tipo="gestor")
+    Evento.create(titulo="Do admin", tipo="T", local="L", data=date.today(), horario=time(10, 0), criado_por=admin)
+    Evento.create(titulo="Do gestor", tipo="T", local="L", data=date.today(), horario=time(10, 0), criado_por=gestor)
+    Agenda.create(titulo="Missa", local="L", horario=time(8, 0), is_public=True, criado_por=admin)
+    Agenda.create(titulo="Reunião", local="L", horario=time(9, 0), criado_por=gestor)
+    reconciliar_estatisticas()
+    Atividade.create(tipo="evento", acao="criado", titulo="Do admin", dono_id=999)
+    Atividade.create(tipo="evento", acao="criado", titulo="Do gestor", dono_id=gestor.idusuario)
+    Atividade.create(tipo="agenda", acao="criado", titulo="Reunião", dono_id=gestor.idusuario)
+
+    _, data = montar_dashboard(SimpleNamespace(idusuario=gestor.idusuario, tipo='gestor'))
+
+    assert data['stats'] == {"eventos": 1, "avisos": 0, "agenda": 1, "horarios": 1}
+    assert [a['item'] for a in data['activity']] == ["Reunião", "Do gestor"]
+    assert data['activity'][0]['action'] == "Novo Agendamento"
+
+# ---------------------------------------------------------------------
+# --- TESTES DE ESTATÍSTICAS POR USUÁRIO (services/estatisticas.py) ---
+# ---------------------------------------------------------------------
+
+def _estatistica(usuario_id):
+    linha = EstatisticaConteudo.get_or_none(EstatisticaConteudo.usuario_id == usuario_id)
+    return {c: getattr(linha, c) for c in ("eventos", "avisos", "agenda", "horarios")} if linha else None
+
+def test_estatisticas_mantidas_pelas_rotas(admin_client, test_db):
+    """Criações e remoções pelas rotas atualizam a linha do dono e a global."""
+    evento = admin_client.post('/api/v1/eventos', json={"titulo": "E", "tipo": "T", "local": "L", "data": "2026-01-01", "horario": "10:00"})
+    admin_client.post('/api/v1/avisos', json={"titulo": "A", "categoria": "C", "data": "2026-01-01"})
+    admin_client.post('/api/v1/agenda', json={"titulo": "Ag", "data": "2026-01-01", "local": "Sala", "horario": "10:00"})
+    horario = admin_client.post('/api/v1/horarios', json={"titulo": "Missa", "dia": "Domingo", "horario": "08:00", "local": "L"})
+
+    esperado = {"eventos": 1, "avisos": 1, "agenda": 2, "horarios": 1}
+    assert _estatistica(999) == esperado
+    assert _estatistica(0) == esperado
+
+    admin_client.delete(f"/api/v1/eventos/{evento.get_json()['id']}")
+    admin_client.delete(f"/api/v1/horarios/{horario.get_json()['id']}")
+
+    esperado = {"eventos": 0, "avisos": 1, "agenda": 1, "horarios": 0}
+    assert _estatistica(999) == esperado
+    assert _estatistica(0) == esperado
+
+    data = admin_client.get('/api/v1/dashboard').get_json()
+    assert data['stats'] == esperado
+
+def test_reconciliar_estatisticas_corrige_divergencia(test_db):
+    """A reconciliação recalcula as linhas a partir das tabelas de conteúdo."""
+    admin = Usuario.get_by_id(999)
+    gestor = Usuario.create(nome="Gestor", email="g2@test.com", senha="x", tipo="gestor")
+    Evento.create(titulo="E", tipo="T", local="L", data=date.today(), horario=time(10, 0), criado_por=gestor)
+    Agenda.create(titulo="Missa", local="L", horario=time(8, 0), is_public=True, criado_por=admin)
+    EstatisticaConteudo.create(usuario_id=999, eventos=42)
+
+    reconciliar_estatisticas()
+
+    assert _estatistica(999) == {"eventos": 0, "avisos": 0, "agenda": 1, "horarios": 1}
+    assert _estatistica(gestor.idusuario) == {"eventos": 1, "avisos": 0, "agenda": 0, "horarios": 0}
+    assert _estatistica(0) == {"eventos": 1, "avisos": 0, "agenda": 1, "horarios": 1}
+
+def test_reconciliar_estatisticas_em_uma_instrucao(admin_user, test_db):
+    """Um INSERT ... SELECT ... ON CONFLICT grava tudo; quem ficou sem conteúdo é zerado."""
+    admin = Usuario.get_by_id(999)
+    sem_conteudo = Usuario.create(nome="Ex-gestor", email="ex@test.com", senha="x", tipo="gestor")
+    Aviso.create(titulo="A", categoria="C", data=date.today(), criado_por=admin)
+    EstatisticaConteudo.create(usuario_id=sem_conteudo.idusuario, avisos=3, agenda=2)
+
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        assert reconciliar_estatisticas() == 2
+    escritas = [sql for sql in _instrucoes_na_tabela(mock_sql, 'estatisticaconteudo')
+                if sql.startswith(('INSERT', 'UPDATE', 'DELETE', 'WITH'))]
+    assert [sql.split()[0] for sql in escritas] == ['INSERT', 'UPDATE']
+
+    assert _estatistica(999) == {"eventos": 0, "avisos": 1, "agenda": 0, "horarios": 0}
+    assert _estatistica(sem_conteudo.idusuario) == {"eventos": 0, "avisos": 0, "agenda": 0, "horarios": 0}
+    assert _estatistica(0) == {"eventos": 0, "avisos": 1, "agenda": 0, "horarios": 0}
+
+# ---------------------------------------------------------------------
+# --- TESTES DO LOG DE ATIVIDADES (atividades.py) ---
+# ---------------------------------------------------------------------
+
+def test_atividades_registradas_pelas_rotas(admin_client, test_db):
+    """Criação, edição e remoção ficam no log, inclusive o que não é criação."""
+    r = admin_client.post('/api/v1/avisos', json={"titulo": "Aviso", "categoria": "C", "data": "2026-01-01"})
+    aviso_id = r.get_json()['id']
+    admin_client.put(f'/api/v1/avisos/{aviso_id}', json={"titulo": "Aviso editado"})
+    admin_client.delete(f'/api/v1/avisos/{aviso_id}')
+
+    acoes = [(a.tipo, a.acao, a.titulo) for a in Atividade.select().order_by(Atividade.id)]
+    assert acoes == [("aviso", "criado", "Aviso"), ("aviso", "atualizado", "Aviso editado"), ("aviso", "removido", "Aviso editado")]
+
+    activity = admin_client.get('/api/v1/dashboard').get_json()['activity']
+    assert [a['action'] for a in activity] == ["Aviso Removido", "Aviso Atualizado", "Aviso Publicado"]
+
+def test_atividades_feed_paginado_por_cursor(admin_client, test_db):
+    """O cursor percorre todo o histórico, do mais recente ao mais antigo, sem repetir."""
+    from datetime import datetime
+    base = datetime(2026, 1, 1, 12, 0)
+    for i in range(7):
+        # Dois itens por instante para exercitar o desempate por id
+        Atividade.create(tipo="evento", acao="criado", titulo=f"E{i}", dono_id=999, created_at=base + timedelta(minutes=i // 2))
+
+    vistos, cursor = [], None
+    while True:
+        url = '/api/v1/atividades?limite=3' + (f'&cursor={cursor}' if cursor else '')
+        data = admin_client.get(url).get_json()
+        vistos += [item['item'] for item in data['itens']]
+        cursor = data['proximo_cursor']
+        if not cursor:
+            break
+
+    assert vistos == [f"E{i}" for i in reversed(range(7))]
+
+def test_atividades_gestor_ve_apenas_o_proprio(client, test_db):
+    gestor = Usuario.create(nome="Gestor", email="g3@test.com", senha="x", tipo="gestor")
+    Atividade.create(tipo="aviso", acao="criado", titulo="Do admin", dono_id=999)
+    Atividade.create(tipo="aviso", acao="criado", titulo="Do gestor", dono_id=gestor.idusuario)
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(gestor.idusuario)
+    data = client.get('/api/v1/atividades').get_json()
+    with client.session_transaction() as sess:
+        sess.clear()
+
+    assert [item['item'] for item in data['itens']] == ["Do gestor"]
+
+def test_atividades_cursor_invalido(admin_client, test_db):
+    response = admin_client.get('/api/v1/atividades?cursor=nao-e-um-cursor')
+    assert response.status_code == 400
+
+# ---------------------------------------------------------------------
+# --- TESTES DO CACHE DO DASHBOARD (dashboard.py) ---
+# ---------------------------------------------------------------------
+
+def _get_como(client, usuario, url):
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(usuario.idusuario)
+    response = client.get(url)
+    with client.session_transaction() as sess:
+        sess.clear()
+    return response
+
+def test_dashboard_cache_hit_sem_consultas(admin_client, test_db):
+    admin_client.get('/api/v1/dashboard')
+    hits = metricas.snapshot()['counters'].get('cache.dashboard.hits', 0)
+
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        response = admin_client.get('/api/v1/dashboard')
+
+    assert response.status_code == 200
+    assert _consultas_de_conteudo(mock_sql) == []
+    assert metricas.snapshot()['counters']['cache.dashboard.hits'] == hits + 1
+
+def test_dashboard_cache_invalidado_so_para_o_dono(client, test_db):
+    admin = Usuario.get_or_create(idusuario=999, defaults={"nome": "Admin Teste", "email": "admin@test.com",
+                                                           "senha": "x", "tipo": "admin"})[0]
+    gestor_a = Usuario.create(nome="Gestor A", email="ga@test.com", senha="x", tipo="gestor")
+    gestor_b = Usuario.create(nome="Gestor B", email="gb@test.com", senha="x", tipo="gestor")
+    for usuario in (admin, gestor_a, gestor_b):
+        _get_como(client, usuario, '/api/v1/dashboard')
+    assert len(cache_dashboard) == 3
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(gestor_a.idusuario)
+    response = client.post('/api/v1/avisos', json={"titulo": "Novo", "categoria": "C", "data": "2030-01-01"})
+    with client.session_transaction() as sess:
+        sess.clear()
+    assert response.status_code == 201
+
+    # Entradas do dono e dos admins caem; a do outro gestor continua valendo
+    assert cache_dashboard.get(f"user:{gestor_a.idusuario}") is None
+    assert cache_dashboard.get("admin") is None
+    assert cache_dashboard.get(f"user:{gestor_b.idusuario}") is not None
+
+    assert _get_como(client, gestor_a, '/api/v1/dashboard').get_json()['stats']['avisos'] == 1
+    assert _get_como(client, admin, '/api/v1/dashboard').get_json()['stats']['avisos'] == 1
+    assert _get_como(client, gestor_b, '/api/v1/dashboard').get_json()['stats']['avisos'] == 0
+
+def test_dashboard_cache_ve_alteracoes_de_outros_processos(admin_client, test_db):
+    from app.services.estatisticas import ajustar_contagem
+    from app.services.sincronizacao import registrar_remocoes
+    assert admin_client.get('/api/v1/dashboard').get_json()['stats']['avisos'] == 0
+
+    # Outro processo grava direto no banco: o sinal deste processo não dispara
+    aviso = Aviso.create(titulo="De outro worker", categoria="C", data=date.today(), criado_por=999)
+    ajustar_contagem(999, avisos=1)
+    Atividade.create(tipo="aviso", acao="criado", item_id=aviso.id, titulo=aviso.titulo, dono_id=999)
+    # Dentro da janela da versão a resposta guardada continua valendo
+    assert admin_client.get('/api/v1/dashboard').get_json()['stats']['avisos'] == 0
+
+    # Passada a janela, a versão relida do banco mudou e o dashboard é remontado
+    cache_versao.limpar()
+    data = admin_client.get('/api/v1/dashboard').get_json()
+    assert data['stats']['avisos'] == 1
+    assert data['activity'][0]['item'] == "De outro worker"
+
+    # O arquivamento (tarefa do worker) não gera atividade, só lápides
+    registrar_remocoes('avisos', Aviso, [aviso.id])
+    aviso.delete_instance()
+    ajustar_contagem(999, avisos=-1)
+    cache_versao.limpar()
+    assert admin_client.get('/api/v1/dashboard').get_json()['stats']['avisos'] == 0
+
+    # Com a versão em cache e sem alterações, nenhuma consulta
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        assert admin_client.get('/api/v1/dashboard').status_code == 200
+    assert _consultas_de_conteudo(mock_sql) == []
+
+def test_dashboard_cache_nao_invalida_em_erro(admin_client, test_db):
+    admin_client.get('/api/v1/dashboard')
+    response = admin_client.delete('/api/v1/avisos/123456')
+    assert response.status_code == 404
+    assert cache_dashboard.get("admin") is not None
+
+# ---------------------------------------------------------------------
+# --- TESTES DO RELATÓRIO DE INSCRIÇÕES (analise.py) ---
+# ---------------------------------------------------------------------
+
+def _evento_com_inscricoes(admin, datas, **campos):
+    from datetime import datetime
+    evento = Evento.create(titulo=campos.get('titulo', 'Retiro'), tipo=campos.get('tipo', 'Retiro'), local="Salão",
+                           tipo_vagas=campos.get('tipo_vagas'), numero_vagas=campos.get('numero_vagas'),
+                           data=date.today(), horario=time(9, 0), criado_por=admin)
+    for i, quando in enumerate(datas):
+        InscricaoEvento.create(nome=f"P{i}", numero=f"1190000{evento.id:02d}{i:02d}", evento=evento,
+                               created_at=datetime.combine(quando, time(10, 0)))
+    return evento
+
+def test_analise_serie_por_semana_e_mes(admin_client, admin_user, test_db):
+    _evento_com_inscricoes(admin_user, [date(2025, 3, 3), date(2025, 3, 5), date(2025, 3, 12), date(2025, 4, 1)])
+
+    semanas = admin_client.get('/api/v1/analise/inscricoes?granularidade=semana&de=2025-03-01&ate=2025-04-30').get_json()
+    assert semanas['serie'] == [
+        {"inicio": "2025-03-03", "total": 2},
+        {"inicio": "2025-03-10", "total": 1},
+        {"inicio": "2025-03-31", "total": 1},
+    ]
+    meses = admin_client.get('/api/v1/analise/inscricoes?granularidade=mes').get_json()
+    assert meses['serie'] == [{"inicio": "2025-03-01", "total": 3}, {"inicio": "2025-04-01", "total": 1}]
+
+def test_analise_ocupacao_e_por_tipo(admin_client, admin_user, test_db):
+    hoje = date.today()
+    _evento_com_inscricoes(admin_user, [hoje] * 3, titulo="Retiro", tipo="Retiro", tipo_vagas="limitada", numero_vagas=4)
+    _evento_com_inscricoes(admin_user, [hoje], titulo="Missa", tipo="Missa", tipo_vagas="ilimitada")
+
+    data = admin_client.get('/api/v1/analise/inscricoes').get_json()
+    ocupacao = {e['titulo']: e for e in data['eventos']}
+    assert ocupacao['Retiro']['inscritos'] == 3
+    assert ocupacao['Retiro']['taxa_ocupacao'] == 0.75
+    assert ocupacao['Missa']['taxa_ocupacao'] is None
+    assert data['por_tipo'] == [
+        {"tipo": "Missa", "eventos": 1, "inscricoes": 1},
+        {"tipo": "Retiro", "eventos": 1, "inscricoes": 3},
+    ]
+
+def test_analise_periodos_encerrados_vem_do_cache(admin_user, test_db):
+    from datetime import datetime
+    evento = _evento_com_inscricoes(admin_user, [date(2025, 1, 10)])
+    agora = datetime(2025, 2, 15)
+    assert serie_inscricoes('mes', agora=agora) == [{"inicio": "2025-01-01", "total": 1}]
+
+    # Inscrição nova cai no período corrente; o histórico não é consultado de novo
+    InscricaoEvento.create(nome="Nova", numero="11988887777", evento=evento, created_at=datetime(2025, 2, 14))
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        serie = serie_inscricoes('mes', agora=agora)
+    assert serie == [{"inicio": "2025-01-01", "total": 1}, {"inicio": "2025-02-01", "total": 1}]
+    assert mock_sql.call_count == 1
+
+def test_analise_inclui_arquivo_e_ve_outros_processos(admin_user, test_db):
+    from datetime import datetime
+    from app.services.analise import ocupacao_eventos, inscricoes_por_tipo
+    from app.services.arquivamento import _mover_lote
+    from app.services.sincronizacao import registrar_remocoes
+    antigo = _evento_com_inscricoes(admin_user, [date(2025, 1, 10), date(2025, 1, 20)], titulo="Retiro 2025",
+                                    tipo_vagas="limitada", numero_vagas=4)
+    Evento.update(data=date(2025, 2, 1)).where(Evento.id == antigo.id).execute()
+    atual = _evento_com_inscricoes(admin_user, [date(2025, 2, 5)], titulo="Missa", tipo="Missa")
+    agora = datetime(2025, 3, 15)
+    esperado = [{"inicio": "2025-01-01", "total": 2}, {"inicio": "2025-02-01", "total": 1}]
+    assert serie_inscricoes('mes', agora=agora) == esperado
+
+    # O worker arquiva o evento antigo (sem o sinal deste processo); passada a janela da versão,
+    # a série é recalculada e continua contando as inscrições que foram para o arquivo
+    assert _mover_lote(Evento, date(2025, 3, 1) - timedelta(days=10), 500) == 1
+    cache_versao.limpar()
+    assert serie_inscricoes('mes', agora=agora) == esperado
+    ocupacao = {e["titulo"]: (e["inscritos"], e["taxa_ocupacao"]) for e in ocupacao_eventos()}
+    assert ocupacao == {"Retiro 2025": (2, 0.5), "Missa": (1, None)}
+    assert inscricoes_por_tipo() == [{"tipo": "Missa", "eventos": 1, "inscricoes": 1},
+                                     {"tipo": "Retiro", "eventos": 1, "inscricoes": 2}]
+
+    # Outro processo apaga um evento: a versão muda e o histórico guardado deixa de valer
+    registrar_remocoes('inscricoes', InscricaoEvento, InscricaoEvento.evento == atual.id)
+    atual.delete_instance(recursive=True)
+    cache_versao.limpar()
+    assert serie_inscricoes('mes', agora=agora) == esperado[:1]
+
+def test_analise_granularidade_invalida(admin_client, test_db):
+    assert admin_client.get('/api/v1/analise/inscricoes?granularidade=ano').status_code == 400
+    assert admin_client.get('/api/v1/analise/inscricoes?de=ontem').status_code == 400
+
+# ---------------------------------------------------------------------
+# --- TESTES DE VAGAS AO VIVO (vagas.py) ---
+# ---------------------------------------------------------------------
+
+def _ler_sse(response):
+    chunk = next(response.response)
+    return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+def test_vagas_stream_envia_situacao_e_inscricoes(client, recaptcha_ok, admin_user, test_db):
+    from app.services.vagas import transmissor
+    evento = Evento.create(titulo="Retiro", tipo="Retiro", local="Salão", tipo_vagas="limitada", numero_vagas=2,
+                           data=date.today(), horario=time(9, 0), criado_por=admin_user)
+
+    response = client.get(f'/api/v1/eventos/{evento.id}/vagas/stream', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    inicial = _ler_sse(response)
+    assert inicial.startswith("event: vagas\n")
+    assert json.loads(inicial.split("data: ", 1)[1]) == {
+        "evento_id": evento.id, "inscritos": 0, "numero_vagas": 2, "restantes": 2}
+
+    client.post(f'/api/v1/eventos/{evento.id}/inscricao',
+                json={"nome": "Ana", "telefone": "11999990000", "recaptchaToken": "ok"})
+    atualizacao = json.loads(_ler_sse(response).split("data: ", 1)[1])
+    assert atualizacao["inscritos"] == 1 and atualizacao["restantes"] == 1
+
+    response.close()
+    assert transmissor.total_assinantes() == 0
+
+def test_vagas_stream_todos_e_evento_inexistente(client, admin_user, test_db):
+    from app.services.vagas import transmissor, publicar_vagas
+    eventos = [Evento.create(titulo=f"E{i}", tipo="Missa", local="Igreja", data=date.today(), horario=time(9, 0),
+                             criado_por=admin_user) for i in range(2)]
+
+    response = client.get('/api/v1/eventos/vagas/stream', buffered=False)
+    assert [json.loads(_ler_sse(response).split("data: ", 1)[1])["evento_id"] for _ in eventos] == [e.id for e in eventos]
+    publicar_vagas(eventos[1])
+    assert json.loads(_ler_sse(response).split("data: ", 1)[1])["evento_id"] == eventos[1].id
+    response.close()
+
+    assert client.get('/api/v1/eventos/999999/vagas/stream').status_code == 404
+    assert transmissor.total_assinantes() == 0
+
+def test_transmissor_descarta_mensagens_antigas_de_assinante_lento():
+    from app.services.transmissao import Transmissor
+    transmissor = Transmissor(tamanho_fila=2)
+    assinatura = transmissor.assinar("t")
+    for i in range(5):
+        transmissor.publicar("t", i)
+    assert [assinatura.receber(0), assinatura.receber(0), assinatura.receber(0)] == [3, 4, None]
+
+def test_vagas_em_lote_uma_consulta(client, admin_user, test_db):
+    limitado = Evento.create(titulo="Retiro", tipo="Retiro", local="Salão", tipo_vagas="limitada", numero_vagas=3,
+                             data=date.today(), horario=time(9, 0), criado_por=admin_user)
+    livre = Evento.create(titulo="Missa", tipo="Missa", local="Igreja", data=date.today(), horario=time(9, 0),
+                          criado_por=admin_user)
+    for i in range(2):
+        InscricaoEvento.create(nome=f"P{i}", numero=f"1190000000{i}", evento=limitado)
+
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        response = client.get(f'/api/v1/eventos/vagas?ids={livre.id},{limitado.id},999999')
+        client.get(f'/api/v1/eventos/vagas?ids=999999,{limitado.id},{livre.id}')
+
+    assert response.status_code == 200
+    assert "max-age=" in response.headers['Cache-Control']
+    assert mock_sql.call_count == 1  # a segunda chamada (mesmos ids) vem do cache
+    assert {d['evento_id']: d['restantes'] for d in response.get_json()} == {limitado.id: 1, livre.id: None}
+
+def test_vagas_em_lote_valida_ids(client, test_db):
+    excesso = ','.join(str(i) for i in range(MAXIMO_IDS + 1))
+    assert client.get(f'/api/v1/eventos/vagas?ids={excesso}').status_code == 400
+    assert client.get('/api/v1/eventos/vagas?ids=1,abc').status_code == 400
+    assert client.get('/api/v1/eventos/vagas').status_code == 400
+
+# ---------------------------------------------------------------------
+# --- TESTES DE CAMPOS ESPARSOS (?fields=) ---
+# ---------------------------------------------------------------------
+
+def test_fields_restringe_consulta_e_json(client, admin_user, test_db):
+    evento = Evento.create(titulo="Retiro", tipo="Retiro", local="Salão", data=date.today(), horario=time(9, 0),
+                           descricao="x" * 5000, criado_por=admin_user)
+    InscricaoEvento.create(nome="Ana", numero="11999990000", evento=evento)
+
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        response = client.get('/api/v1/eventos?fields=id,titulo,registered_count')
+
+    assert response.get_json() == [{"id": evento.id, "titulo": "Retiro", "registered_count": 1}]
+    assert mock_sql.call_count == 1
+    assert '"descricao"' not in mock_sql.call_args.args[0]
+
+def test_fields_padrao_mantem_todos_os_campos(client, admin_user, test_db):
+    Aviso.create(titulo="Aviso", categoria="Geral", data=date.today(), criado_por=admin_user)
+    Agenda.create(titulo="Reunião", local="Sala", horario=time(9, 0), data=date.today(), criado_por=admin_user)
+
+    aviso = client.get('/api/v1/avisos').get_json()[0]
+    assert set(aviso) == {"id", "titulo", "categoria", "url", "descricao", "data", "criado_por_id", "version"}
+    assert aviso["url"] == ""
+    agenda = client.get('/api/v1/agenda?fields=titulo,horario').get_json()
+    assert agenda == [{"titulo": "Reunião", "horario": "09:00:00"}]
+
+def test_fields_desconhecido_retorna_400(client, test_db):
+    for url in ('/api/v1/eventos?fields=titulo,senha', '/api/v1/agenda?fields=,', '/api/v1/avisos?fields=foo'):
+        response = client.get(url)
+        assert response.status_code == 400
+        assert "Disponíveis" in response.get_json()["error"]
+
+# ---------------------------------------------------------------------
+# --- TESTES DO PROVIDER JSON (services/serializacao.py) ---
+# ---------------------------------------------------------------------
+
+def test_provedor_json_tipos_nativos(client, admin_user, test_db):
+    from datetime import datetime
+    aviso = Aviso.create(titulo="Aviso", categoria="Geral", data=date(2025, 3, 1), criado_por=admin_user)
+    app = client.application
+    with app.app_context():
+        dados = json.loads(app.json.response({
+            "quando": datetime(2025, 3, 1, 10, 30), "hora": time(9, 0), "aviso": Aviso.get_by_id(aviso.id)
+        }).get_data())
+
+    assert dados["quando"] == "2025-03-01T10:30:00"
+    assert dados["hora"] == "09:00:00"
+    assert dados["aviso"]["data"] == "2025-03-01"
+    assert dados["aviso"]["criado_por"] == admin_user.idusuario
+
+def test_provedor_json_fallback_stdlib_mesma_saida(client, monkeypatch):
+    from datetime import datetime
+    from app.services import serializacao
+    app = client.application
+    obj = {"b": [1, 2.5, None, "ação"], "a": {"quando": datetime(2025, 1, 2, 3, 4, 5), "dia": date(2025, 1, 2)}}
+
+    com_orjson = app.json.dumps_bytes(obj)
+    monkeypatch.setattr(serializacao, "orjson", None)
+    assert app.json.dumps_bytes(obj) == com_orjson
+    assert app.json.loads(com_orjson) == json.loads(com_orjson)
+
+# ---------------------------------------------------------------------
+# --- TESTES DE COMPRESSÃO (services/compressao.py) ---
+# ---------------------------------------------------------------------
+
+def test_compressao_gzip_em_listagem_grande_com_cache(client, admin_user, test_db):
+    import gzip
+    for i in range(30):
+        Aviso.create(titulo=f"Aviso {i}", categoria="Geral", descricao="texto " * 20, data=date.today(),
+                     criado_por=admin_user)
+    hits = metricas.snapshot()['counters'].get('cache.compressao.hits', 0)
+
+    response = client.get('/api/v1/avisos', headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(json.loads(gzip.decompress(response.data))) == 30
+
+    # Mesmo corpo: o resultado comprimido vem do cache
+    client.get('/api/v1/avisos', headers={"Accept-Encoding": "gzip"})
+    assert metricas.snapshot()['counters']['cache.compressao.hits'] == hits + 1
+
+def test_compressao_ignora_resposta_pequena_e_sem_accept_encoding(client, test_db):
+    pequena = client.get('/api/v1/hello', headers={"Accept-Encoding": "gzip"})
+    assert 'Content-Encoding' not in pequena.headers
+    assert pequena.get_json() == {"message": "Hello from Dashboard API!"}
+
+    Aviso.delete().execute()
+    sem_header = client.get('/api/v1/avisos')
+    assert 'Content-Encoding' not in sem_header.headers
+
+def test_compressao_em_streaming(client, admin_user, test_db):
+    import zlib
+    Evento.create(titulo="Retiro", tipo="Retiro", local="Salão", data=date.today(), horario=time(9, 0),
+                  criado_por=admin_user)
+    response = client.get('/api/v1/eventos/vagas/stream', headers={"Accept-Encoding": "gzip"}, buffered=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+    # Cada mensagem chega completa (sync flush), sem esperar o fim do fluxo
+    descompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    mensagem = descompressor.decompress(next(response.response)).decode()
+    assert mensagem.startswith("event: vagas\n") and mensagem.endswith("\n\n")
+    response.close()
+
+# ---------------------------------------------------------------------
+# --- TESTES DE INTERVALO DE DATAS NA AGENDA (agenda.py) ---
+# ---------------------------------------------------------------------
+
+def _agenda_em(admin, dia, hora, titulo):
+    return Agenda.create(titulo=titulo, local="Sala", horario=time(hora, 0), data=dia, criado_por=admin)
+
+def test_agenda_intervalo_em_ordem_de_calendario(client, admin_user, test_db):
+    _agenda_em(admin_user, date(2025, 2, 28), 9, "Fevereiro")
+    _agenda_em(admin_user, date(2025, 3, 10), 15, "Tarde")
+    _agenda_em(admin_user, date(2025, 3, 10), 8, "Manhã")
+    _agenda_em(admin_user, date(2025, 3, 31), 9, "Fim do mês")
+    _agenda_em(admin_user, date(2025, 4, 1), 9, "Abril")
+
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        response = client.get('/api/v1/agenda?from=2025-03-01&to=2025-03-31&fields=titulo')
+
+    assert response.get_json() == [{"titulo": "Manhã"}, {"titulo": "Tarde"}, {"titulo": "Fim do mês"}]
+    assert mock_sql.call_count == 1
+    plano = test_db.execute_sql("EXPLAIN QUERY PLAN " + mock_sql.call_args.args[0], mock_sql.call_args.args[1]).fetchall()
+    assert any("agenda_data_horario" in linha[-1] for linha in plano)
+
+def test_agenda_agrupada_por_dia(client, admin_user, test_db):
+    _agenda_em(admin_user, date(2025, 3, 10), 15, "Tarde")
+    _agenda_em(admin_user, date(2025, 3, 10), 8, "Manhã")
+    _agenda_em(admin_user, date(2025, 3, 12), 9, "Quarta")
+
+    data = client.get('/api/v1/agenda?from=2025-03-01&to=2025-03-31&agrupar=dia&fields=titulo').get_json()
+    assert data == [
+        {"data": "2025-03-10", "itens": [{"titulo": "Manhã"}, {"titulo": "Tarde"}]},
+        {"data": "2025-03-12", "itens": [{"titulo": "Quarta"}]},
+    ]
+
+def test_agenda_intervalo_invalido(client, test_db):
+    assert client.get('/api/v1/agenda?from=2025-03-31&to=2025-03-01').status_code == 400
+    assert client.get('/api/v1/agenda?from=marco').status_code == 400
+    assert client.get('/api/v1/agenda?agrupar=mes').status_code == 400
+
+# ---------------------------------------------------------------------
+# --- TESTES DE RECORRÊNCIA DOS HORÁRIOS (services/recorrencia.py) ---
+# ---------------------------------------------------------------------
+
+def test_normalizar_dia_semana():
+    assert normalizar_dia_semana("Segunda-feira") == {0}
+    assert normalizar_dia_semana("DOMINGO") == {6}
+    assert normalizar_dia_semana("Sábado e Domingo") == {5, 6}
+    assert normalizar_dia_semana("Seg, Qua e Sex") == {0, 2, 4}
+    assert normalizar_dia_semana("Segunda a Sexta") == {0, 1, 2, 3, 4}
+    assert normalizar_dia_semana("2ª a 6ª") == {0, 1, 2, 3, 4}
+    assert normalizar_dia_semana("Sexta a Segunda") == {4, 5, 6, 0}
+    assert normalizar_dia_semana("Todos os dias") == set(range(7))
+    assert normalizar_dia_semana("quando der") == set()
+    assert normalizar_dia_semana(None) == set()
+
+def test_calendario_expande_horarios_e_mescla_agenda(client, admin_user, test_db):
+    Agenda.create(titulo="Missa", local="Matriz", horario=time(19, 0), dia_semana="Quarta-feira",
+                  is_public=True, criado_por=admin_user)
+    Agenda.create(titulo="Reunião", local="Sala", horario=time(8, 0), data=date(2025, 3, 12), criado_por=admin_user)
+    Agenda.create(titulo="Fora", local="Sala", horario=time(8, 0), data=date(2025, 4, 1), criado_por=admin_user)
+
+    data = client.get('/api/v1/calendario?from=2025-03-10&to=2025-03-23').get_json()
+    assert [(i["data"], i["titulo"], i["recorrente"]) for i in data] == [
+        ("2025-03-12", "Reunião", False),
+        ("2025-03-12", "Missa", True),
+        ("2025-03-19", "Missa", True),
+    ]
+
+def test_calendario_memoizado_e_invalidado_pelos_horarios(admin_client, admin_user, test_db):
+    Agenda.create(titulo="Terço", local="Capela", horario=time(18, 0), dia_semana="Segunda",
+                  is_public=True, criado_por=admin_user)
+    url = '/api/v1/calendario?from=2025-03-03&to=2025-03-09'
+    admin_client.get(url)
+
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        admin_client.get(url)
+    # Só a agenda pontual é consultada; a expansão vem do cache
+    assert len(_consultas_de_conteudo(mock_sql)) == 1
+
+    response = admin_client.post('/api/v1/horarios', json={"titulo": "Missa", "dia": "Domingo",
+                                                           "horario": "10:00", "local": "Matriz"})
+    assert response.status_code == 201
+    assert [i["titulo"] for i in admin_client.get(url).get_json()] == ["Terço", "Missa"]
+
+def test_calendario_ve_horarios_alterados_por_outro_processo(client, admin_user, test_db):
+    item = Agenda.create(titulo="Terço", local="Capela", horario=time(18, 0), dia_semana="Segunda",
+                         is_public=True, criado_por=admin_user)
+    url = '/api/v1/calendario?from=2025-03-03&to=2025-03-09'
+    assert [i["titulo"] for i in client.get(url).get_json()] == ["Terço"]
+
+    # Outro processo edita o horário: nenhum sinal chega aqui, mas o log de atividades muda
+    Agenda.update(titulo="Terço dos homens").where(Agenda.id == item.id).execute()
+    Atividade.create(tipo="horario", acao="atualizado", item_id=item.id, titulo="Terço dos homens",
+                     dono_id=admin_user.idusuario)
+    cache_versao.limpar()
+    assert [i["titulo"] for i in client.get(url).get_json()] == ["Terço dos homens"]
+
+def test_calendario_parametros_invalidos(client, test_db):
+    assert client.get('/api/v1/calendario?from=2025-03-01').status_code == 400
+    assert client.get('/api/v1/calendario?from=2025-03-10&to=2025-03-01').status_code == 400
+    assert client.get('/api/v1/calendario?from=2025-01-01&to=2026-06-01').status_code == 400
+
+# ---------------------------------------------------------------------
+# --- TESTES DOS FEEDS .ics (services/ics.py) ---
+# ---------------------------------------------------------------------
+
+def test_ics_horarios_com_regra_semanal(client, admin_user, test_db):
+    Agenda.create(titulo="Missa; Dominical", local="Matriz, Centro", horario=time(10, 0), dia_semana="Sábado e Domingo",
+                  is_public=True, criado_por=admin_user)
+
+    response = client.get('/api/v1/calendario/horarios.ics')
+    corpo = response.get_data(as_text=True)
+    assert response.mimetype == 'text/calendar'
+    assert corpo.startswith("BEGIN:VCALENDAR\r\n") and corpo.endswith("END:VCALENDAR\r\n")
+    assert "RRULE:FREQ=WEEKLY;BYDAY=SA,SU\r\n" in corpo
+    assert "DTSTART:20240106T100000\r\n" in corpo
+    assert "SUMMARY:Missa\\; Dominical\r\n" in corpo
+    assert "LOCATION:Matriz\\, Centro\r\n" in corpo
+
+def test_ics_etag_304_e_invalidado_por_escrita(admin_client, admin_user, test_db):
+    Evento.create(titulo="Retiro", tipo="Retiro", local="Salão", data=date(2025, 5, 1), horario=time(9, 0),
+                  descricao="x" * 200, criado_por=admin_user)
+    primeira = admin_client.get('/api/v1/calendario/eventos.ics')
+    etag = primeira.headers['ETag']
+    assert "DTSTART:20250501T090000" in primeira.get_data(as_text=True)
+    # Linhas longas são dobradas em até 75 octetos
+    assert all(len(l.encode()) <= 75 for l in primeira.get_data(as_text=True).split("\r\n"))
+
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        repetida = admin_client.get('/api/v1/calendario/eventos.ics', headers={"If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert _consultas_de_conteudo(mock_sql) == []
+
+    response = admin_client.post('/api/v1/eventos', json={"titulo": "Novo", "tipo": "Missa", "local": "Igreja",
+                                                          "data": "2025-06-01", "horario": "10:00"})
+    assert response.status_code == 201
+    nova = admin_client.get('/api/v1/calendario/eventos.ics', headers={"If-None-Match": etag})
+    assert nova.status_code == 200
+    assert nova.headers['ETag'] != etag
+    assert "SUMMARY:Novo" in nova.get_data(as_text=True)
+
+def test_compressao_usa_etag_fraca_no_corpo_comprimido(client, admin_user, test_db):
+    import gzip
+    Evento.create(titulo="Retiro", tipo="Retiro", local="Salão", data=date(2025, 5, 1), horario=time(9, 0),
+                  descricao="x" * 2000, criado_por=admin_user)
+    # Cada corpo é lido logo (feed em streaming)
+    original = client.get('/api/v1/calendario/eventos.ics', headers={"Accept-Encoding": "identity"})
+    assert original.get_data(as_text=True).startswith("BEGIN:VCALENDAR")
+    comprimida = client.get('/api/v1/calendario/eventos.ics', headers={"Accept-Encoding": "gzip"})
+    assert gzip.decompress(comprimida.get_data()) == original.get_data()
+    assert comprimida.headers['Content-Encoding'] == 'gzip'
+    assert comprimida.headers['ETag'].startswith('W/')
+
+    # O validador de uma variante serve para a outra (If-None-Match usa comparação fraca)
+    for etag in (original.headers['ETag'], comprimida.headers['ETag']):
+        assert client.get('/api/v1/calendario/eventos.ics', headers={"If-None-Match": etag,
+                                                                     "Accept-Encoding": "gzip"}).status_code == 304
+
+    # ETag forte do handler (versão do item) também fica fraca quando o corpo é comprimido
+    app = client.application
+    with app.test_request_context('/', headers={"Accept-Encoding": "gzip"}):
+        resposta = app.response_class(b"{}" * 1000, mimetype='application/json')
+        resposta.set_etag("3")
+        resposta = Compressao().processar(resposta)
+    assert resposta.headers['ETag'] == 'W/"3"'
+
+def test_ics_feed_inexistente(client, test_db):
+    assert client.get('/api/v1/calendario/outro.ics').status_code == 404
+
+# ---------------------------------------------------------------------
+# --- TESTES DE CONFLITO DE RESERVAS (services/conflitos.py) ---
+# ---------------------------------------------------------------------
+
+def test_conflito_entre_agenda_e_evento_no_mesmo_local(admin_client, admin_user, test_db):
+    Evento.create(titulo="Retiro", tipo="Retiro", local="Salão", data=date(2030, 5, 4), horario=time(9, 0),
+                  criado_por=admin_user)
+
+    response = admin_client.post('/api/v1/agenda', json={"titulo": "Ensaio", "local": "Salão",
+                                                        "data": "2030-05-04", "horario": "09:30"})
+    assert response.status_code == 409
+    assert [(c["tipo"], c["titulo"]) for c in response.get_json()["conflitos"]] == [("evento", "Retiro")]
+    assert Agenda.select().count() == 0
+
+    # Outro local, ou logo depois do fim (1h), não conflita
+    assert admin_client.post('/api/v1/agenda', json={"titulo": "Ensaio", "local": "Capela",
+                                                    "data": "2030-05-04", "horario": "09:30"}).status_code == 201
+    assert admin_client.post('/api/v1/eventos', json={"titulo": "Almoço", "tipo": "T", "local": "Salão",
+                                                     "data": "2030-05-04", "horario": "10:00"}).status_code == 201
+    # O cliente pode confirmar a sobreposição
+    assert admin_client.post('/api/v1/agenda', json={"titulo": "Ensaio", "local": "Salão", "data": "2030-05-04",
+                                                    "horario": "09:30", "ignorar_conflitos": True}).status_code == 201
+
+def test_conflito_com_horario_semanal(admin_client, admin_user, test_db):
+    Agenda.create(titulo="Missa", local="Matriz", horario=time(19, 0), dia_semana="Quarta-feira",
+                  is_public=True, criado_por=admin_user)
+
+    # 2030-05-08 é uma quarta-feira
+    response = admin_client.post('/api/v1/eventos', json={"titulo": "Palestra", "tipo": "T", "local": "Matriz",
+                                                         "data": "2030-05-08", "horario": "19:30"})
+    assert response.status_code == 409
+    assert response.get_json()["conflitos"][0]["tipo"] == "horario"
+
+    conflito = admin_client.post('/api/v1/horarios', json={"titulo": "Terço", "dia": "Segunda a Sexta",
+                                                          "horario": "18:30", "local": "Matriz"})
+    assert conflito.status_code == 409
+    assert admin_client.post('/api/v1/horarios', json={"titulo": "Terço", "dia": "Sábado",
+                                                      "horario": "18:30", "local": "Matriz"}).status_code == 201
+
+def test_indice_intervalos_sobrepostas():
+    from datetime import datetime
+    from app.services.conflitos import IndiceIntervalos
+    indice = IndiceIntervalos()
+    base = datetime(2030, 1, 1, 10, 0)
+    for minutos in (0, 90, 200):
+        indice.adicionar("Sala", base + timedelta(minutes=minutos), minutos)
+
+    assert indice.sobrepostas("Sala", base + timedelta(minutes=45)) == [0, 90]
+    assert indice.sobrepostas("Sala", base + timedelta(minutes=30)) == [0]
+    assert indice.sobrepostas("Sala", base + timedelta(minutes=150)) == [200]
+    assert indice.sobrepostas("Sala", base + timedelta(minutes=330)) == []
+    assert indice.sobrepostas("Outra", base) == []
+
+def test_agenda_lote_aplica_operacoes_em_poucas_consultas(admin_client, admin_user, test_db):
+    mover = Agenda.create(titulo="Ensaio", local="Sala", data=date(2030, 6, 1), horario=time(9, 0),
+                          criado_por=admin_user)
+    apagar = Agenda.create(titulo="Reunião", local="Capela", data=date(2030, 6, 2), horario=time(9, 0),
+                           criado_por=admin_user)
+    operacoes = [{"op": "criar", "dados": {"titulo": f"Visita {i}", "local": "Sala", "data": "2030-06-03",
+                                           "horario": f"1{i}:00"}} for i in range(3)]
+    operacoes += [{"op": "atualizar", "id": mover.id, "dados": {"horario": "10:00", "titulo": "Ensaio geral"}},
+                  {"op": "remover", "id": apagar.id}]
+
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        response = admin_client.post('/api/v1/agenda/lote', json={"operacoes": operacoes})
+
+    assert response.status_code == 200
+    corpo = response.get_json()
+    assert corpo["aplicadas"] == 5
+    assert [r["status"] for r in corpo["resultados"]] == [201, 201, 201, 200, 200]
+    # Um INSERT, um UPDATE e um DELETE para os itens, qualquer que seja o tamanho do lote
+    sqls = [c.args[0] for c in mock_sql.call_args_list]
+    assert [s.startswith(('INSERT INTO "agenda"', 'UPDATE "agenda"', 'DELETE FROM "agenda"')) for s in sqls].count(True) == 3
+
+    mover = Agenda.get_by_id(mover.id)
+    assert (mover.titulo, mover.horario) == ("Ensaio geral", time(10, 0))
+    assert Agenda.get_or_none(Agenda.id == apagar.id) is None
+    # Os dois itens iniciais foram criados direto no banco: +3 criados, -1 removido
+    assert EstatisticaConteudo.get_by_id(admin_user.idusuario).agenda == 2
+    assert Atividade.select().where(Atividade.tipo == 'agenda').count() == 5
+
+def test_agenda_lote_resultados_por_operacao(client, admin_user, test_db):
+    gestor = Usuario.create(nome="Gestor", email="gestor.lote@test.com", senha="x", tipo="gestor")
+    meu = Agenda.create(titulo="Meu", local="Sala", data=date(2030, 7, 1), horario=time(9, 0), criado_por=gestor)
+    alheio = Agenda.create(titulo="Alheio", local="Sala", data=date(2030, 7, 2), horario=time(9, 0),
+                           criado_por=admin_user)
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(gestor.idusuario)
+    response = client.post('/api/v1/agenda/lote', json={"operacoes": [
+        {"op": "remover", "id": alheio.id},
+        {"op": "atualizar", "id": 123456, "dados": {"titulo": "X"}},
+        {"op": "criar", "dados": {"titulo": "Sem data"}},
+        {"op": "atualizar", "id": meu.id, "dados": {"data": "2030-07-02", "horario": "09:30"}},
+        {"op": "criar", "dados": {"titulo": "Novo", "local": "Sala", "data": "2030-07-05", "horario": "08:00"}},
+        {"op": "criar", "dados": {"titulo": "Colado", "local": "Sala", "data": "2030-07-05", "horario": "08:30"}},
+        {"op": "remover", "id": meu.id},
+    ]})
+
+    assert response.status_code == 200
+    resultados = response.get_json()["resultados"]
+    assert [r["status"] for r in resultados] == [403, 404, 400, 409, 201, 409, 400]
+    assert resultados[3]["conflitos"][0]["titulo"] == "Alheio"
+    assert Agenda.get_by_id(alheio.id).titulo == "Alheio"
+    assert Agenda.get_by_id(meu.id).data == date(2030, 7, 1)
+    assert Agenda.select().count() == 3
+
+def test_agenda_lote_valida_lista(admin_client, test_db):
+    assert admin_client.post('/api/v1/agenda/lote', json={"operacoes": []}).status_code == 400
+    grande = [{"op": "remover", "id": i} for i in range(1, 202)]
+    assert admin_client.post('/api/v1/agenda/lote', json={"operacoes": grande}).status_code == 400
+
+def test_agenda_lote_criacoes_com_campos_diferentes(admin_client, test_db):
+    response = admin_client.post('/api/v1/agenda/lote', json={"operacoes": [
+        {"op": "criar", "dados": {"titulo": "Ensaio", "local": "Sala", "data": "2030-09-01", "horario": "08:00"}},
+        {"op": "criar", "dados": {"titulo": "Missa", "local": "Matriz", "data": "2030-09-01", "horario": "10:00",
+                                  "descricao": "importante", "tipo": "Missa"}},
+    ]})
+    assert [r["status"] for r in response.get_json()["resultados"]] == [201, 201]
+
+    # Os campos opcionais da segunda criação não se perdem por faltarem na primeira
+    gravados = {a.titulo: (a.tipo, a.descricao) for a in Agenda.select()}
+    assert gravados == {"Ensaio": (None, None), "Missa": ("Missa", "importante")}
+
+def test_agenda_lote_incrementa_versao(admin_client, admin_user, test_db):
+    item = Agenda.create(titulo="Ensaio", local="Sala", data=date(2030, 8, 1), horario=time(9, 0),
+                         criado_por=admin_user)
+    lido = admin_client.get('/api/v1/agenda?fields=id,version').get_json()
+    assert lido == [{"id": item.id, "version": 1}]
+
+    response = admin_client.post('/api/v1/agenda/lote', json={"operacoes": [
+        {"op": "atualizar", "id": item.id, "dados": {"titulo": "Ensaio do coral"}}]})
+    assert response.get_json()["resultados"][0]["version"] == 2
+
+    # Quem leu antes do lote não sobrescreve a alteração
+    antigo = admin_client.put(f'/api/v1/agenda/{item.id}', json={"titulo": "Ensaio"}, headers={"If-Match": '"1"'})
+    assert (antigo.status_code, antigo.headers["ETag"]) == (409, '"2"')
+    assert Agenda.get_by_id(item.id).titulo == "Ensaio do coral"
+
+    # A versão também pode ser exigida por operação dentro do lote
+    response = admin_client.post('/api/v1/agenda/lote', json={"operacoes": [
+        {"op": "atualizar", "id": item.id, "version": 1, "dados": {"titulo": "X"}},
+        {"op": "remover", "id": item.id + 1000, "version": "a"}]})
+    assert [(r["status"], r.get("version")) for r in response.get_json()["resultados"]] == [(409, 2), (400, None)]
+    assert Agenda.get_by_id(item.id).version == 2
+
+def _get_json(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_busca_textual_por_relevancia_e_mantida_nas_escritas(admin_client, admin_user, test_db):
+    Aviso.create(titulo="Inscrições para o batizado", categoria="Sacramentos", data=date(2030, 1, 1),
+                 descricao="Documentos necessários.", criado_por=admin_user)
+    Aviso.create(titulo="Bazar", categoria="Geral", data=date(2030, 1, 2),
+                 descricao="Renda revertida para o curso de batismo.", criado_por=admin_user)
+    Evento.create(titulo="Curso de Batismo", tipo="Curso", local="Salão", data=date(2030, 2, 1),
+                  horario=time(9, 0), criado_por=admin_user)
+
+    resultados = _get_json(admin_client, '/api/v1/busca?q=batis')
+    # Título pesa mais que a descrição
+    assert [(r["tipo"], r["titulo"]) for r in resultados] == [("evento", "Curso de Batismo"), ("aviso", "Bazar")]
+    assert _get_json(admin_client, '/api/v1/busca?q=inscricoes')[0]["titulo"] == "Inscrições para o batizado"
+    assert _get_json(admin_client, '/api/v1/busca?q=batis&tipos=aviso')[0]["tipo"] == "aviso"
+
+    # O índice acompanha as escritas das rotas
+    evento = Evento.get(Evento.titulo == "Curso de Batismo")
+    admin_client.delete(f'/api/v1/eventos/{evento.id}')
+    assert admin_client.post('/api/v1/agenda', json={"titulo": "Ensaio do coral", "local": "Capela",
+                                                    "data": "2030-03-01", "horario": "19:00"}).status_code == 201
+    assert [r["tipo"] for r in _get_json(admin_client, '/api/v1/busca?q=batis')] == ["aviso"]
+    assert _get_json(admin_client, '/api/v1/busca?q=coral')[0]["data"] == "2030-03-01"
+
+def test_busca_parametros_invalidos(client, test_db):
+    assert client.get('/api/v1/busca?q=a').status_code == 400
+    assert client.get('/api/v1/busca?q=missa&tipos=usuario').status_code == 400
+    assert client.get('/api/v1/busca?q=missa&limit=x').status_code == 400
+    # Sintaxe do FTS5 digitada pelo usuário não quebra a consulta
+    assert client.get('/api/v1/busca?q=missa"%20OR%20(').status_code == 200
+
+def test_arquivamento_em_lotes_e_listagens_com_arquivo(client, admin_user, test_db):
+    from app.services.arquivamento import arquivar_antigos
+    hoje = date(2030, 6, 1)
+    for i in range(5):
+        Aviso.create(titulo=f"Antigo {i}", categoria="C", data=date(2028, 1, 1 + i), criado_por=admin_user)
+    Aviso.create(titulo="Recente", categoria="C", data=date(2030, 5, 1), criado_por=admin_user)
+    passado = Evento.create(titulo="Retiro 2029", tipo="Retiro", local="Sítio", data=date(2029, 1, 10),
+                            horario=time(8, 0), numero_vagas=10, criado_por=admin_user)
+    InscricaoEvento.create(nome="Ana", numero="11999990000", evento=passado)
+    Evento.create(titulo="Festa", tipo="Festa", local="Salão", data=date(2030, 7, 1), horario=time(18, 0),
+                  criado_por=admin_user)
+    reconciliar_estatisticas()
+
+    # Lotes de 2: os 5 avisos antigos saem em 3 transações
+    with patch.object(test_db, 'atomic', wraps=test_db.atomic) as mock_atomic:
+        movidos = arquivar_antigos(dias_avisos=365, dias_eventos=180, lote=2, hoje=hoje)
+    assert movidos == {"avisos": 5, "eventos": 1}
+    assert mock_atomic.call_count == 3 + 1
+
+    assert Aviso.select().count() == 1 and AvisoArquivado.select().count() == 5
+    assert InscricaoEvento.select().count() == 0 and InscricaoArquivada.get().nome == "Ana"
+    assert EstatisticaConteudo.get_by_id(admin_user.idusuario).avisos == 1
+
+    # Listagens padrão leem só a tabela quente
+    assert [a["titulo"] for a in client.get('/api/v1/avisos').get_json()] == ["Recente"]
+    assert [e["titulo"] for e in client.get('/api/v1/eventos').get_json()] == ["Festa"]
+
+    avisos = client.get('/api/v1/avisos?include_archived=true&fields=titulo').get_json()
+    assert [a["titulo"] for a in avisos] == ["Recente"] + [f"Antigo {i}" for i in range(4, -1, -1)]
+    eventos = client.get('/api/v1/eventos?include_archived=1').get_json()
+    assert [(e["titulo"], e["registered_count"]) for e in eventos] == [("Retiro 2029", 1), ("Festa", 0)]
+
+def test_sync_incremental_com_lapides(client, admin_user, test_db):
+    from datetime import datetime
+    a1 = Aviso.create(titulo="Aviso 1", categoria="C", data=date(2030, 1, 1), criado_por=admin_user)
+    Aviso.create(titulo="Aviso 2", categoria="C", data=date(2030, 1, 2), criado_por=admin_user)
+    e1 = Evento.create(titulo="Retiro", tipo="T", local="Sítio", data=date(2030, 2, 1), horario=time(8, 0),
+                       criado_por=admin_user)
+    i1 = InscricaoEvento.create(nome="Ana", numero="11999990000", evento=e1)
+    e2 = Evento.create(titulo="Festa", tipo="T", local="Salão", data=date(2030, 3, 1), horario=time(18, 0),
+                       criado_por=admin_user)
+    g1 = Agenda.create(titulo="Ensaio", local="Sala", data=date(2030, 1, 5), horario=time(9, 0),
+                       criado_por=admin_user)
+    # Tudo isso já existia bem antes da primeira sincronização
+    uma_hora_atras = datetime.now() - timedelta(hours=1)
+    for modelo in (Aviso, Evento, InscricaoEvento, Agenda):
+        modelo.update(updated_at=uma_hora_atras).execute()
+
+    completo = client.get('/api/v1/sync').get_json()
+    assert completo["completo"] is True
+    assert len(completo["alterados"]["avisos"]) == 2 and len(completo["alterados"]["eventos"]) == 2
+    # Sem login, nada de inscrições (dados pessoais)
+    assert "inscricoes" not in completo["alterados"]
+
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(admin_user.idusuario)
+    assert client.put(f'/api/v1/avisos/{a1.id}', json={"titulo": "Aviso 1 (corrigido)"}).status_code == 200
+    assert client.delete(f'/api/v1/eventos/{e1.id}').status_code == 200
+    assert client.delete(f'/api/v1/agenda/{g1.id}').status_code == 200
+    nova = InscricaoEvento.create(nome="Bia", numero="11988880000", evento=e2)
+
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        delta = client.get(f'/api/v1/sync?since={completo["cursor"]}').get_json()
+    with client.session_transaction() as sess:
+        sess.clear()
+
+    assert delta["completo"] is False
+    assert [a["titulo"] for a in delta["alterados"]["avisos"]] == ["Aviso 1 (corrigido)"]
+    # O evento não mudou, mas a contagem de inscritos sim
+    assert [(e["id"], e["registered_count"]) for e in delta["alterados"]["eventos"]] == [(e2.id, 1)]
+    assert delta["alterados"]["agenda"] == []
+    assert [i["id"] for i in delta["alterados"]["inscricoes"]] == [nova.id]
+    assert delta["removidos"] == {"eventos": [e1.id], "avisos": [], "agenda": [g1.id], "inscricoes": [i1.id]}
+    # Uma consulta por conjunto + uma para as lápides
+    assert len(_consultas_de_conteudo(mock_sql)) == 5
+
+def test_sync_cursor_invalido_ou_expirado(client, test_db):
+    from datetime import datetime
+    from app.services.sincronizacao import codificar_cursor
+    assert client.get('/api/v1/sync?since=xyz').status_code == 400
+    antigo = codificar_cursor(datetime.now() - timedelta(days=365))
+    assert client.get(f'/api/v1/sync?since={antigo}').status_code == 410
+
+def test_if_match_atualizacao_condicional(admin_client, admin_user, test_db):
+    aviso = Aviso.create(titulo="Aviso", categoria="Geral", data=date(2030, 1, 1), criado_por=admin_user)
+    versao = admin_client.get('/api/v1/avisos').get_json()[0]["version"]
+    assert versao == 1
+
+    primeira = admin_client.put(f'/api/v1/avisos/{aviso.id}', json={"titulo": "Primeira"},
+                                headers={"If-Match": f'"{versao}"'})
+    assert primeira.status_code == 200
+    assert primeira.get_json()["version"] == 2 and primeira.headers["ETag"] == '"2"'
+
+    # Segunda edição feita a partir da mesma versão (já desatualizada): nada é gravado
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        segunda = admin_client.put(f'/api/v1/avisos/{aviso.id}', json={"titulo": "Segunda"},
+                                   headers={"If-Match": f'"{versao}"'})
+    assert segunda.status_code == 409
+    assert segunda.get_json()["version"] == 2
+    assert Aviso.get_by_id(aviso.id).titulo == "Primeira"
+    assert not any('FOR UPDATE' in c.args[0] for c in mock_sql.call_args_list)
+
+    # Sem If-Match a atualização continua incondicional (e também incrementa a versão)
+    assert admin_client.put(f'/api/v1/avisos/{aviso.id}', json={"titulo": "Terceira"}).get_json()["version"] == 3
+    assert admin_client.put(f'/api/v1/avisos/{aviso.id}', json={"titulo": "X"},
+                            headers={"If-Match": '"abc"'}).status_code == 400
+
+def test_if_match_em_todas_as_rotas_de_atualizacao(admin_client, admin_user, test_db):
+    evento = Evento.create(titulo="Festa", tipo="T", local="Salão", data=date(2030, 3, 1), horario=time(18, 0),
+                           criado_por=admin_user)
+    item = Agenda.create(titulo="Ensaio", local="Sala", data=date(2030, 1, 5), horario=time(9, 0),
+                         criado_por=admin_user)
+    horario = Agenda.create(titulo="Missa", local="Matriz", horario=time(19, 0), dia_semana="Domingo",
+                            is_public=True, criado_por=admin_user)
+    dados_evento = {"titulo": "Festa", "tipo": "T", "local": "Salão", "data": "2030-03-01", "horario": "18:00"}
+    dados_agenda = {"titulo": "Ensaio", "local": "Sala", "data": "2030-01-05", "horario": "09:00"}
+    rotas = [
+        (f'/api/v1/eventos/{evento.id}', dados_evento),
+        (f'/api/v1/agenda/{item.id}', dados_agenda),
+        (f'/api/v1/horarios/{horario.id}', {"titulo": "Missa das 19h"}),
+        (f'/auth/admins/{admin_user.idusuario}', {"name": "Admin"}),
+    ]
+    for url, dados in rotas:
+        assert admin_client.put(url, json=dados, headers={"If-Match": '"1"'}).status_code == 200, url
+        conflito = admin_client.put(url, json=dados, headers={"If-Match": '"1"'})
+        assert (conflito.status_code, conflito.headers["ETag"]) == (409, '"2"'), url
+
+def _instrucoes_na_tabela(mock_sql, tabela):
+    """Instruções que leem ou escrevem 'tabela' (FROM/UPDATE/INTO "tabela")."""
+    padrao = re.compile(rf'\b(FROM|UPDATE|INTO) "{tabela}"')
+    return [c.args[0] for c in mock_sql.call_args_list if padrao.search(c.args[0])]
+
+def _criar_para_rota(tipo, dono):
+    if tipo == 'evento':
+        return Evento.create(titulo="Festa", tipo="T", local="Salão", data=date(2030, 3, 1), horario=time(18, 0),
+                             criado_por=dono)
+    if tipo == 'aviso':
+        return Aviso.create(titulo="Aviso", categoria="C", data=date(2030, 1, 1), criado_por=dono)
+    return Agenda.create(titulo="Ensaio", local="Sala", data=date(2030, 1, 5), horario=time(9, 0), criado_por=dono)
+
+@pytest.mark.parametrize("metodo, tipo, url, corpo", [
+    ('put', 'evento', '/api/v1/eventos/{}', {"titulo": "Festa", "tipo": "T", "local": "Salão",
+                                            "data": "2030-03-01", "horario": "19:00"}),
+    ('delete', 'evento', '/api/v1/eventos/{}', None),
+    ('put', 'aviso', '/api/v1/avisos/{}', {"titulo": "Aviso editado"}),
+    ('delete', 'aviso', '/api/v1/avisos/{}', None),
+    ('delete', 'agenda', '/api/v1/agenda/{}', None),
+])
+def test_escrita_com_permissao_em_uma_instrucao(client, admin_user, test_db, metodo, tipo, url, corpo):
+    gestor = Usuario.create(nome="Gestor", email="gestor.perm@test.com", senha="x", tipo="gestor")
+    meu = _criar_para_rota(tipo, gestor)
+    alheio = _criar_para_rota(tipo, admin_user)
+    if tipo == 'evento':
+        inscricao = InscricaoEvento.create(nome="P", numero="11900000001", evento=alheio)
+    tabela = type(meu)._meta.table_name
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(gestor.idusuario)
+
+    def chamar(item_id):
+        with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+            response = getattr(client, metodo)(url.format(item_id), json=corpo)
+        # As lápides das inscrições (INSERT ... SELECT) só leem o evento no filtro do dono
+        instrucoes = [sql for sql in _instrucoes_na_tabela(mock_sql, tabela) if not sql.startswith('INSERT')]
+        escritas = [sql for sql in instrucoes if sql.startswith(('UPDATE', 'DELETE'))]
+        leituras = [sql for sql in instrucoes if sql.startswith('SELECT')]
+        # Nada de SELECT antes (nem do item, nem do dono): o dono vai no WHERE do UPDATE/DELETE
+        assert len(escritas) == 1 and instrucoes[0] in escritas, instrucoes
+        assert '"criado_por_id" = ' in escritas[0], escritas
+        return response.status_code, leituras
+
+    try:
+        # Só quando nada foi alterado: um SELECT para distinguir 404 de 403
+        assert chamar(123456) == (404, [ANY])
+        assert chamar(alheio.id) == (403, [ANY])
+        assert chamar(meu.id) == (200, [])
+    finally:
+        with client.session_transaction() as sess:
+            sess.clear()
+
+    # O 403 não escreveu nada: o item de outro dono continua intacto, sem lápides nem cascata
+    intacto = type(alheio).get_by_id(alheio.id)
+    assert (intacto.titulo, intacto.version) == (alheio.titulo, 1)
+    assert Atividade.select().where(Atividade.item_id == alheio.id).count() == 0
+    assert Remocao.select().where(Remocao.item_id == alheio.id).count() == 0
+    if tipo == 'evento':
+        assert InscricaoEvento.get_or_none(InscricaoEvento.id == inscricao.id) is not None
+        assert Remocao.select().where(Remocao.tipo == 'inscricoes').count() == 0
+
+@pytest.mark.parametrize("url, corpo, tipo", [
+    ('/api/v1/agenda/{}', {"titulo": "Ensaio geral", "local": "Sala", "data": "2030-01-05", "horario": "10:00"},
+     'agenda'),
+    ('/api/v1/horarios/{}', {"titulo": "Ensaio geral"}, 'horario'),
+])
+def test_atualizacao_da_agenda_em_uma_instrucao(admin_client, admin_user, test_db, url, corpo, tipo):
+    item = _criar_para_rota('agenda', admin_user)
+
+    with patch.object(test_db, 'execute_sql', wraps=test_db.execute_sql) as mock_sql:
+        response = admin_client.put(url.format(item.id), json=corpo)
+    assert response.status_code == 200
+    # Sem SELECT antes: dono e título do log vêm do RETURNING do UPDATE
+    instrucoes = _instrucoes_na_tabela(mock_sql, 'agenda')
+    assert len(instrucoes) == 1 and instrucoes[0].startswith('UPDATE'), instrucoes
+
+    atividade = Atividade.get(Atividade.item_id == item.id)
+    assert (atividade.tipo, atividade.titulo, atividade.dono_id) == (tipo, "Ensaio geral", admin_user.idusuario)
+    # Campos não enviados ao horário continuam como estavam
+    assert Agenda.get_by_id(item.id).local == "Sala"
+    assert admin_client.put(url.format(123456), json=corpo).status_code == 404
+
+def test_instantaneos_publicados_apos_commit(admin_client, tmp_path, monkeypatch):
+    import gzip
+    monkeypatch.setitem(admin_client.application.config, 'SNAPSHOT_DIR', str(tmp_path))
+    monkeypatch.setitem(admin_client.application.config, 'SNAPSHOT_DEBOUNCE_SECONDS', 0)
+    payload = {"titulo": "Aviso", "categoria": "Geral", "data": "2030-01-01"}
+
+    response = admin_client.post('/api/v1/avisos', json=payload)
+    assert response.status_code == 201
+    # Só a listagem afetada; nenhum temporário sobra no diretório
+    assert sorted(p.name for p in tmp_path.iterdir() if not p.name.endswith(('.br', '.lock'))) == \
+        ['avisos.json', 'avisos.json.gz']
+
+    # Mesmo corpo que o Flask devolveria, também na variante comprimida
+    publicado = (tmp_path / 'avisos.json').read_bytes()
+    assert json.loads(publicado) == admin_client.get('/api/v1/avisos').get_json()
+    assert gzip.decompress((tmp_path / 'avisos.json.gz').read_bytes()) == publicado
+
+    # Um horário altera as duas listagens que o contêm
+    response = admin_client.post('/api/v1/horarios', json={"titulo": "Missa", "dia": "Domingo",
+                                                               "horario": "08:00", "local": "Matriz"})
+    assert response.status_code == 201
+    assert json.loads((tmp_path / 'horarios.json').read_bytes()) == admin_client.get('/api/v1/horarios').get_json()
+    assert json.loads((tmp_path / 'agenda.json').read_bytes()) == admin_client.get('/api/v1/agenda').get_json()
+
+    # Escrita que falha (rollback) não republica
+    antes = (tmp_path / 'avisos.json').stat().st_mtime_ns
+    assert admin_client.delete('/api/v1/avisos/999999').status_code == 404
+    assert (tmp_path / 'avisos.json').stat().st_mtime_ns == antes
+
+def test_migracao_unifica_inscricoes_antes_do_indice_unico(admin_user, test_db):
+    from peewee import IntegrityError
+    from app.models.migracoes import aplicar_migracoes
+    evento = Evento.create(titulo="Retiro", tipo="T", local="Salão", data=date(2030, 4, 1), horario=time(8, 0),
+                           criado_por=admin_user)
+    outro = Evento.create(titulo="Festa", tipo="T", local="Salão", data=date(2030, 4, 2), horario=time(8, 0),
+                          criado_por=admin_user)
+    # Banco anterior ao índice: números como vieram do formulário, com repetições
+    test_db.execute_sql('DROP INDEX "inscricaoevento_evento_id_numero"')
+    try:
+        primeira = InscricaoEvento.create(nome="Ana", numero="+55 (11) 99988-7766", evento=evento)
+        InscricaoEvento.create(nome="Ana de novo", numero="11 99988 7766", evento=evento)
+        InscricaoEvento.create(nome="Ana", numero="11999887766", evento=evento)
+        em_outro = InscricaoEvento.create(nome="Ana", numero="(11) 99988-7766", evento=outro)
+        unica = InscricaoEvento.create(nome="Bia", numero="11 91234-5678", evento=evento)
+
+        aplicar_migracoes(test_db)
+    finally:
+        # Garante o índice para os demais testes mesmo se a migração falhar
+        InscricaoEvento._schema.create_indexes(safe=True)
+
+    restantes = {i.id: (i.evento_id, i.numero) for i in InscricaoEvento.select()}
+    assert restantes == {
+        primeira.id: (evento.id, "11999887766"),
+        em_outro.id: (outro.id, "11999887766"),
+        unica.id: (evento.id, "11912345678"),
+    }
+    removidas = Remocao.select().where(Remocao.tipo == 'inscricoes').count()
+    assert removidas == 2
+
+    # O índice existe: a mesma inscrição não entra de novo, e rodar outra vez não muda nada
+    with pytest.raises(IntegrityError):
+        with test_db.atomic():
+            InscricaoEvento.create(nome="Ana", numero="11999887766", evento=evento)
+    aplicar_migracoes(test_db)
+    assert InscricaoEvento.select().count() == 3
+
+def test_migracao_data_das_inscricoes_vem_do_log(admin_client, admin_user, test_db):
+    from datetime import datetime
+    from app.models.migracoes import aplicar_migracoes
+    evento = Evento.create(titulo="Retiro", tipo="T", local="Salão", data=date(2030, 4, 1), horario=time(8, 0),
+                           criado_por=admin_user)
+    # Banco anterior à coluna created_at
+    test_db.execute_sql('DROP INDEX "inscricaoevento_created_at"')
+    test_db.execute_sql('ALTER TABLE "inscricaoevento" DROP COLUMN "created_at"')
+    try:
+        for nome, numero in (("Ana", "11999887766"), ("Bia", "11912345678")):
+            test_db.execute_sql('INSERT INTO "inscricaoevento" (nome, numero, evento_id, updated_at) '
+                                'VALUES (?, ?, ?, ?)', (nome, numero, evento.id, datetime(2025, 3, 20)))
+        ana, bia = InscricaoEvento.select(InscricaoEvento.id).order_by(InscricaoEvento.id).tuples()
+        # Só a inscrição da Ana tem "Nova Inscrição" no log
+        Atividade.create(tipo="inscricao", acao="criado", item_id=ana[0], titulo="Retiro",
+                         created_at=datetime(2025, 3, 5, 10, 0))
+        Atividade.create(tipo="evento", acao="criado", item_id=bia[0], titulo="Retiro",
+                         created_at=datetime(2025, 1, 1, 9, 0))
+
+        assert "inscricaoevento.created_at" in aplicar_migracoes(test_db)
+    finally:
+        if 'created_at' not in {c.name for c in test_db.get_columns('inscricaoevento')}:
+            test_db.execute_sql('ALTER TABLE "inscricaoevento" ADD COLUMN "created_at" DATETIME')
+        InscricaoEvento._schema.create_indexes(safe=True)
+
+    # Data do log, não a da migração; sem registro no log, NULL
+    datas = dict(InscricaoEvento.select(InscricaoEvento.id, InscricaoEvento.created_at).tuples())
+    assert datas == {ana[0]: datetime(2025, 3, 5, 10, 0), bia[0]: None}
+
+    # A série conta só o que tem data; a ocupação conta todas
+    data = admin_client.get('/api/v1/analise/inscricoes?granularidade=mes&de=2025-01-01&ate=2025-12-31').get_json()
+    assert data['serie'] == [{"inicio": "2025-03-01", "total": 1}]
+    assert admin_client.get('/api/v1/analise/inscricoes?granularidade=mes').get_json()['serie'] == \
+        [{"inicio": "2025-03-01", "total": 1}]
+
+def test_instantaneos_agrupados_fora_da_requisicao(admin_client, admin_user, tmp_path, monkeypatch, test_db):
+    from app.services import instantaneos
+    app = admin_client.application
+    monkeypatch.setitem(app.config, 'SNAPSHOT_DIR', str(tmp_path))
+    monkeypatch.setitem(app.config, 'SNAPSHOT_DEBOUNCE_SECONDS', 60)
+    republicador = instantaneos.Republicador(app, test_db)
+    monkeypatch.setattr(instantaneos, 'republicador', republicador)
+    evento = {"titulo": "Festa", "tipo": "T", "local": "Salão", "data": "2030-03-01", "horario": "18:00"}
+
+    try:
+        for hora in ("18:00", "19:00", "20:00"):
+            assert admin_client.post('/api/v1/eventos', json=dict(evento, horario=hora)).status_code == 201
+        assert admin_client.post('/api/v1/avisos', json={"titulo": "Aviso", "categoria": "Geral",
+                                                         "data": "2030-01-01"}).status_code == 201
+
+        # As requisições só marcaram as listagens; nada foi consultado nem gravado nelas
+        assert republicador.pendentes() == {"eventos", "avisos"}
+        assert not any(p.name.endswith('.json') for p in tmp_path.iterdir())
+
+        # Três eventos, uma republicação
+        with patch.object(instantaneos, 'publicar', wraps=instantaneos.publicar) as mock_publicar:
+            republicador.descarregar()
+        assert sorted(c.args[0] for c in mock_publicar.call_args_list) == ['avisos', 'eventos']
+        assert republicador.pendentes() == set()
+    finally:
+        republicador.parar()
+
+    publicado = (tmp_path / 'eventos.json').read_bytes()
+    assert json.loads(publicado) == admin_client.get('/api/v1/eventos').get_json()
+    assert len(json.loads(publicado)) == 3
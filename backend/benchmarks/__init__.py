@@ -0,0 +1 @@
+# Benchmarks manuais: python -m benchmarks.<nome> (a partir da pasta backend)
@@ -0,0 +1,126 @@
+"""
+Benchmark do dashboard: implementação antiga (7 consultas com COUNT) x consulta única
+(UNION ALL lendo as contagens de EstatisticaConteudo e o log de atividades).
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.dashboard_bench [--linhas 20000] [--usuarios 50] [--repeticoes 50]
+
+Roda em um SQLite em memória; com --postgres usa o banco configurado em
+app/models/config.py (cuidado: cria e apaga as tabelas nele).
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta, time as dtime
+from types import SimpleNamespace
+
+from peewee import SqliteDatabase
+
+from app.api.dashboard import montar_dashboard
+from app.models.agenda import Agenda
+from app.models.atividade import Atividade
+from app.models.avisos import Aviso
+from app.models.estatistica import EstatisticaConteudo
+from app.models.eventos import Evento
+from app.models.usuario import Usuario
+from app.services.estatisticas import reconciliar_estatisticas
+
+MODELS = [Usuario, Evento, Aviso, Agenda, EstatisticaConteudo, Atividade]
+
+
+def dashboard_antigo(user):
+    """Implementação anterior, mantida aqui apenas para comparação."""
+    if user.tipo == 'admin':
+        q_eventos, q_avisos, q_agenda = Evento.select(), Aviso.select(), Agenda.select()
+    else:
+        q_eventos = Evento.select().where(Evento.criado_por == user.idusuario)
+        q_avisos = Aviso.select().where(Aviso.criado_por == user.idusuario)
+        q_agenda = Agenda.select().where(Agenda.criado_por == user.idusuario)
+    stats = {
+        "eventos": q_eventos.count(),
+        "avisos": q_avisos.count(),
+        "agenda": q_agenda.count(),
+        "horarios": Agenda.select().where(Agenda.is_public == True).count(),
+    }
+    atividade = []
+    for e in q_eventos.order_by(Evento.id.desc()).limit(3):
+        atividade.append({"action": "Evento Registrado", "item": e.titulo, "type": "evento", "sort_id": e.id * 1000})
+    for a in q_avisos.order_by(Aviso.id.desc()).limit(3):
+        atividade.append({"action": "Aviso Publicado", "item": a.titulo, "type": "aviso", "sort_id": a.id * 1000})
+    for ag in q_agenda.order_by(Agenda.id.desc()).limit(3):
+        atividade.append({"action": "Novo Agendamento", "item": ag.titulo, "type": "agenda", "sort_id": ag.id * 1000})
+    atividade.sort(key=lambda x: x['sort_id'], reverse=True)
+    return {"stats": stats, "activity": atividade[:5], "user_role": user.tipo}
+
+
+def popular(db, linhas, usuarios):
+    random.seed(42)
+    with db.atomic():
+        Usuario.insert_many(
+            [{"nome": f"U{i}", "email": f"u{i}@bench", "senha": "x", "tipo": "admin" if i == 1 else "gestor"}
+             for i in range(1, usuarios + 1)]
+        ).execute()
+        donos = [random.randint(1, usuarios) for _ in range(linhas)]
+        for inicio in range(0, linhas, 500):
+            bloco = range(inicio, min(inicio + 500, linhas))
+            Evento.insert_many([
+                {"titulo": f"E{i}", "tipo": "T", "local": "L", "data": date.today(), "horario": dtime(10),
+                 "criado_por": donos[i]} for i in bloco]).execute()
+            Aviso.insert_many([
+                {"titulo": f"A{i}", "categoria": "C", "data": date.today(), "criado_por": donos[i]}
+                for i in bloco]).execute()
+            Agenda.insert_many([
+                {"titulo": f"Ag{i}", "local": "L", "horario": dtime(10), "is_public": i % 10 == 0,
+                 "criado_por": donos[i]} for i in bloco]).execute()
+            Atividade.insert_many([
+                {"tipo": tipo, "acao": "criado", "item_id": i + 1, "titulo": f"{tipo}{i}",
+                 "autor_id": donos[i], "dono_id": donos[i], "created_at": datetime(2026, 1, 1) + timedelta(seconds=i)}
+                for i in bloco for tipo in ("evento", "aviso", "agenda")]).execute()
+
+
+def medir(funcao, user, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao(user)
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=20000, help='linhas por tabela de conteúdo')
+    parser.add_argument('--usuarios', type=int, default=50)
+    parser.add_argument('--repeticoes', type=int, default=50)
+    parser.add_argument('--postgres', action='store_true')
+    args = parser.parse_args()
+
+    if args.postgres:
+        from app.models.config import db
+    else:
+        db = SqliteDatabase(':memory:')
+    db.bind(MODELS, bind_refs=False, bind_backrefs=False)
+    db.connect()
+    db.drop_tables(MODELS, safe=True)
+    db.create_tables(MODELS)
+    popular(db, args.linhas, args.usuarios)
+    reconciliar_estatisticas()
+
+    visoes = {
+        "admin": SimpleNamespace(idusuario=1, tipo='admin'),
+        "gestor": SimpleNamespace(idusuario=2, tipo='gestor'),
+    }
+    print(f"{args.linhas} linhas por tabela, {args.usuarios} usuários, {args.repeticoes} repetições")
+    print(f"{'visão':<8}{'antigo (ms)':>14}{'UNION ALL (ms)':>17}{'ganho':>8}")
+    for nome, user in visoes.items():
+        # A atividade recente agora vem do log; as contagens devem continuar iguais
+        assert dashboard_antigo(user)["stats"] == montar_dashboard(user)["stats"], f"contagens diferentes na visão {nome}"
+        antigo = medir(dashboard_antigo, user, args.repeticoes)
+        novo = medir(montar_dashboard, user, args.repeticoes)
+        print(f"{nome:<8}{antigo:>14.2f}{novo:>17.2f}{antigo / novo:>7.1f}x")
+
+    if args.postgres:
+        db.drop_tables(MODELS)
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Tempo de subida: quanto custa 'from app import create_app; create_app()' num
+interpretador novo (o que cada worker paga ao reiniciar ou escalar) e quais
+módulos pesam mais na importação.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.importacao_bench [--repeticoes 5] [--top 25]
+
+Cada repetição roda em um subprocesso com 'python -X importtime'; o agendador e
+o LISTEN das vagas ficam desligados (nada de threads nem conexão com o banco).
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CODIGO = (
+    "import time\n"
+    "inicio = time.perf_counter()\n"
+    "from app import create_app\n"
+    "create_app()\n"
+    "print(time.perf_counter() - inicio)\n"
+)
+
+# import time: <próprio us> | <acumulado us> | <indentação><módulo>
+_LINHA = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def executar():
+    """Uma subida a frio. Retorna (segundos, [(acumulado_us, proprio_us, profundidade, modulo), ...])."""
+    env = dict(os.environ, SCHEDULER_ENABLED='false', SSE_LISTEN_NOTIFY='false')
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', CODIGO],
+                               cwd=BACKEND, env=env, capture_output=True, text=True, check=True)
+    modulos = []
+    for linha in resultado.stderr.splitlines():
+        casamento = _LINHA.match(linha)
+        if casamento:
+            proprio, acumulado, indentacao, modulo = casamento.groups()
+            modulos.append((int(acumulado), int(proprio), (len(indentacao) - 1) // 2, modulo))
+    return float(resultado.stdout.strip().splitlines()[-1]), modulos
+
+
+def por_pacote(modulos):
+    """Tempo próprio somado por pacote de primeiro nível (flask, peewee, app ...)."""
+    totais = {}
+    for _, proprio, _, modulo in modulos:
+        pacote = modulo.split('.')[0]
+        totais[pacote] = totais.get(pacote, 0) + proprio
+    return sorted(totais.items(), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args()
+
+    tempos = []
+    for _ in range(args.repeticoes):
+        segundos, modulos = executar()
+        tempos.append(segundos)
+
+    print(f"create_app() a frio: mediana {statistics.median(tempos) * 1000:.1f} ms, "
+          f"mínimo {min(tempos) * 1000:.1f} ms ({args.repeticoes} repetições)")
+
+    print("\nMódulos mais caros (acumulado, última repetição):")
+    for acumulado, proprio, profundidade, modulo in sorted(modulos, reverse=True)[:args.top]:
+        print(f"  {acumulado / 1000:8.1f} ms  {proprio / 1000:7.1f} ms  {'  ' * profundidade}{modulo}")
+
+    print("\nPor pacote (tempo próprio somado):")
+    for pacote, proprio in por_pacote(modulos)[:args.top]:
+        print(f"  {proprio / 1000:8.1f} ms  {pacote}")
+
+
+if __name__ == '__main__':
+    main()
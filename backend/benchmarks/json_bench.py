@@ -0,0 +1,100 @@
+"""
+Benchmark da serialização JSON: GET /api/v1/avisos com 10 mil linhas usando o
+provider padrão do Flask x ProvedorJSON (orjson e, para comparação, o fallback
+com o json da biblioteca padrão).
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.json_bench [--linhas 10000] [--repeticoes 20]
+
+Roda em um SQLite em memória. Mede a rota inteira (consulta + serialização) e,
+separadamente, só o jsonify do payload já montado.
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from peewee import SqliteDatabase
+
+from app.api import api_bp
+from app.models.avisos import Aviso
+from app.models.usuario import Usuario
+from app.services import serializacao
+from app.services.serializacao import ProvedorJSON
+
+MODELS = [Usuario, Aviso]
+
+
+class ProvedorStdlib(ProvedorJSON):
+    """ProvedorJSON forçando o fallback (como se o orjson não estivesse instalado)."""
+
+    def dumps_bytes(self, obj, indentar=False):
+        orjson, serializacao.orjson = serializacao.orjson, None
+        try:
+            return super().dumps_bytes(obj, indentar)
+        finally:
+            serializacao.orjson = orjson
+
+
+def popular(linhas):
+    Usuario.create(idusuario=1, nome="Admin", email="admin@bench", senha="x", tipo="admin")
+    hoje = date.today()
+    for inicio in range(0, linhas, 500):
+        Aviso.insert_many([
+            {"titulo": f"Aviso {i}", "categoria": "Paróquia", "url": f"https://exemplo.org/{i}",
+             "descricao": "Descrição do aviso com acentuação. " * 4, "data": hoje - timedelta(days=i % 365),
+             "criado_por": 1}
+            for i in range(inicio, min(inicio + 500, linhas))]).execute()
+
+
+def criar_app(provider):
+    app = Flask(__name__)
+    app.json = provider(app)
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    return app
+
+
+def medir(funcao, repeticoes):
+    funcao()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=10000)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    db = SqliteDatabase(':memory:')
+    db.bind(MODELS, bind_refs=False, bind_backrefs=False)
+    db.connect()
+    db.create_tables(MODELS)
+    popular(args.linhas)
+
+    providers = {"Flask padrão": DefaultJSONProvider, "ProvedorJSON (stdlib)": ProvedorStdlib}
+    if serializacao.orjson is not None:
+        providers["ProvedorJSON (orjson)"] = ProvedorJSON
+
+    print(f"{args.linhas} avisos, {args.repeticoes} repetições")
+    print(f"{'provider':<24}{'rota (ms)':>12}{'jsonify (ms)':>15}{'bytes':>10}")
+    for nome, provider in providers.items():
+        app = criar_app(provider)
+        cliente = app.test_client()
+        resposta = cliente.get('/api/v1/avisos')
+        assert resposta.status_code == 200 and len(resposta.get_json()) == args.linhas
+        payload = resposta.get_json()
+
+        rota = medir(lambda: cliente.get('/api/v1/avisos'), args.repeticoes)
+        with app.app_context():
+            serializacao_ms = medir(lambda: app.json.response(payload), args.repeticoes)
+        print(f"{nome:<24}{rota:>12.2f}{serializacao_ms:>15.2f}{len(resposta.data):>10}")
+
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,8 @@
+from dotenv import load_dotenv
+
+# Variáveis do .env antes de importar a aplicação (config.py e a conexão as leem na importação)
+load_dotenv()
+
 from app import create_app
 
 # Cria a aplicação usando a fábrica definida em app/__init__.py
@@ -0,0 +1,13 @@
+from dotenv import load_dotenv
+
+# Variáveis do .env antes de importar a aplicação (config.py e a conexão as leem na importação)
+load_dotenv()
+
+from app import create_app
+from app.extensions import agendador
+
+# Processo dedicado às tarefas agendadas (alternativa a SCHEDULER_ENABLED no servidor web)
+app = create_app()
+
+if __name__ == '__main__':
+    agendador.rodar()